@@ -1,8 +1,11 @@
+import ast
 import logging
 from importlib import import_module
+import os
 import pkgutil
 
 import click
+from click.utils import make_default_short_help
 import requests_cache   # @todo - replace with cache control
 
 from regparser import commands
@@ -10,19 +13,55 @@ from regparser.commands.dependency_resolver import DependencyResolver
 from regparser.index import dependency
 
 
-@click.group()
+def command_modules():
+    """Names of the modules within regparser.commands. Each which defines a
+    function of the same name provides that command"""
+    return [name for _, name, _ in pkgutil.iter_modules(commands.__path__)]
+
+
+def command_docs():
+    """Docstrings of each command, found without importing its module"""
+    docs = {}
+    for name in command_modules():
+        path = os.path.join(commands.__path__[0], name + '.py')
+        with open(path) as f:
+            module = ast.parse(f.read(), path)
+        for node in module.body:
+            if isinstance(node, ast.FunctionDef) and node.name == name:
+                docs[name] = ast.get_docstring(node) or ''
+    return docs
+
+
+class LazyGroup(click.Group):
+    """Importing every command (and, in turn, most of the parser) would make
+    even `eregs clear` slow to start. Instead, a command's module is only
+    imported when that command is run"""
+    def list_commands(self, ctx):
+        return sorted(set(command_docs()) | set(self.commands))
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name not in self.commands and cmd_name in command_modules():
+            module = import_module('regparser.commands.' + cmd_name)
+            if hasattr(module, cmd_name):
+                self.add_command(getattr(module, cmd_name))
+        return self.commands.get(cmd_name)
+
+    def format_commands(self, ctx, formatter):
+        """Like click's, but derives the help text of each command without
+        importing it"""
+        docs = command_docs()
+        rows = [(name, make_default_short_help(docs[name]))
+                for name in sorted(docs)]
+        with formatter.section('Commands'):
+            formatter.write_dl(rows)
+
+
+@click.group(cls=LazyGroup)
 def cli():
     logging.basicConfig(level=logging.INFO)
     requests_cache.install_cache('fr_cache')
 
 
-for _, command_name, _ in pkgutil.iter_modules(commands.__path__):
-    module = import_module('regparser.commands.{}'.format(command_name))
-    if hasattr(module, command_name):
-        subcommand = getattr(module, command_name)
-        cli.add_command(subcommand)
-
-
 def main(prev_dependency=None):
     """Wrapper around cli(), providing exception handling for dependency
     errors. When a dependency is missing, this will try to resolve that
@@ -32,6 +71,9 @@ def main(prev_dependency=None):
     try:
         cli()
     except dependency.Missing, e:
+        # Resolvers are defined alongside the commands
+        for name in command_modules():
+            import_module('regparser.commands.' + name)
         resolvers = [resolver(e.dependency)
                      for resolver in DependencyResolver.__subclasses__()]
         resolvers = [r for r in resolvers if r.has_resolution()]
@@ -1,9 +1,12 @@
 import codecs
 import copy
+import cPickle
 import hashlib
+import logging
 import os
-import pickle
 import re
+from StringIO import StringIO
+import weakref
 
 from lxml import etree
 
@@ -34,8 +37,8 @@ class Builder(object):
         # @todo - we probably shouldn't make an API call in the constructor
         self.eff_notices = self.checkpointer.checkpoint(
             "effective-notices",
-            lambda: notices_for_cfr_part(self.cfr_title, self.cfr_part)
-        )
+            lambda: notices_for_cfr_part(self.cfr_title, self.cfr_part),
+            inputs=[])
         if fake_notice:
             self.eff_notices[fake_notice["effective_on"]] = [fake_notice]
         self.notices = []
@@ -60,7 +63,8 @@ class Builder(object):
                 ident + "-" + self.doc_number,
                 lambda: layer_class(
                     reg_tree, self.cfr_title, self.doc_number, notices,
-                    act_info).build(cache.cache_for(ident)))
+                    act_info).build(cache.cache_for(ident)),
+                inputs=[reg_tree, notices, act_info])
             self.writer.layer(ident, self.cfr_part, self.doc_number).write(
                 layer)
 
@@ -72,7 +76,8 @@ class Builder(object):
             old_tree = reg_tree
             reg_tree = self.checkpointer.checkpoint(
                 "compiled-" + version,
-                lambda: compile_regulation(old_tree, merged_changes))
+                lambda: compile_regulation(old_tree, merged_changes),
+                inputs=[old_tree, merged_changes])
             notices = applicable_notices(self.notices, version)
             first_notice = None
             for notice in notices:
@@ -237,81 +242,126 @@ class EmptyCache(object):
         return layer.process(node)
 
 
-def _serialize_xml_fields(node):
-    if node.source_xml is not None:
-        node.source_xml = etree.tostring(node.source_xml)
+def _xml_persistent_id(obj):
+    """XML elements can't be pickled, so we store them as strings"""
+    if isinstance(obj, etree._Element):
+        return etree.tostring(obj)
 
 
-def _deserialize_xml_fields(node):
-    if node.source_xml:
-        node.source_xml = etree.fromstring(node.source_xml)
+def _dumps(obj):
+    """Pickle an object using the most compact protocol available"""
+    output = StringIO()
+    pickler = cPickle.Pickler(output, cPickle.HIGHEST_PROTOCOL)
+    pickler.persistent_id = _xml_persistent_id
+    pickler.dump(obj)
+    return output.getvalue()
+
+
+def _loads(content):
+    """Inverse of _dumps"""
+    unpickler = cPickle.Unpickler(StringIO(content))
+    unpickler.persistent_load = etree.fromstring
+    return unpickler.load()
 
 
 class Checkpointer(object):
     """Save checkpoints during the build pipeline. Generally, a caller will
-    specify, a unique tag (a string) and a fallback function (for how to
-    compute it when there is no checkpoint). Calling checkpoint increment the
-    counter field, which is prefixed to the filename to limit the risk of
-    re-ordering collisions."""
+    specify, a unique tag (a string), a fallback function (for how to compute
+    it when there is no checkpoint) and the inputs to that function.
+    Checkpoints are keyed by a digest of the tag and inputs. If inputs aren't
+    provided, we assume the checkpoint depends on the results of all
+    preceding checkpoints. This limits recomputation to only those steps
+    which depend on something that changed."""
     def __init__(self, file_path):
-        self.counter = 0
         self.file_path = file_path
         self.suffix = ""
-        self.ignore_checkpoints = False
+        self._reset()
         if not os.path.isdir(file_path):
             os.makedirs(file_path)
 
-    def _filename(self, tag):
-        """Combine the counter and tag name to create a filename"""
-        name = str(self.counter).zfill(6) + ":"
-        name += re.sub(r"\s", "", tag.lower())
-        name += self.suffix + ".p"
+    def _filename(self, tag, key):
+        """Combine the tag name and key to create a filename"""
+        name = re.sub(r"\s", "", tag.lower())
+        name += self.suffix + "-" + key + ".p"
         return os.path.join(self.file_path, name)
 
-    def _serialize(self, tag, obj):
-        """Performs class-specific conversions before writing to a file"""
-        if isinstance(obj, struct.Node):
-            obj = copy.deepcopy(obj)
-            struct.walk(obj, _serialize_xml_fields)
-
-        with open(self._filename(tag), 'wb') as to_write:
-            pickle.dump(obj, to_write)
-
-    def _deserialize(self, tag):
-        """Attempts to read the object from disk. Performs class-specific
-        conversions when deserializing"""
-        name = self._filename(tag)
-        if os.path.exists(name):
-            with open(name, 'rb') as to_read:
-                try:
-                    obj = pickle.load(to_read)
-                except Exception:   # something bad happened during unpickling
-                    obj = None
-
-            if isinstance(obj, struct.Node):
-                struct.walk(obj, _deserialize_xml_fields)
-            return obj
+    def _digest(self, obj):
+        """Digest of an object, used when generating keys. Results of
+        previous checkpoints have already been digested"""
+        ref, digest = self._digests.get(id(obj), (None, None))
+        if ref is not None and ref() is obj:
+            return digest
+        elif isinstance(obj, struct.FrozenNode):
+            return obj.hash
+        else:
+            return hashlib.sha256(_dumps(obj)).hexdigest()
+
+    def _remember_digest(self, obj, digest):
+        try:
+            self._digests[id(obj)] = (weakref.ref(obj), digest)
+        except TypeError:   # e.g. dicts and lists can't be weakly referenced
+            pass
+
+    def _key(self, tag, inputs):
+        """Digest of the tag and inputs (or, if there are none, of all
+        preceding checkpoint results)"""
+        hasher = hashlib.sha256(tag + self.suffix)
+        if inputs is None:
+            hasher.update(self._chain)
+        else:
+            for value in inputs:
+                hasher.update(self._digest(value))
+        return hasher.hexdigest()
+
+    def _serialize(self, filename, obj):
+        """Write the object to disk; returns a digest of its contents"""
+        content = _dumps(obj)
+        with open(filename, 'wb') as to_write:
+            to_write.write(content)
+        return hashlib.sha256(content).hexdigest()
+
+    def _deserialize(self, filename):
+        """Attempts to read the object from disk. Returns a pair of the object
+        and a digest of its contents (or Nones if not present)"""
+        if os.path.exists(filename):
+            with open(filename, 'rb') as to_read:
+                content = to_read.read()
+            try:
+                return _loads(content), hashlib.sha256(content).hexdigest()
+            except Exception:   # something bad happened during unpickling
+                pass
+        return None, None
 
     def _reset(self):
         """Used for testing"""
-        self.counter = 0
-        self.ignore_checkpoints = False
-
-    def checkpoint(self, tag, fn, force=False):
-        """Primary interface for storing an object"""
-        self.counter += 1
-        existing = self._deserialize(tag)
-        if not force and existing is not None and not self.ignore_checkpoints:
-            return existing
-        else:
+        self.hits, self.misses = 0, 0
+        self._chain = ''
+        self._digests = {}
+
+    def checkpoint(self, tag, fn, force=False, inputs=None):
+        """Primary interface for storing an object. `inputs` is a sequence
+        of all values the result depends on"""
+        filename = self._filename(tag, self._key(tag, inputs))
+        result, digest = None, None
+        if not force:
+            result, digest = self._deserialize(filename)
+        if result is None:
+            self.misses += 1
+            logging.debug("Checkpoint miss: %s", tag)
             result = fn()
-            self._serialize(tag, result)
-            self.ignore_checkpoints = True
-            return result
+            digest = self._serialize(filename, result)
+        else:
+            self.hits += 1
+            logging.debug("Checkpoint hit: %s", tag)
+        self._remember_digest(result, digest)
+        self._chain = hashlib.sha256(self._chain + digest).hexdigest()
+        return result
 
 
 class NullCheckpointer(object):
-    def checkpoint(self, tag, fn, force=False):
+    hits, misses = 0, 0
+
+    def checkpoint(self, tag, fn, force=False, inputs=None):
         return fn()
 
 
@@ -334,17 +384,17 @@ def tree_and_builder(filename, title, checkpoint_path=None, doc_number=None):
     else:
         raise ValueError("Building from text input is no longer supported")
 
-    for preprocessor in preprocessors.ALL:
-        preprocessor().transform(reg_xml)
+    preprocessors.preprocess(reg_xml)
 
     reg_tree = checkpointer.checkpoint(
         "init-tree-" + file_digest,
-        lambda: xml_parser.reg_text.build_tree(reg_xml))
+        lambda: xml_parser.reg_text.build_tree(reg_xml), inputs=[])
     title_part = reg_tree.label_id()
     if doc_number is None:
         doc_number = checkpointer.checkpoint(
             "doc-number-" + file_digest,
-            lambda: Builder.determine_doc_number(reg_xml, title, title_part))
+            lambda: Builder.determine_doc_number(reg_xml, title, title_part),
+            inputs=[])
     if not doc_number:
         raise ValueError("Could not determine document number")
 
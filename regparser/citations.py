@@ -1,10 +1,20 @@
+# vim: set encoding=utf-8
+from bisect import bisect_right
+from collections import defaultdict, OrderedDict
 from itertools import chain
+import re
+
+from pyparsing import ParseException, ParserElement
 
 from regparser.grammar import unified as grammar
+from regparser.grammar.utils import Prefilter
 from regparser.tree.struct import Node
 
 
 class Label(object):
+    """Immutable (and hashable) description of a citation's target. Labels
+    created via `copy` and `from_node` are interned and memoized, so that
+    each distinct label is only built (and computes its list form) once"""
     #   @TODO: subparts
     app_sect_schema = ('part', 'appendix', 'appendix_section', 'p1', 'p2',
                        'p3', 'p4', 'p5', 'p6')
@@ -14,10 +24,26 @@ class Label(object):
 
     comment_schema = ('comment', 'c1', 'c2', 'c3', 'c4')
 
+    _pool = {}  # canonical Labels, keyed by their cache_key
+    _from_nodes = {}    # (node_type, node label) -> Label
+
     @staticmethod
     def from_node(node):
         """Best guess for schema based on the provided
            regparser.tree.struct.Node"""
+        key = (node.node_type, tuple(node.label))
+        if key not in Label._from_nodes:
+            Label._from_nodes[key] = Label._from_node(node)
+        return Label._from_nodes[key]
+
+    @staticmethod
+    def _from_node(node):
+        if (node.node_type == Node.REGTEXT
+                and len(node.label) <= len(Label.sect_schema)):
+            #   The common case: no appendix or interpretation fields
+            settings = dict(zip(Label.sect_schema, node.label))
+            settings['comment'] = False
+            return Label.interned(**settings)
         if (node.node_type == Node.APPENDIX
             or (node.node_type == Node.INTERP
                 and len(node.label) > 2
@@ -39,7 +65,7 @@ class Label(object):
                 #   Stop processing the prefix fields
                 break
             settings[schema[idx]] = value
-        return Label(**settings)
+        return Label.interned(**settings)
 
     @staticmethod
     def determine_schema(settings):
@@ -50,29 +76,61 @@ class Label(object):
         elif 'section' in settings:
             return Label.sect_schema
 
+    @staticmethod
+    def interned(schema=None, **kwargs):
+        """Return the pooled Label equal to Label(schema, **kwargs)"""
+        label = Label(schema, **kwargs)
+        return Label._pool.setdefault(label._key, label)
+
     def __init__(self, schema=None, **kwargs):
-        self.using_default_schema = False
+        self._using_default_schema = False
         if schema is None:
             schema = Label.determine_schema(kwargs)
         if schema is None:
-            self.using_default_schema = True
+            self._using_default_schema = True
             schema = Label.default_schema
-        self.settings = kwargs
-        self.schema = schema
-        self.comment = any(kwargs.get(field) for field in
-                           Label.comment_schema)
+        self._settings = kwargs
+        self._schema = schema
+        self._comment = any(kwargs.get(field) for field in
+                            Label.comment_schema)
+        self._key = (self._using_default_schema, schema,
+                     tuple(sorted(kwargs.items())))
+        self._list = None
+        self._copies = {}
+
+    @property
+    def using_default_schema(self):
+        return self._using_default_schema
+
+    @property
+    def settings(self):
+        return dict(self._settings)
+
+    @property
+    def schema(self):
+        return self._schema
+
+    @property
+    def comment(self):
+        return self._comment
 
     def copy(self, schema=None, **kwargs):
         """Keep any relevant prefix when copying"""
+        key = (schema, tuple(sorted(kwargs.items())))
+        if key not in self._copies:
+            self._copies[key] = self._copy(schema, **kwargs)
+        return self._copies[key]
+
+    def _copy(self, schema=None, **kwargs):
         kwschema = Label.determine_schema(kwargs)
         set_schema = bool(schema or kwschema
-                          or not self.using_default_schema)
+                          or not self._using_default_schema)
 
         if schema is None:
             if kwschema:
                 schema = kwschema
             else:
-                schema = self.schema
+                schema = self._schema
 
         if set_schema:
             new_settings = {'schema': schema}
@@ -85,29 +143,44 @@ class Label(object):
                 found_start = True
                 new_settings[field] = kwargs[field]
             if not found_start:
-                new_settings[field] = self.settings.get(field)
-        return Label(**new_settings)
+                new_settings[field] = self._settings.get(field)
+        return Label.interned(**new_settings)
 
     def to_list(self):
-        lst = list(map(lambda f: self.settings.get(f), self.schema))
-        if self.comment:
-            lst.append(Node.INTERP_MARK)
-            lst.append(self.settings.get('c1'))
-            lst.append(self.settings.get('c2'))
-            lst.append(self.settings.get('c3'))
-
-        return filter(bool, lst)
+        if self._list is None:
+            lst = [self._settings.get(field) for field in self._schema]
+            if self._comment:
+                lst.append(Node.INTERP_MARK)
+                lst.append(self._settings.get('c1'))
+                lst.append(self._settings.get('c2'))
+                lst.append(self._settings.get('c3'))
+            self._list = tuple(value for value in lst if value)
+        return list(self._list)
 
     def __repr__(self):
         return repr(self.to_list())
 
+    def cache_key(self):
+        """Hashable equivalent of this label, e.g. for caching parses"""
+        return self._key
+
+    def __hash__(self):
+        return hash(self._key)
+
+    def __getstate__(self):
+        """Labels are persisted with cached parses; the memoized copies
+        needn't be"""
+        state = dict(self.__dict__)
+        state['_copies'] = {}
+        return state
+
     def __eq__(self, other):
         """Equality if types match and fields match"""
-        return (type(other) == type(self)
-                and self.using_default_schema == other.using_default_schema
-                and self.settings == other.settings
-                and self.schema == other.schema
-                and self.comment == other.comment)
+        return self is other or (type(other) == type(self)
+                                 and self._key == other._key)
+
+    def __ne__(self, other):
+        return not self == other
 
 
 class ParagraphCitation(object):
@@ -140,9 +213,12 @@ def match_to_label(match, initial_label, comment=False):
         field_map = {'comment': True}
     else:
         field_map = {}
+    names = set(match.keys())  # cheaper than looking up absent names
     for field in ('part', 'section', 'appendix', 'appendix_section', 'p1',
                   'p2', 'p3', 'p4', 'p5', 'p6', 'c1', 'c2', 'c3'):
-        value = getattr(match, field) or getattr(match, 'plaintext_' + field)
+        value = ((field in names and match[field])
+                 or ('plaintext_' + field in names
+                     and match['plaintext_' + field]))
         if value:
             field_map[field] = value
 
@@ -150,6 +226,102 @@ def match_to_label(match, initial_label, comment=False):
     return label
 
 
+# Citations can only begin at a handful of anchors, e.g. "§", "paragraph",
+# or the digits of "1005.2(a)". These patterns match (a superset of) those
+# anchors within the upper-cased text
+_ANCHORS = (
+    ('comment', u'COMMENT|OFFICIAL|SUPPLEMENT'),
+    ('paragraph', u'PARAGRAPH'),
+    ('section', u'§|SECTION'),
+    ('appendix', u'APPENDI'),
+    ('appendix_section', ur'[A-Z]+[0-9]*\s*-\s*[0-9]'),
+    ('section_paragraph', ur'[0-9]+[A-Z]*\s*\('),
+    ('part_section', ur'[0-9]+\s*\.'),
+    ('cfr', ur'[0-9]+\s*CFR'))
+_any_anchor = u'|'.join(pattern for _, pattern in _ANCHORS)
+_anchor_re = re.compile(
+    u'(?=' + _any_anchor + u')'
+    + u''.join(u'(?=(?P<{}>{})?)'.format(name, pattern)
+               for name, pattern in _ANCHORS))
+# Text without any anchors can't contain a citation
+_prefilter = Prefilter('citations.internal_citations', _any_anchor)
+
+# Which anchors each grammar may begin with
+_GRAMMAR_ANCHORS = {
+    'marker_comment': ('comment',),
+    'multiple_non_comments': ('paragraph', 'section'),
+    'multiple_appendix_section': ('appendix_section',),
+    'multiple_comments': ('comment',),
+    'multiple_appendices': ('appendix',),
+    'multiple_period_sections': ('section',),
+    'marker_appendix': ('appendix',),
+    'appendix_with_section': ('appendix_section',),
+    'marker_paragraph': ('paragraph',),
+    'mps_paragraph': ('section',),
+    'm_section_paragraph': ('paragraph',),
+    'section_paragraph': ('section_paragraph',),
+    'part_section_paragraph': ('part_section',),
+    'multiple_section_paragraphs': ('section_paragraph',),
+    'appendix_with_part': ('appendix',),
+    'internal_cfr_p': ('cfr',),
+    'multiple_cfr_p': ('cfr',),
+}
+
+
+class CitationScanner(object):
+    """Finds all of the anchors within a text in a single pass, so that each
+    citation grammar need only be attempted where it could match. Results
+    are otherwise those of pyparsing's scanString"""
+    def __init__(self, text):
+        self.text = text.expandtabs()   # as scanString does
+        self.anchors = defaultdict(list)
+        for match in _anchor_re.finditer(self.text.upper()):
+            for name, value in match.groupdict().items():
+                if value is not None:
+                    self.anchors[name].append(match.start())
+        ParserElement.resetCache()
+
+    def scan(self, grammar_name):
+        """Generate (tokens, start, end) triples for the non-overlapping
+        matches of the named grammar, from left to right"""
+        parser = getattr(grammar, grammar_name)
+        if not parser.streamlined:
+            parser.streamline()
+        starts = set()
+        for anchor in _GRAMMAR_ANCHORS[grammar_name]:
+            starts.update(self.anchors[anchor])
+
+        last_end = 0
+        for start in sorted(starts):
+            if start < last_end:
+                continue
+            try:
+                end, tokens = parser._parse(self.text, start,
+                                            callPreParse=False)
+            except ParseException:
+                continue
+            if end > start:
+                last_end = end
+                yield tokens, start, end
+
+
+def remove_contained(citations):
+    """Remove any citations which are properly contained within another.
+    Rather than comparing each pair, we sort the spans and sweep through
+    them, tracking the furthest end seen so far"""
+    spans = sorted(set((cit.full_start, cit.full_end) for cit in citations),
+                   key=lambda (start, end): (start, -end))
+    contained = set()
+    furthest = None
+    for start, end in spans:
+        if furthest is not None and furthest >= end:
+            contained.add((start, end))
+        else:
+            furthest = end
+    return [cit for cit in citations
+            if (cit.full_start, cit.full_end) not in contained]
+
+
 def internal_citations(text, initial_label=None,
                        require_marker=False, title=None):
     """List of all internal citations in the text. require_marker helps by
@@ -160,6 +332,9 @@ def internal_citations(text, initial_label=None,
     if not initial_label:
         initial_label = Label()
     citations = []
+    if not _prefilter.matches(text.upper()):
+        return citations
+    scanner = CitationScanner(text)
 
     def multiple_citations(matches, comment):
         """i.e. head :: tail"""
@@ -186,30 +361,27 @@ def internal_citations(text, initial_label=None,
                                            comment=comment),
                 full_start=full_start))
 
-    single_citations(grammar.marker_comment.scanString(text), True)
-
-    multiple_citations(grammar.multiple_non_comments.scanString(text), False)
-    multiple_citations(grammar.multiple_appendix_section.scanString(text),
-                       False)
-    multiple_citations(grammar.multiple_comments.scanString(text), True)
-    multiple_citations(grammar.multiple_appendices.scanString(text), False)
-    multiple_citations(grammar.multiple_period_sections.scanString(text),
-                       False)
-
-    single_citations(grammar.marker_appendix.scanString(text), False)
-    single_citations(grammar.appendix_with_section.scanString(text), False)
-    single_citations(grammar.marker_paragraph.scanString(text), False)
-    single_citations(grammar.mps_paragraph.scanString(text), False)
-    single_citations(grammar.m_section_paragraph.scanString(text), False)
+    single_citations(scanner.scan('marker_comment'), True)
+
+    multiple_citations(scanner.scan('multiple_non_comments'), False)
+    multiple_citations(scanner.scan('multiple_appendix_section'), False)
+    multiple_citations(scanner.scan('multiple_comments'), True)
+    multiple_citations(scanner.scan('multiple_appendices'), False)
+    multiple_citations(scanner.scan('multiple_period_sections'), False)
+
+    single_citations(scanner.scan('marker_appendix'), False)
+    single_citations(scanner.scan('appendix_with_section'), False)
+    single_citations(scanner.scan('marker_paragraph'), False)
+    single_citations(scanner.scan('mps_paragraph'), False)
+    single_citations(scanner.scan('m_section_paragraph'), False)
     if not require_marker:
-        single_citations(grammar.section_paragraph.scanString(text), False)
-        single_citations(grammar.part_section_paragraph.scanString(text),
-                         False)
-        multiple_citations(
-            grammar.multiple_section_paragraphs.scanString(text), False)
+        single_citations(scanner.scan('section_paragraph'), False)
+        single_citations(scanner.scan('part_section_paragraph'), False)
+        multiple_citations(scanner.scan('multiple_section_paragraphs'),
+                           False)
 
     # Some appendix citations are... complex
-    for match, start, end in grammar.appendix_with_part.scanString(text):
+    for match, start, end in scanner.scan('appendix_with_part'):
         full_start = start
         if match.marker is not '':
             start = match.marker.pos[1]
@@ -221,7 +393,7 @@ def internal_citations(text, initial_label=None,
                 **label), full_start=full_start))
 
     # Internal citations can sometimes be in the form XX CFR YY.ZZ
-    for match, start, end in grammar.internal_cfr_p.scanString(text):
+    for match, start, end in scanner.scan('internal_cfr_p'):
         # Check if this is a reference to the CFR title and part we are parsing
         if match.cfr_title == title and match[1] == initial_label.to_list()[0]:
             full_start = start
@@ -235,7 +407,7 @@ def internal_citations(text, initial_label=None,
             continue
 
     # And sometimes there are several of them
-    for match, start, end in grammar.multiple_cfr_p.scanString(text):
+    for match, start, end in scanner.scan('multiple_cfr_p'):
         label = initial_label
         if match.head.cfr_title == title:
             for submatch in chain([match.head], match.tail):
@@ -252,18 +424,52 @@ def internal_citations(text, initial_label=None,
             continue
 
     # Remove any sub-citations
-    final_citations = []
-    for cit in citations:
-        if not any(cit in other for other in citations):
-            final_citations.append(cit)
-
-    return final_citations
+    return remove_contained(citations)
+
+
+class CitationSpans(object):
+    """The (inclusive) spans of a text's citations, sorted by start so that
+    we can check whether a range overlaps any of them without comparing it
+    to each"""
+    def __init__(self, citations):
+        spans = sorted((cit.start, cit.end) for cit in citations)
+        self.starts = [start for start, _ in spans]
+        # furthest_ends[i] is the largest end among the first i+1 spans
+        self.furthest_ends = []
+        for _, end in spans:
+            if self.furthest_ends:
+                end = max(end, self.furthest_ends[-1])
+            self.furthest_ends.append(end)
+
+    def overlaps(self, start, end):
+        """Do any citations share a position with [start, end]?"""
+        idx = bisect_right(self.starts, end)
+        return idx > 0 and self.furthest_ends[idx - 1] >= start
+
+
+# Recently used CitationSpans, keyed by text
+_spans_memo = OrderedDict()
+SPANS_MEMO_SIZE = 64
+
+
+def citation_spans(text):
+    """The same text is often checked for several kinds of markers, so we
+    keep the spans of recently seen texts"""
+    if text in _spans_memo:
+        spans = _spans_memo.pop(text)
+    else:
+        spans = CitationSpans(internal_citations(text))
+    _spans_memo[text] = spans
+    while len(_spans_memo) > SPANS_MEMO_SIZE:
+        _spans_memo.popitem(last=False)
+    return spans
 
 
 def remove_citation_overlaps(text, possible_markers):
     """Given a list of markers, remove any that overlap with citations"""
+    possible_markers = list(possible_markers)
+    if not possible_markers:
+        return []
+    spans = citation_spans(text)
     return [(m, start, end) for m, start, end in possible_markers
-            if not any((e.start <= start and e.end >= start)
-                       or (e.start <= end and e.end >= end)
-                       or (start <= e.start and end >= e.end)
-                       for e in internal_citations(text))]
+            if not spans.overlaps(start, end)]
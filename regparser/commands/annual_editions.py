@@ -6,6 +6,7 @@ import click
 from regparser.history import annual
 from regparser.index import dependency, entry
 from regparser.tree import xml_parser
+from regparser.tree.depth import derive
 
 
 LastVersionInYear = namedtuple('LastVersionInYear', ['version_id', 'year'])
@@ -27,7 +28,7 @@ def last_versions(cfr_title, cfr_part):
         yield LastVersionInYear(have_annual_edition[year], year)
 
 
-def process_if_needed(cfr_title, cfr_part, last_versions):
+def process_if_needed(cfr_title, cfr_part, last_versions, workers=1):
     """Calculate dependencies between input and output files for these annual
     editions. If an output is missing or out of date, process it"""
     annual_path = entry.Annual(cfr_title, cfr_part)
@@ -46,15 +47,19 @@ def process_if_needed(cfr_title, cfr_part, last_versions):
         deps.validate_for(tree_entry)
         if deps.is_stale(tree_entry):
             input_entry = annual_path / last_version.year
-            tree = xml_parser.reg_text.build_tree(input_entry.read().xml)
+            tree = xml_parser.reg_text.build_tree(input_entry.read().xml,
+                                                  workers)
             tree_entry.write(tree)
+    derive.cache.log_stats()
 
 
 @click.command()
 @click.argument('cfr_title', type=int)
 @click.argument('cfr_part', type=int)
-def annual_editions(cfr_title, cfr_part):
+@click.option('--workers', type=int, default=1,
+              help="Number of processes with which to parse sections")
+def annual_editions(cfr_title, cfr_part, workers):
     """Parse available annual editions for this reg. Cycles through all known
     versions and parses the annual edition XML when relevant"""
     versions = list(last_versions(cfr_title, cfr_part))
-    process_if_needed(cfr_title, cfr_part, versions)
+    process_if_needed(cfr_title, cfr_part, versions, workers)
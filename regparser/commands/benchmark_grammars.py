@@ -0,0 +1,150 @@
+import time
+
+import click
+from lxml import etree
+from pyparsing import ParseResults, ParserElement
+
+from regparser.citations import internal_citations, Label
+from regparser.grammar import (
+    amdpar, compiled, external_citations, interpretation_headers, terms,
+    unified)
+from regparser.grammar.utils import (
+    disable_packrat, enable_packrat, WrappedResult)
+from regparser.tree.xml_parser import tree_utils
+
+
+def _comparable(value):
+    """Convert parse results (including their names and positions) into
+    something we can compare between runs"""
+    if isinstance(value, ParseResults):
+        return ([_comparable(v) for v in value],
+                sorted((k, _comparable(v)) for k, v in value.items()))
+    elif isinstance(value, WrappedResult):
+        return (value.pos, _comparable(value.tokens))
+    else:
+        return repr(value)
+
+
+def _scanner(grammar):
+    def scan(text):
+        return [(_comparable(tokens), start, end)
+                for tokens, start, end in grammar.scanString(text)]
+    return scan
+
+
+def _citations(text):
+    return [(c.start, c.end, c.label.to_list())
+            for c in internal_citations(text, Label(part='1'))]
+
+
+# (name, kind of sample, function running the grammar over a sample)
+GRAMMARS = (
+    ('citations.internal_citations', 'regtext', _citations),
+    ('unified.any_depth_p', 'regtext', _scanner(unified.any_depth_p)),
+    ('external_citations', 'regtext',
+     _scanner(external_citations.regtext_external_citation)),
+    ('terms.xml_term_parser', 'tagged', _scanner(terms.xml_term_parser)),
+    ('amdpar.token_patterns', 'amdpar', _scanner(amdpar.token_patterns)),
+    ('interpretation_headers.parser', 'header',
+     _scanner(interpretation_headers.parser)),
+)
+
+# (name, kind of sample, pyparsing grammar, its faster equivalent: compiled
+# to a regex or only attempting the alternatives which may match)
+OPTIMIZED = (
+    ('unified.any_depth_p', 'regtext', unified.any_depth_p,
+     compiled.any_depth_p),
+    ('external_citations', 'regtext',
+     external_citations.regtext_external_citation,
+     compiled.regtext_external_citation),
+    ('interpretation_headers.parser', 'header',
+     interpretation_headers.parser, compiled.interpretation_headers),
+    ('amdpar.token_patterns', 'amdpar', amdpar.token_patterns,
+     amdpar.triggered_token_patterns),
+)
+
+
+def samples_from(xml):
+    """Texts of each kind (regtext paragraphs, their tagged equivalents,
+    AMDPARs, and headers) found within the XML"""
+    samples = {'regtext': [], 'tagged': [], 'amdpar': [], 'header': []}
+    for paragraph in xml.xpath('//P|//FP'):
+        samples['regtext'].append(tree_utils.get_node_text(paragraph))
+        samples['tagged'].append(
+            tree_utils.get_node_text_tags_preserved(paragraph))
+    for amdpar_xml in xml.xpath('//AMDPAR'):
+        samples['amdpar'].append(
+            tree_utils.get_node_text(amdpar_xml, add_spaces=True))
+    for header in xml.xpath('//HD'):
+        samples['header'].append(tree_utils.get_node_text(header))
+    return samples
+
+
+def run(fn, texts, repeat):
+    """The best time of `repeat` runs over all of the texts, along with the
+    results"""
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        results = [fn(text) for text in texts]
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, results
+
+
+@click.command()
+@click.argument('xml_files', nargs=-1, required=True,
+                type=click.Path(exists=True, dir_okay=False))
+@click.option('--repeat', type=int, default=3,
+              help='Number of times to run each grammar; we report the best')
+@click.option('--cache_size', type=int, default=10000,
+              help='Size of the packrat cache')
+def benchmark_grammars(xml_files, repeat, cache_size):
+    """Measure the throughput of our main grammars with pyparsing's packrat
+    memoization on and off, using the regulation text, amendatory
+    instructions and headers of the provided XML files (e.g. annual editions
+    and notices). Also verifies that packrat parsing gives identical
+    results. Then compare grammars with their optimized equivalents"""
+    samples = {}
+    for xml_file in xml_files:
+        for kind, texts in samples_from(etree.parse(xml_file)).items():
+            samples.setdefault(kind, []).extend(texts)
+
+    was_enabled = ParserElement._packratEnabled
+    click.echo("{:<32}{:>8}{:>12}{:>12}{:>9}  {}".format(
+        'grammar', 'texts', 'off (/s)', 'on (/s)', 'speedup', 'results'))
+    try:
+        for name, kind, fn in GRAMMARS:
+            texts = samples[kind]
+            if not texts:
+                continue
+            disable_packrat()
+            off_time, off_results = run(fn, texts, repeat)
+            enable_packrat(cache_size)
+            on_time, on_results = run(fn, texts, repeat)
+            click.echo("{:<32}{:>8}{:>12.1f}{:>12.1f}{:>8.2f}x  {}".format(
+                name, len(texts), len(texts) / max(off_time, 1e-6),
+                len(texts) / max(on_time, 1e-6),
+                off_time / max(on_time, 1e-6),
+                'same' if off_results == on_results else 'DIFFERENT'))
+
+        disable_packrat()
+        click.echo("\n{:<32}{:>8}{:>12}{:>12}{:>9}  {}".format(
+            'grammar', 'texts', 'pyparsing', 'optimized', 'speedup',
+            'results'))
+        for name, kind, grammar, optimized in OPTIMIZED:
+            texts = samples[kind]
+            if not texts:
+                continue
+            old_time, old_results = run(_scanner(grammar), texts, repeat)
+            new_time, new_results = run(_scanner(optimized), texts, repeat)
+            click.echo("{:<32}{:>8}{:>12.1f}{:>12.1f}{:>8.2f}x  {}".format(
+                name, len(texts), len(texts) / max(old_time, 1e-6),
+                len(texts) / max(new_time, 1e-6),
+                old_time / max(new_time, 1e-6),
+                'same' if old_results == new_results else 'DIFFERENT'))
+    finally:
+        if was_enabled:
+            enable_packrat(cache_size)
+        else:
+            disable_packrat()
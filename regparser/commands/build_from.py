@@ -4,7 +4,10 @@ import click
 
 from regparser.builder import LayerCacheAggregator, tree_and_builder
 from regparser.diff.tree import changes_between
+from regparser.grammar.utils import log_prefilter_stats
+from regparser.tree.depth import derive
 from regparser.tree.struct import FrozenNode
+from regparser.tree.xml_parser import preprocessors
 
 
 logger = logging.getLogger('build_from')
@@ -41,7 +44,8 @@ def gen_diffs(reg_tree, act_title_and_section, builder, layer_cache):
         for rhs_version, rhs_tree in all_versions.iteritems():
             changes = checkpointer.checkpoint(
                 "-".join(["diff", lhs_version, rhs_version]),
-                lambda: dict(changes_between(lhs_tree, rhs_tree)))
+                lambda: dict(changes_between(lhs_tree, rhs_tree)),
+                inputs=[lhs_tree, rhs_tree])
             writer.diff(
                 label_id, lhs_version, rhs_version
             ).write(changes)
@@ -91,3 +95,11 @@ def build_from(filename, title, act_title, act_section, generate_diffs,
 
     if generate_diffs:
         gen_diffs(reg_tree, act_title_and_section, builder, layer_cache)
+
+    checkpointer = builder.checkpointer
+    if checkpointer.hits or checkpointer.misses:
+        logger.info("Checkpoints: %d hits, %d misses", checkpointer.hits,
+                    checkpointer.misses)
+    derive.cache.log_stats(logger)
+    preprocessors.log_timings(logger)
+    log_prefilter_stats(logger)
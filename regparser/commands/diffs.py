@@ -9,7 +9,7 @@ from regparser.index import dependency, entry
 @click.argument('cfr_part', type=int)
 def diffs(cfr_title, cfr_part):
     """Construct diffs between known trees."""
-    tree_dir = entry.FrozenTree(cfr_title, cfr_part)
+    tree_dir = entry.Tree(cfr_title, cfr_part)
     diff_dir = entry.Diff(cfr_title, cfr_part)
     pairs = [(lhs, rhs) for lhs in tree_dir for rhs in tree_dir]
     deps = dependency.Graph()
@@ -17,14 +17,15 @@ def diffs(cfr_title, cfr_part):
         deps.add(diff_dir / lhs_id / rhs_id, tree_dir / lhs_id)
         deps.add(diff_dir / lhs_id / rhs_id, tree_dir / rhs_id)
 
+    snapshot_dir = entry.TreeSnapshot(cfr_title, cfr_part)
     trees = {}
     for lhs_id, rhs_id in pairs:
         path = diff_dir / lhs_id / rhs_id
         deps.validate_for(path)
         if deps.is_stale(path):
             if lhs_id not in trees:
-                trees[lhs_id] = (tree_dir / lhs_id).read()
+                trees[lhs_id] = (snapshot_dir / lhs_id).read().frozen_tree()
             if rhs_id not in trees:
-                trees[rhs_id] = (tree_dir / rhs_id).read()
+                trees[rhs_id] = (snapshot_dir / rhs_id).read().frozen_tree()
 
             path.write(dict(changes_between(trees[lhs_id], trees[rhs_id])))
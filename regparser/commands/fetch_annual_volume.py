@@ -0,0 +1,23 @@
+import logging
+
+import click
+
+from regparser.history import annual
+from regparser.index import dependency, entry
+
+
+@click.command()
+@click.argument('cfr_title', type=int)
+@click.argument('year', type=int)
+@click.argument('vol_num', type=int)
+def fetch_annual_volume(cfr_title, year, vol_num):
+    """Download the annual edition of every part within a bulk volume. The
+    volume is streamed, so only one part is held in memory at a time"""
+    volume = annual.Volume(year, cfr_title, vol_num)
+    graph = dependency.Graph()
+    for cfr_part, xml in volume.part_xmls():
+        annual_entry = entry.Annual(cfr_title, cfr_part, year)
+        annual_entry.write(xml.preprocess())
+        if xml.source_is_local:
+            graph.add(str(annual_entry), xml.source)
+        logging.info("Wrote %s", annual_entry)
@@ -1,7 +1,8 @@
 import click
 
+from regparser.grammar.utils import log_prefilter_stats
 from regparser.index import dependency, entry
-from regparser.layer import ALL_LAYERS
+from regparser.layer import ALL_LAYERS, parse_cache
 
 
 def dependencies(tree_dir, layer_dir, version_dir):
@@ -50,7 +51,8 @@ def stale_layers(deps, layer_dir):
 def process_layers(stale, cfr_title, cfr_part, version, act_citation):
     """Build all of the stale layers for this version, writing them into the
     index. Assumes all dependencies have already been checked"""
-    tree = entry.Tree(cfr_title, cfr_part, version.identifier).read()
+    tree = entry.TreeSnapshot(cfr_title, cfr_part,
+                              version.identifier).read().tree()
     version_dir = entry.Version(cfr_title, cfr_part)
     layer_dir = entry.Layer(cfr_title, cfr_part)
     for layer_name in stale:
@@ -80,11 +82,15 @@ def layers(cfr_title, cfr_part, act_title, act_section):
     version_dir = entry.Version(cfr_title, cfr_part)
     deps = dependencies(tree_dir, layer_dir, version_dir)
 
-    for version_id in tree_dir:
-        stale = list(stale_layers(deps, layer_dir / version_id))
-        if stale:
-            process_layers(
-                stale, cfr_title, cfr_part,
-                version=(version_dir / version_id).read(),
-                act_citation=(act_title, act_section)
-            )
+    # Most text is shared between versions, so parse results are cached
+    with parse_cache.cached_parses(
+            str(entry.ParseCache(cfr_title, cfr_part))):
+        for version_id in tree_dir:
+            stale = list(stale_layers(deps, layer_dir / version_id))
+            if stale:
+                process_layers(
+                    stale, cfr_title, cfr_part,
+                    version=(version_dir / version_id).read(),
+                    act_citation=(act_title, act_section)
+                )
+    log_prefilter_stats()
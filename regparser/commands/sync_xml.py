@@ -1,6 +1,18 @@
+import os
+
 import click
+import git
+
+from regparser.index.xml_sync import GIT_DIR
+import settings
+
 
-from regparser.index.xml_sync import sync
+def sync():
+    if os.path.isdir(GIT_DIR):
+        repo = git.Repo.init(GIT_DIR)
+    else:
+        repo = git.Repo.clone_from(settings.XML_REPO, GIT_DIR)
+    repo.remote().pull()
 
 
 @click.command()
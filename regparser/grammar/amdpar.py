@@ -3,11 +3,12 @@
 import logging
 import string
 
-from pyparsing import CaselessLiteral, FollowedBy, OneOrMore, Optional
-from pyparsing import Suppress, Word, LineEnd, ZeroOrMore
+from pyparsing import CaselessLiteral, FollowedBy, MatchFirst, OneOrMore
+from pyparsing import Optional, Suppress, Word, LineEnd, ZeroOrMore
 
 from regparser.grammar import atomic, tokens, unified
-from regparser.grammar.utils import Marker, WordBoundaries
+from regparser.grammar.utils import (
+    Marker, TriggeredMatchFirst, WordBoundaries)
 from regparser.tree.paragraph import p_levels
 
 
@@ -430,43 +431,59 @@ override_label = (
     ).setParseAction(tokenize_override_ps)
 
 
-#   grammar which captures all of these possibilities
-token_patterns = (
-    put_active | put_passive | post_active | post_passive
-    | delete_active | delete_passive | move_active | move_passive
-    | designate_active | reserve_active
-
-    | interp | marker_subpart | appendix
-    | comment_context_with_section | comment_context_without_section
-    | comment_context_under_with_section
-    | paragraph_heading_of | section_heading_of | intro_text_of
-    | appendix_section_heading_of
-    | intro_text_of_interp
-    | comment_heading | appendix_subheading | section_paragraph_heading_of
+#   All of these possibilities, in order of precedence, each with a regex
+#   which must be found in the upper-cased text for it to match (see
+#   TriggeredMatchFirst)
+_token_alternatives = [
+    (put_active, u'REVIS|CORRECT'), (put_passive, u'REVISED|CORRECTED'),
+    (post_active, u'ADD'), (post_passive, u'ADDED'),
+    (delete_active, u'REMOV'), (delete_passive, u'REMOVED'),
+    (move_active, u'REDESIGNAT'), (move_passive, u'REDESIGNATED'),
+    (designate_active, u'DESIGNATE'), (reserve_active, u'RESERV'),
+
+    (interp, u'COMMENT|OFFICIAL|SUPPLEMENT'), (marker_subpart, u'SUBPART'),
+    (appendix, u'APPENDIX'),
+    (comment_context_with_section, u'COMMENT|PARAGRAPH'),
+    (comment_context_without_section, u'PARAGRAPH'),
+    (comment_context_under_with_section, u'UNDER'),
+    (paragraph_heading_of, u'HEADING'), (section_heading_of, u'HEADING'),
+    (intro_text_of, u'INTRODUCTORY|SUBJECT'),
+    (appendix_section_heading_of, u'HEADING'),
+    (intro_text_of_interp, u'INTRODUCTORY|SUBJECT'),
+    (comment_heading, u'HEADING'), (appendix_subheading, u'HEADING'),
+    (section_paragraph_heading_of, u'HEADING'),
     # Must come after other headings as it is a catch-all
-    | section_heading
-    | multiple_paragraph_sections | section_single_par
-    | multiple_interp_entries
-
-    | multiple_sections | multiple_paragraphs | multiple_appendices
-    | multiple_comment_pars | multiple_comments
+    (section_heading, u'HEADING'),
+    (multiple_paragraph_sections, u'§|SECTION'),
+    (section_single_par, u'§|SECTION'),
+    (multiple_interp_entries, u'ENTRIES'),
+
+    (multiple_sections, u'§§|SECTIONS'), (multiple_paragraphs, u'PARAGRAPH'),
+    (multiple_appendices, u'-'), (multiple_comment_pars, u'PARAGRAPHS'),
+    (multiple_comments, u'COMMENTS'),
     #   Must come after multiple_appendices
-    | appendix_section
+    (appendix_section, u'-'),
     #   Must come after multiple_pars
-    | single_par_section | single_par
+    (single_par_section, u'§|SECTION'), (single_par, u'PARAGRAPH'),
     #   Must come after multiple_comment_pars
-    | single_comment_with_section | single_comment_par
+    (single_comment_with_section, u'COMMENT|PARAGRAPH'),
+    (single_comment_par, u'PARAGRAPH'),
     #   Must come after section_single_par
-    | section
+    (section, u'§|SECTION'),
     #   Must come after intro_text_of
-    | intro_text
+    (intro_text, u'INTRODUCTORY|SUBJECT'),
 
     # Finally allow for an explicit override label
-    | override_label
+    (override_label, r'\['),
 
-    | paragraph_context
-    | and_token
-)
+    (paragraph_context, r'\('),
+    (and_token, u'AND'),
+]
+
+#   grammar which captures all of these possibilities
+token_patterns = MatchFirst([grammar for grammar, _ in _token_alternatives])
+#   equivalent, but only attempts the alternatives which may match the text
+triggered_token_patterns = TriggeredMatchFirst(_token_alternatives)
 
 subpart_label = (atomic.part + Suppress('-')
                  + atomic.subpart_marker + Suppress(':')
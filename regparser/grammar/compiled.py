@@ -0,0 +1,146 @@
+# vim: set encoding=utf-8
+"""Regular expression equivalents of our purely regular (and most
+frequently run) grammars. Each mirrors the pyparsing grammar of the same
+name, element by element; see utils.RegexGrammar. Notably, pyparsing skips
+whitespace before each element, including before an Optional(And) which
+then fails to match"""
+from regparser.grammar.utils import (
+    regex_caseless, regex_literal, regex_named, regex_token, RegexGrammar)
+from regparser.grammar.utils import REGEX_WS as WS
+
+
+def _word_marker(text):
+    """Equivalent to atomic.Marker (without whitespace)"""
+    return r'(?<![A-Za-z0-9])' + regex_caseless(text) + r'(?![A-Za-z0-9])'
+
+
+def _skip_to_line_end():
+    """Equivalent to SkipTo(LineEnd())"""
+    return r'[ \t\r]*' + regex_token(r'[^\n]*')
+
+
+# atomic
+def _lower_p():
+    return (r'\(' + WS + regex_token(r'[ivx]{1}|[a-hj-uwyz]{1,2}', 'p1')
+            + WS + r'\)')
+
+
+def _digit_p():
+    return r'\(' + WS + regex_token(r'[0-9]+', 'p2') + WS + r'\)'
+
+
+def _roman_p():
+    return r'\(' + WS + regex_token(r'[ivxlcdm]+', 'p3') + WS + r'\)'
+
+
+def _upper_p():
+    return r'\(' + WS + regex_token(r'[A-Z]+', 'p4') + WS + r'\)'
+
+
+def _em_p(chars):
+    return (r'\(<E[^>]*>' + WS + regex_token(chars, 'p5') + WS
+            + r'</E>\)')
+
+
+def _plaintext_p(chars, name):
+    return r'\(' + WS + regex_token(chars, name) + WS + r'\)'
+
+
+def _section():
+    return regex_token(r'[0-9]+[a-z]*', 'section')
+
+
+# unified
+def _depth6_p():
+    return (u'(?:' + _em_p(r'[ivxlcdm]+')
+            + u'|' + _plaintext_p(r'[ivxlcdm]+', 'plaintext_p6') + u')')
+
+
+def _depth5_p():
+    return (u'(?:' + _em_p(r'[0-9]+')
+            + u'|' + _plaintext_p(r'[0-9]+', 'plaintext_p5') + u')'
+            # Optional(MatchFirst) skips whitespace only if it matches
+            + u'(?:' + WS + _depth6_p() + u')?')
+
+
+def _depth4_p():
+    return _upper_p() + WS + u'(?:' + _depth5_p() + u')?'
+
+
+def _depth3_p():
+    return _roman_p() + WS + u'(?:' + _depth4_p() + u')?'
+
+
+def _depth2_p():
+    return _digit_p() + WS + u'(?:' + _depth3_p() + u')?'
+
+
+def _depth1_p():
+    not_followed_by_upper = (
+        u'(?!' + WS + r'\(' + WS + r'[A-Z]+' + WS + r'\))')
+    return (_lower_p() + not_followed_by_upper + WS
+            + u'(?:' + _depth2_p() + u')?')
+
+
+def _any_depth_p():
+    return u'(?:' + u'|'.join(depth() for depth in (
+        _depth1_p, _depth2_p, _depth3_p, _depth4_p, _depth5_p,
+        _depth6_p)) + u')'
+
+
+lower_p = RegexGrammar(_lower_p())
+digit_p = RegexGrammar(_digit_p())
+roman_p = RegexGrammar(_roman_p())
+upper_p = RegexGrammar(_upper_p())
+any_depth_p = RegexGrammar(_any_depth_p())
+
+
+# interpretation_headers
+def _header_section():
+    return (u'(?:§|Section|section)' + WS + regex_token(r'[0-9]+', 'part')
+            + WS + r'\.' + WS + _section() + _skip_to_line_end())
+
+
+def _header_marker_par():
+    return _word_marker('paragraph') + WS + _section() + WS + _depth1_p()
+
+
+def _header_par():
+    return _section() + WS + _depth1_p() + _skip_to_line_end()
+
+
+def _header_appendix():
+    return (_word_marker('appendix') + WS
+            + regex_token(r'[A-Z]+[0-9]*\b', 'appendix')
+            + _skip_to_line_end())
+
+
+interpretation_headers = RegexGrammar(
+    r'(?<![^\n])(?:' + u'|'.join(header() for header in (
+        _header_section, _header_marker_par, _header_par,
+        _header_appendix)) + u')')
+
+
+# external_citations
+def _digits():
+    return regex_token(r'[0-9]+')
+
+
+def _literals(*texts):
+    return WS.join(regex_literal(text) for text in texts)
+
+
+_uscode = regex_named(
+    _digits() + WS + _literals('U.S.C.') + WS + _digits(), 'USC')
+_cfr_v1 = regex_named(
+    _digits() + WS + _literals('CFR', 'part') + WS + _digits(), 'V1')
+_cfr_v2 = regex_named(
+    _digits() + WS + _literals('CFR') + WS + _digits() + WS
+    + _literals('.') + WS + _digits(), 'V2')
+_the_act = _literals('the', 'Act')
+_public_law = (_literals('Public', 'Law') + WS + _digits() + WS
+               + _literals('-') + WS + _digits())
+_stat_at_large = _digits() + WS + _literals('Stat.') + WS + _digits()
+
+regtext_external_citation = RegexGrammar(u'(?:' + u'|'.join([
+    _uscode, _cfr_v1, _cfr_v2, _the_act, _public_law, _stat_at_large]) + u')')
@@ -2,6 +2,8 @@
 import string
 from pyparsing import Word, Literal
 
+from regparser.grammar.utils import Prefilter
+
 """ Contruct a grammar that parses references/citations to the United States
 Code, the Code of Federal Regulations, Public Law and Statues at Large. """
 
@@ -24,3 +26,8 @@ stat_at_large_exp = Word(string.digits) +\
 
 regtext_external_citation = uscode_exp.setResultsName('USC') |\
     cfr_exp | the_act_exp | public_law_exp | stat_at_large_exp
+
+# Each of the above requires one of these
+regtext_external_citation_prefilter = Prefilter(
+    'external_citations.regtext_external_citation',
+    r'U\.S\.C\.|CFR|Act|Law|Stat\.')
@@ -4,7 +4,7 @@ from pyparsing import (
     Word, ZeroOrMore)
 
 from regparser.grammar import atomic, unified
-from regparser.grammar.utils import DocLiteral, keep_pos, Marker
+from regparser.grammar.utils import DocLiteral, keep_pos, Marker, Prefilter
 
 
 smart_quotes = (
@@ -13,6 +13,7 @@ smart_quotes = (
         DocLiteral(u'”', "right-smart-quote")
     ).setParseAction(keep_pos).setResultsName("term")
 )
+smart_quotes_prefilter = Prefilter('terms.smart_quotes', u'“')
 
 e_tag = (
     Suppress(Regex(r"<E[^>]*>"))
@@ -1,11 +1,30 @@
-from pyparsing import alphanums, CaselessLiteral, getTokensEndLoc, Literal
+import itertools
+import logging
+import re
+import sys
+
+from pyparsing import alphanums, CaselessLiteral, Literal, MatchFirst
+from pyparsing import ParseFatalException, ParserElement, ParseResults
 from pyparsing import Suppress, WordEnd, WordStart
 
 
+def _tokens_end_loc():
+    """Equivalent to pyparsing's getTokensEndLoc, which inspects (and reads
+    the source files of) the whole stack each time it's called. We only
+    need the frames"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        if frame.f_code.co_name == '_parseNoCache':
+            return frame.f_locals['loc']
+        frame = frame.f_back
+    raise ParseFatalException("incorrect usage of getTokensEndLoc - may "
+                              "only be called from within a parse action")
+
+
 def keep_pos(source, location, tokens):
     """Wrap the tokens with a class that also keeps track of the match's
     location."""
-    return (WrappedResult(tokens, location, getTokensEndLoc()),)
+    return (WrappedResult(tokens, location, _tokens_end_loc()),)
 
 
 class WrappedResult():
@@ -37,3 +56,191 @@ def Marker(txt):
 
 def SuffixMarker(txt):
     return Suppress(CaselessLiteral(txt) + WordEnd(alphanums))
+
+
+# All Prefilters, in order of creation
+prefilters = []
+
+
+class Prefilter(object):
+    """Most text contains nothing which a particular grammar could match,
+    yet pyparsing's scanString will still attempt the grammar at every
+    position. A Prefilter is a regex which must be found within the text
+    for the grammar to match at all; texts without it are skipped. We count
+    the skipped and scanned texts to see how much parsing is saved"""
+    def __init__(self, name, pattern, flags=0):
+        self.name = name
+        self.regex = re.compile(pattern, flags)
+        self.skipped, self.scanned = 0, 0
+        prefilters.append(self)
+
+    def matches(self, text):
+        if self.regex.search(text):
+            self.scanned += 1
+            return True
+        else:
+            self.skipped += 1
+            return False
+
+    def scan(self, grammar, text):
+        """Equivalent to grammar.scanString(text)"""
+        if self.matches(text):
+            return grammar.scanString(text)
+        else:
+            return iter(())
+
+
+class TriggeredMatchFirst(object):
+    """Equivalent to a MatchFirst of many alternatives, each of which is
+    paired with a trigger: a regex which must be found within the
+    (upper-cased) text for that alternative to match at all. When scanning,
+    we skip the alternatives whose triggers are absent, so pyparsing
+    doesn't attempt them at every position. The reduced MatchFirsts are
+    shared between texts with the same triggers"""
+    def __init__(self, alternatives):
+        self.alternatives = [(grammar, re.compile(trigger, re.UNICODE))
+                             for grammar, trigger in alternatives]
+        self._by_triggers = {}
+
+    def grammar_for(self, text):
+        """A MatchFirst of only those alternatives which may match the
+        text, or None if none can"""
+        upper = text.upper()
+        key = tuple(bool(trigger.search(upper))
+                    for _, trigger in self.alternatives)
+        if key not in self._by_triggers:
+            grammars = [grammar for (grammar, _), found
+                        in zip(self.alternatives, key) if found]
+            self._by_triggers[key] = MatchFirst(grammars) if grammars else None
+        return self._by_triggers[key]
+
+    def scanString(self, text):
+        grammar = self.grammar_for(text)
+        if grammar is None:
+            return iter(())
+        return grammar.scanString(text)
+
+
+def log_prefilter_stats(logger=logging):
+    for prefilter in prefilters:
+        if prefilter.skipped or prefilter.scanned:
+            logger.info("%s: skipped %d of %d texts", prefilter.name,
+                        prefilter.skipped,
+                        prefilter.skipped + prefilter.scanned)
+
+
+class _BoundedCache(dict):
+    """pyparsing's packrat cache is only cleared at the start of each parse
+    or scan, so a long text may fill it with many entries. We clear it
+    whenever it's full"""
+    def __init__(self, max_size):
+        super(_BoundedCache, self).__init__()
+        self.max_size = max_size
+
+    def __setitem__(self, key, value):
+        if len(self) >= self.max_size:
+            self.clear()
+        super(_BoundedCache, self).__setitem__(key, value)
+
+
+def enable_packrat(cache_size=10000):
+    """Memoize the results of each sub-grammar at each position of the text
+    (i.e. "packrat" parsing), which saves re-parsing when alternatives
+    backtrack. Applies to all grammars. Only for benchmarking: with pyparsing
+    2.0.5, packrat shallow-copies named results, which changes the results of
+    the AMDPAR grammar (see the `benchmark_grammars` command)"""
+    ParserElement._exprArgCache = _BoundedCache(cache_size)
+    ParserElement.enablePackrat()
+
+
+def disable_packrat():
+    """Reverts `enable_packrat`; pyparsing has no equivalent"""
+    ParserElement._packratEnabled = False
+    ParserElement._parse = ParserElement._parseNoCache
+    ParserElement._exprArgCache = {}
+
+
+# Whitespace which pyparsing skips before each element, by default
+REGEX_WS = r'[ \n\t\r]*'
+_regex_group_ids = itertools.count()
+
+
+def regex_token(pattern, name=''):
+    """Part of a RegexGrammar's pattern. The matched text becomes a token
+    and, if `name` is provided, a named result"""
+    return u'(?P<{0}__t{1}>{2})'.format(
+        name, next(_regex_group_ids), pattern)
+
+
+def regex_literal(text, name=''):
+    """Like a pyparsing Literal, the token is the (byte) string `text`, even
+    when scanning unicode"""
+    return u'(?P<{0}__l{1}>{2})'.format(
+        name, next(_regex_group_ids), re.escape(text))
+
+
+def regex_named(pattern, name):
+    """Several tokens which together form a named result, as when setting a
+    results name on a pyparsing And"""
+    return u'(?P<{0}__g{1}>{2})'.format(
+        name, next(_regex_group_ids), pattern)
+
+
+def regex_caseless(text):
+    """Equivalent to a CaselessLiteral (which we always suppress)"""
+    return u''.join(u'[{0}{1}]'.format(c.upper(), c.lower()) if c.isalpha()
+                    else re.escape(c) for c in text)
+
+
+class RegexGrammar(object):
+    """Some of our grammars are regular, yet pyparsing matches them one
+    element (and one Python call) at a time. A RegexGrammar is an equivalent
+    compiled regular expression, built from `regex_token`, `regex_literal`,
+    etc. Its scanString yields the same ParseResults (tokens and named
+    results) and offsets as the pyparsing grammar's. As pyparsing doesn't
+    backtrack, the pattern must be written such that the regex never does
+    so in a way which changes the match"""
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self._regex, self._groups = None, []
+
+    @property
+    def regex(self):
+        """Compiled on first use, so that importing grammars stays cheap"""
+        if self._regex is None:
+            self._regex = re.compile(self.pattern)
+            for group_name, index in sorted(self._regex.groupindex.items(),
+                                            key=lambda pair: pair[1]):
+                name, kind = group_name.rsplit('__', 1)
+                self._groups.append((index, name, kind[0]))
+        return self._regex
+
+    def _results(self, match):
+        tokens, names = [], []
+        for index, name, kind in self._groups:
+            value = match.group(index)
+            if value is None:
+                continue
+            elif kind == 'g':
+                names.append((name, match.span(index)))
+                continue
+            elif kind == 'l':
+                value = str(value)
+            tokens.append((match.start(index), value))
+            if name and value:
+                names.append((name, value))
+
+        results = ParseResults([token for _, token in tokens])
+        for name, value in names:
+            if isinstance(value, tuple):    # span of several tokens
+                start, end = value
+                value = ParseResults([token for pos, token in tokens
+                                      if start <= pos < end])
+            results[name] = value
+        return results
+
+    def scanString(self, text):
+        """Equivalent to pyparsing's scanString (including tab expansion)"""
+        text = text.expandtabs()
+        for match in self.regex.finditer(text):
+            yield self._results(match), match.start(), match.end()
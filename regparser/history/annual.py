@@ -4,6 +4,7 @@ import logging
 import os
 import re
 
+from lxml import etree
 import requests
 
 from regparser.federalregister import fetch_notice_json
@@ -80,16 +81,65 @@ class Volume(namedtuple('Volume', ['year', 'title', 'vol_num'])):
         """Pull the XML for an annual edition, first checking locally"""
         url = CFR_PART_URL.format(year=self.year, title=self.title,
                                   volume=self.vol_num, part=part)
-        filename = url.split('/')[-1]
-        for xml_path in settings.LOCAL_XML_PATHS + [xml_sync.GIT_DIR]:
-            xml_path = os.path.join(xml_path, 'annual', filename)
-            if os.path.isfile(xml_path):
-                with open(xml_path) as f:
-                    return XMLWrapper(f.read(), xml_path)
+        xml_path = _local_copy(url)
+        if xml_path:
+            with open(xml_path) as f:
+                return XMLWrapper(f.read(), xml_path)
         response = requests.get(url)
         if response.status_code == 200:
             return XMLWrapper(response.content, url)
 
+    def part_xmls(self, parts=None):
+        """Stream the whole volume (first checking locally), yielding a
+        (part number, XMLWrapper) pair for each PART within it. If `parts`
+        is given, only those parts are yielded"""
+        xml_path = _local_copy(self.url)
+        if xml_path:
+            with open(xml_path, 'rb') as f:
+                for pair in iter_part_xmls(f, xml_path, parts):
+                    yield pair
+        else:
+            response = requests.get(self.url, stream=True)
+            if response.status_code == 200:
+                response.raw.decode_content = True
+                for pair in iter_part_xmls(response.raw, self.url, parts):
+                    yield pair
+
+
+def _local_copy(url):
+    """Path to a local copy of this annual edition file, if present"""
+    filename = url.split('/')[-1]
+    for xml_path in settings.LOCAL_XML_PATHS + [xml_sync.GIT_DIR]:
+        xml_path = os.path.join(xml_path, 'annual', filename)
+        if os.path.isfile(xml_path):
+            return xml_path
+
+
+def _part_number(part_xml):
+    """Parts are labeled like <EAR>Pt. 1005</EAR>"""
+    for ear in part_xml.iterchildren('EAR'):
+        match = re.match(r'\s*Pt\.\s*(\d+)', ear.text or '')
+        if match:
+            return int(match.group(1))
+
+
+def iter_part_xmls(xml_file, source=None, parts=None):
+    """Yield a (part number, XMLWrapper) pair for each PART in a bulk volume
+    (a file-like object), without reading the whole volume into memory:
+    each PART is copied into its XMLWrapper and then cleared"""
+    for _, part_xml in etree.iterparse(xml_file, tag='PART', huge_tree=True):
+        part = _part_number(part_xml)
+        if part is None:
+            logging.warning("Can't find the part number of a PART in %s",
+                            source)
+        elif parts is None or part in parts:
+            yield part, XMLWrapper(part_xml, source)
+        # Free the PART, as well as any (already cleared) which preceded it
+        part_xml.clear()
+        parent = part_xml.getparent()
+        while part_xml.getprevious() is not None:
+            del parent[0]
+
 
 def annual_edition_for(title, notice):
     """Annual editions are published for different titles at different
@@ -5,6 +5,7 @@ import os
 from regparser.history.versions import Version as VersionStruct
 from regparser.notice.encoder import AmendmentEncoder
 from regparser.notice.xml import NoticeXML
+from regparser.tree import snapshot
 from regparser.tree.struct import (
     frozen_node_decode_hook, full_node_decode_hook, FullNodeEncoder)
 from regparser.tree.xml_parser.xml_wrapper import XMLWrapper
@@ -129,6 +130,23 @@ class FrozenTree(Tree):
     JSON_DECODER = staticmethod(frozen_node_decode_hook)
 
 
+class TreeSnapshot(Entry):
+    """Read-only, memory-mapped copies of Trees, keyed by snapshot. These are
+    (re)generated from the corresponding Tree when missing or out of date"""
+    PREFIX = (ROOT, 'snapshot')
+
+    def serialize(self, content):
+        return snapshot.serialize(content)
+
+    def read(self):
+        tree_entry = Tree(*self._path)
+        path = str(self)
+        if (not os.path.exists(path)
+                or os.path.getmtime(path) < os.path.getmtime(str(tree_entry))):
+            self.write(tree_entry.read())
+        return snapshot.Snapshot(path)
+
+
 class RuleChanges(_JSONEntry):
     """Processes notices, keyed by rule_changes"""
     PREFIX = (ROOT, 'rule_changes')
@@ -149,3 +167,10 @@ class Layer(_JSONEntry):
 class Diff(_JSONEntry):
     """Processes diffs, keyed by diff"""
     PREFIX = (ROOT, 'diff')
+
+
+class ParseCache(Entry):
+    """Grammar results shared between versions (see
+    regparser.layer.parse_cache), keyed by parse_cache. Read and written by
+    the cache itself"""
+    PREFIX = (ROOT, 'parse_cache')
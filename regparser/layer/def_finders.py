@@ -6,6 +6,7 @@ import re
 
 from regparser.citations import Label
 from regparser.grammar import terms as grammar
+from regparser.layer import parse_cache
 from regparser.tree.struct import Node
 import settings
 
@@ -67,11 +68,19 @@ class SmartQuotes(FinderBase):
     def find(self, node):
         refs = []
         if self.stack and self.has_def_indicator():
-            for match, _, _ in grammar.smart_quotes.scanString(node.text):
-                term = match.term.tokens[0].strip(',.;')
-                refs.append(Ref(term, node.label_id(), match.term.pos[0]))
+            for term, start in parse_cache.fetch_or_compute(
+                    'terms.smart_quotes', None, node.text,
+                    lambda: self.matches(node.text)):
+                refs.append(Ref(term, node.label_id(), start))
         return refs
 
+    @staticmethod
+    def matches(text):
+        """(term, start) pairs"""
+        return [(match.term.tokens[0].strip(',.;'), match.term.pos[0])
+                for match, _, _ in grammar.smart_quotes_prefilter.scan(
+                    grammar.smart_quotes, text)]
+
     def has_def_indicator(self):
         """With smart quotes, we catch some false positives, phrases in quotes
         that are not terms. This extra test lets us know that a parent of the
@@ -96,17 +105,25 @@ class ScopeMatch(FinderBase):
 
     def find(self, node):
         refs = []
-        for match, _, _ in grammar.scope_term_type_parser.scanString(
-                node.text):
+        for scope, term, term_start in parse_cache.fetch_or_compute(
+                'terms.scope_term_type_parser', None, node.text,
+                lambda: self.matches(node.text)):
             valid_scope = self.finder.scope_of_text(
-                match.scope, Label.from_node(node), verify_prefix=False)
-            valid_term = re.match("^[a-z ]+$", match.term.tokens[0])
+                scope, Label.from_node(node), verify_prefix=False)
+            valid_term = re.match("^[a-z ]+$", term)
             if valid_scope and valid_term:
-                term = match.term.tokens[0].strip()
-                pos_start = node.text.index(term, match.term.pos[0])
+                term = term.strip()
+                pos_start = node.text.index(term, term_start)
                 refs.append(Ref(term, node.label_id(), pos_start))
         return refs
 
+    @staticmethod
+    def matches(text):
+        """(scope, term, term start) triples"""
+        return [(match.scope, match.term.tokens[0], match.term.pos[0])
+                for match, _, _
+                in grammar.scope_term_type_parser.scanString(text)]
+
 
 class XMLTermMeans(FinderBase):
     """Namespace for a matcher for e.g. '<E>XXX</E> means YYY'"""
@@ -119,17 +136,27 @@ class XMLTermMeans(FinderBase):
     def find(self, node):
         refs = []
         tagged_text = getattr(node, 'tagged_text', '')
-        for match, _, _ in grammar.xml_term_parser.scanString(tagged_text):
+        for token, start, end in parse_cache.fetch_or_compute(
+                'terms.xml_term_parser', None, tagged_text,
+                lambda: self.matches(tagged_text)):
             """Position in match reflects XML tags, so its dropped in
             preference of new values based on node.text."""
-            for match in chain([match.head], match.tail):
-                pos_start = self.pos_start(match.term.tokens[0], node.text)
-                term = node.tagged_text[match.term.pos[0]:match.term.pos[1]]
-                ref = Ref(term, node.label_id(), pos_start)
-                refs.append(ref)
-                self.exclusions.append(ref)
+            pos_start = self.pos_start(token, node.text)
+            term = node.tagged_text[start:end]
+            ref = Ref(term, node.label_id(), pos_start)
+            refs.append(ref)
+            self.exclusions.append(ref)
         return refs
 
+    @staticmethod
+    def matches(tagged_text):
+        """(first token, start, end) of each term, in order"""
+        terms = []
+        for match, _, _ in grammar.xml_term_parser.scanString(tagged_text):
+            for match in chain([match.head], match.tail):
+                terms.append((match.term.tokens[0],) + match.term.pos)
+        return terms
+
     def pos_start(self, needle, haystack):
         """Search for the first instance of `needle` in the `haystack`
         excluding any overlaps from `self.exclusions`. Implicitly returns None
@@ -1,6 +1,8 @@
 # vim: set encoding=utf-8
 from collections import defaultdict
+from regparser.grammar import compiled
 from regparser.grammar import external_citations as grammar
+from regparser.layer import parse_cache
 
 from layer import Layer
 
@@ -33,18 +35,23 @@ class ExternalCitationParser(Layer):
 
     def parse(self, text, parts=None):
         """ Parse the provided text, pulling out all the citations. """
-        parser = grammar.regtext_external_citation
+        parser = compiled.regtext_external_citation
+        prefilter = grammar.regtext_external_citation_prefilter
+        matches = parse_cache.fetch_or_compute(
+            'external_citations', None, text,
+            lambda: [(citation.asList(), start, end) for citation, start, end
+                     in prefilter.scan(parser, text)])
 
         cm = defaultdict(list)
         citation_strings = {}
-        for citation, start, end in parser.scanString(text):
+        for citation, start, end in matches:
             # Citations of the form XX CFR YY should be ignored if they are of
             # the title/part being parsed (as they aren't external citations)
             if (citation[0] != self.cfr_title or citation[1] != 'CFR'
                     or citation[2] != parts[0]):
                 index = "-".join(citation)
                 cm[index].append([start, end])
-                citation_strings[index] = citation.asList()
+                citation_strings[index] = citation
 
         def build_layer_element(k, offsets):
             layer_element = {
@@ -2,6 +2,7 @@
 import logging
 
 from regparser.citations import internal_citations, Label
+from regparser.layer import parse_cache
 from regparser.layer.layer import Layer
 from regparser.tree.struct import walk
 
@@ -44,8 +45,10 @@ class InternalCitationParser(Layer):
 
         to_layer = lambda pc: {'offsets': [(pc.start, pc.end)],
                                'citation': pc.label.to_list()}
-        citations = internal_citations(text, label,
-                                       require_marker=True, title=title)
+        citations = parse_cache.fetch_or_compute(
+            'internal_citations', (label.cache_key(), title, True), text,
+            lambda: internal_citations(text, label, require_marker=True,
+                                       title=title))
         if self.verify_citations:
             citations = self.remove_missing_citations(citations, text)
         all_citations = list(map(to_layer, citations))
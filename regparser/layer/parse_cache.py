@@ -0,0 +1,108 @@
+"""Between versions of a regulation, nearly all of the text is unchanged, yet
+each version's layers re-run the same grammars over it. Within a
+`cached_parses` context, grammar results are cached by the grammar, the
+context of the parse (e.g. the label and CFR title) and a digest of the
+text. The cache can be persisted to a file (see the `layers` command) so
+that building layers for a new version only parses the text which
+changed."""
+import cPickle
+from contextlib import contextmanager
+import hashlib
+import logging
+import os
+import tempfile
+
+
+# Bump when the grammars or cached values change, so that persisted results
+# are ignored
+VERSION = 2
+
+
+def cache_key(grammar_id, context, text):
+    if isinstance(text, unicode):
+        text = text.encode('utf-8')
+    return (grammar_id, context, hashlib.sha256(text).hexdigest())
+
+
+class ParseCache(object):
+    """Grammar results, optionally loaded from and saved to a file. Only the
+    entries used since loading are saved, so results for text which no
+    longer appears are eventually dropped"""
+    def __init__(self, path=None):
+        self.path = path
+        self._loaded = self._read()
+        self._entries = {}
+        self.hits, self.misses = 0, 0
+
+    def _read(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'rb') as f:
+                version, entries = cPickle.load(f)
+            if version == VERSION:
+                return entries
+        except (cPickle.UnpicklingError, EOFError, AttributeError,
+                ImportError, IndexError, ValueError, TypeError):
+            logging.warning("Ignoring corrupt parse cache: %s", self.path)
+        return {}
+
+    def save(self):
+        """Write via a temporary file so that a failed write never leaves a
+        partial cache. Nothing's written if there were no new results"""
+        if not self.path or not self.misses:
+            return
+        dirname = os.path.dirname(self.path) or '.'
+        if not os.path.exists(dirname):
+            os.makedirs(dirname)
+        handle, tmp_name = tempfile.mkstemp(dir=dirname)
+        with os.fdopen(handle, 'wb') as f:
+            cPickle.dump((VERSION, self._entries), f,
+                         cPickle.HIGHEST_PROTOCOL)
+        os.rename(tmp_name, self.path)
+
+    def fetch_or_compute(self, grammar_id, context, text, compute):
+        key = cache_key(grammar_id, context, text)
+        if key in self._entries:
+            self.hits += 1
+        elif key in self._loaded:
+            self.hits += 1
+            self._entries[key] = self._loaded[key]
+        else:
+            self.misses += 1
+            self._entries[key] = compute()
+        return self._entries[key]
+
+    def log_stats(self, logger=logging):
+        logger.info("Parse cache: %d hits, %d misses", self.hits,
+                    self.misses)
+
+
+# When active (see `cached_parses`), the current ParseCache
+_cache = None
+
+
+@contextmanager
+def cached_parses(path=None):
+    """Within this context, grammar results requested via
+    `fetch_or_compute` are cached (and persisted to `path`, if present)"""
+    global _cache
+    if _cache is not None:      # already caching
+        yield
+        return
+    _cache = ParseCache(path)
+    try:
+        yield
+        _cache.save()
+        _cache.log_stats()
+    finally:
+        _cache = None
+
+
+def fetch_or_compute(grammar_id, context, text, compute):
+    """Results of compute(), which runs `grammar_id` over `text`. The
+    context must be hashable and include every other input to the parse.
+    Results must be picklable and must not be modified by the caller"""
+    if _cache is None:
+        return compute()
+    return _cache.fetch_or_compute(grammar_id, context, text, compute)
@@ -2,6 +2,7 @@ from collections import defaultdict
 import re
 
 from regparser.citations import internal_citations, Label
+from regparser.layer import parse_cache
 from regparser.tree import struct
 
 
@@ -42,7 +43,10 @@ class ScopeFinder(object):
         indicates. Implicit return None if none is found."""
         scopes = []
         #   First, make a list of potential scope indicators
-        citations = internal_citations(text, label_struct, require_marker=True)
+        citations = parse_cache.fetch_or_compute(
+            'internal_citations', (label_struct.cache_key(), None, True),
+            text, lambda: internal_citations(text, label_struct,
+                                             require_marker=True))
         indicators = [(c.full_start, c.label.to_list()) for c in citations]
         text = text.lower()
         label_list = label_struct.to_list()
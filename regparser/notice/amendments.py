@@ -0,0 +1,116 @@
+from regparser.tree.struct import Node
+
+
+class Amendment(object):
+    """ An Amendment object contains all the information necessary for
+    an amendment. """
+
+    TITLE = '[title]'
+    TEXT = '[text]'
+    HEADING = '[heading]'
+
+    def remove_intro(self, l):
+        """ Remove the marker that indicates this is a change to introductory
+        text. """
+        l = l.replace(self.TITLE, '').replace(self.TEXT, '')
+        return l.replace(self.HEADING, '')
+
+    def fix_interp_format(self, components):
+        """Convert between the interp format of amendments and the normal,
+        node label format"""
+        if ['Interpretations'] == components[1:2]:
+            if len(components) > 2:
+                new_style = [components[0],
+                             components[2].replace('Appendix:', '')]
+                # Add paragraphs
+                if len(components) > 3:
+                    paragraphs = [p.strip('()')
+                                  for p in components[3].split(')(')]
+                    paragraphs = filter(bool, paragraphs)
+                    new_style.extend(paragraphs)
+                new_style.append(Node.INTERP_MARK)
+                # Add any paragraphs of the comment
+                new_style.extend(components[4:])
+                return new_style
+            else:
+                return components[:1] + [Node.INTERP_MARK]
+        return components
+
+    def fix_appendix_format(self, components):
+        """Convert between the appendix format of amendments and the normal,
+        node label format"""
+        return [c.replace('Appendix:', '') for c in components]
+
+    def fix_label(self, label):
+        """ The labels that come back from parsing the list of amendments
+        are not the same type we use in the rest of parsing. Convert between
+        the two here (removing question markers, converting to interp
+        format, etc.)"""
+        def wanted(l):
+            return l != '?' and 'Subpart' not in l
+
+        components = label.split('-')
+        components = [self.remove_intro(l) for l in components if wanted(l)]
+        components = self.fix_interp_format(components)
+        components = self.fix_appendix_format(components)
+        return components
+
+    def __init__(self, action, label, destination=None):
+        self.action = action
+        self.original_label = label
+        self.label = self.fix_label(self.original_label)
+
+        if destination and '-' in destination:
+            self.destination = self.fix_interp_format(destination.split('-'))
+        else:
+            self.destination = destination
+
+        if self.TITLE in self.original_label:
+            self.field = self.TITLE
+        elif self.TEXT in self.original_label:
+            self.field = self.TEXT
+        elif self.HEADING in self.original_label:
+            self.field = self.HEADING
+        else:
+            self.field = None
+
+    def label_id(self):
+        """ Return the label id (dash delimited) for this label. """
+        return '-'.join(self.label)
+
+    def __repr__(self):
+        if self.destination:
+            return '(%s, %s, %s)' % (self.action, self.label, self.destination)
+        else:
+            return '(%s, %s)' % (self.action, self.label)
+
+    def __eq__(self, other):
+        return (isinstance(other, self.__class__)
+                and self.__dict__ == other.__dict__)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+
+class DesignateAmendment(Amendment):
+    """ A designate Amendment manages it's information a little differently
+    than a normal Amendment. Namely, there's more handling around Subparts."""
+
+    def __init__(self, action, label_list, destination):
+        self.action = action
+        self.original_labels = label_list
+        self.labels = [self.fix_label(l) for l in self.original_labels]
+        self.original_destination = destination
+
+        if 'Subpart' in destination and ':' in destination:
+            reg_part, subpart = self.original_destination.split('-')
+            _, subpart_letter = destination.split(':')
+            self.destination = [reg_part, 'Subpart', subpart_letter]
+        elif '-' in destination:
+            self.destination = self.fix_interp_format(destination.split('-'))
+        else:
+            self.destination = destination
+
+    def __repr__(self):
+        return "(%s, %s, %s)" % (
+            repr(self.action), repr(self.labels), repr(self.destination))
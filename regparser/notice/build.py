@@ -1,4 +1,4 @@
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 
 from lxml import etree
 
@@ -8,7 +8,7 @@ from regparser.notice.build_appendix import parse_appendix_changes
 from regparser.notice.build_interp import parse_interp_changes
 from regparser.notice.diff import parse_amdpar, find_section, find_subpart
 from regparser.notice.diff import new_subpart_added
-from regparser.notice.diff import DesignateAmendment
+from regparser.notice.amendments import DesignateAmendment
 from regparser.notice.dates import fetch_dates
 from regparser.notice.sxs import find_section_by_section
 from regparser.notice.sxs import build_section_by_section
@@ -160,17 +160,16 @@ def process_amendments(notice, notice_xml):
     amends = []
     notice_changes = changes.NoticeChanges()
 
-    amdpars_by_parent = []
+    amdpars_by_parent = OrderedDict()
     for par in notice_xml.xpath('//AMDPAR'):
         parent = par.getparent()
-        exists = filter(lambda aXp: aXp.parent == parent, amdpars_by_parent)
-        if exists:
-            exists[0].append(par)
+        if parent in amdpars_by_parent:
+            amdpars_by_parent[parent].append(par)
         else:
-            amdpars_by_parent.append(AmdparByParent(parent, par))
+            amdpars_by_parent[parent] = AmdparByParent(parent, par)
 
     default_cfr_part = notice['cfr_parts'][0]
-    for aXp in amdpars_by_parent:
+    for aXp in amdpars_by_parent.values():
         amended_labels = []
         designate_labels, other_labels = [], []
         context = [aXp.parent.get('PART') or default_cfr_part]
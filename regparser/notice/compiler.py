@@ -136,12 +136,56 @@ def is_interp_placeholder(node):
 
 class RegulationTree(object):
     """ This encapsulates a regulation tree, and methods to change that tree.
-    """
+    The tree shares its nodes with the previous tree; a node (and each of its
+    ancestors) is only copied when it's about to be modified. """
 
     def __init__(self, previous_tree):
-        self.tree = copy.deepcopy(previous_tree)
+        self._owned = {}    # id -> node for nodes safe to modify in place
+        self.tree = None
+        if previous_tree is not None:
+            self.tree = self._copy(previous_tree)
         self._kept__by_parent = defaultdict(list)
 
+    def _copy(self, node):
+        """ Shallow copy of a node, which we are then free to modify. """
+        node = copy.copy(node)
+        node.children = list(node.children)
+        self._owned[id(node)] = node
+        return node
+
+    def _path_to(self, node):
+        """ List of nodes from the root to (and including) this node, or None
+        if the node is not in the tree. """
+        stack = [(self.tree, [self.tree])]
+        while stack:
+            current, path = stack.pop()
+            if current is node:
+                return path
+            stack.extend((child, path + [child])
+                         for child in reversed(current.children))
+
+    def _writable(self, node):
+        """ Before modifying a node, make sure we have our own copy of it and
+        of each of its ancestors (the originals may be shared with the
+        previous tree). Returns the node which may be modified. """
+        if node is None or id(node) in self._owned:
+            return node
+        path = self._path_to(node)
+        if path is None:    # not in the tree; don't modify the original
+            return self._copy(node)
+
+        parent = None
+        for original in path:
+            if id(original) in self._owned:
+                current = original
+            else:
+                current = self._copy(original)
+                idx = [i for i, c in enumerate(parent.children)
+                       if c is original][0]
+                parent.children[idx] = current
+            parent = current
+        return parent
+
     def keep(self, labels):
         """The 'KEEP' verb tells us that a node should not be removed
         (generally because it would had we dropped the children of its
@@ -163,14 +207,8 @@ class RegulationTree(object):
     def add_to_root(self, node):
         """ Add a child to the root of the tree. """
         self.tree.children.append(node)
-
-        for c in self.tree.children:
-            c.sortable = make_root_sortable(c.label, c.node_type)
-
-        self.tree.children.sort(key=lambda x: x.sortable)
-
-        for c in self.tree.children:
-            del c.sortable
+        self.tree.children.sort(
+            key=lambda c: make_root_sortable(c.label, c.node_type))
 
     def add_child(self, children, node, order=None):
         """ Add a child to the children, and sort appropriately. This is used
@@ -211,7 +249,7 @@ class RegulationTree(object):
         """ Delete node from it's parent, effectively removing it from the
         tree. """
 
-        parent = self.get_parent(node)
+        parent = self._writable(self.get_parent(node))
         other_children = [c for c in parent.children if c.label != node.label]
         parent.children = other_children
 
@@ -237,7 +275,7 @@ class RegulationTree(object):
 
     def move(self, origin, destination):
         """ Move a node from one part in the tree to another. """
-        origin = find(self.tree, origin)
+        origin = self._copy(find(self.tree, origin))
         self.delete_from_parent(origin)
 
         origin = overwrite_marker(origin, destination[-1])
@@ -247,7 +285,7 @@ class RegulationTree(object):
     def replace_node_and_subtree(self, node):
         """ Replace an existing node in the tree with node. """
 
-        parent = self.get_parent(node)
+        parent = self._writable(self.get_parent(node))
 
         prev_idx = [idx for idx, c in enumerate(parent.children)
                     if c.label == node.label]
@@ -282,7 +320,7 @@ class RegulationTree(object):
         else:
             node_type = Node.REGTEXT
         node = Node(label=node_label, node_type=node_type)
-        parent = self.get_parent(node)
+        parent = self._writable(self.get_parent(node))
         if not parent:
             parent = self.create_empty_node(get_parent_label(node))
         parent.children = self.add_child(parent.children, node,
@@ -306,6 +344,7 @@ class RegulationTree(object):
             logging.warning('Replacing reserved node: %s' % node.label_id())
             return self.replace_node_and_subtree(node)
         elif existing and is_interp_placeholder(existing):
+            existing = self._writable(existing)
             existing.title = node.title
             existing.text = node.text
             if hasattr(node, 'tagged_text'):
@@ -328,7 +367,7 @@ class RegulationTree(object):
                     or node.node_type == Node.SUBPART):
                 return self.add_to_root(node)
             else:
-                parent = self.get_parent(node)
+                parent = self._writable(self.get_parent(node))
                 if parent is None:
                     # This is a corner case, where we're trying to add a child
                     # to a parent that should exist.
@@ -339,7 +378,7 @@ class RegulationTree(object):
                 # the correct parent.
                 if (parent.children
                         and parent.children[0].node_type == Node.EMPTYPART):
-                    parent = parent.children[0]
+                    parent = self._writable(parent.children[0])
                 parent.children = self.add_child(
                     parent.children, node, getattr(parent, 'child_labels',
                                                    []))
@@ -347,25 +386,25 @@ class RegulationTree(object):
     def add_section(self, node, subpart_label):
         """ Add a new section to a subpart. """
 
-        subpart = find(self.tree, '-'.join(subpart_label))
+        subpart = self._writable(find(self.tree, '-'.join(subpart_label)))
         subpart.children = self.add_child(subpart.children, node)
 
     def replace_node_text(self, label, change):
         """ Replace just a node's text. """
 
-        node = find(self.tree, label)
+        node = self._writable(find(self.tree, label))
         node.text = change['node']['text']
 
     def replace_node_title(self, label, change):
         """ Replace just a node's title. """
 
-        node = find(self.tree, label)
+        node = self._writable(find(self.tree, label))
         node.title = change['node']['title']
 
     def replace_node_heading(self, label, change):
         """ A node's heading is it's keyterm. We handle this here, but not
         well, I think. """
-        node = find(self.tree, label)
+        node = self._writable(find(self.tree, label))
         node.text = replace_first_sentence(node.text, change['node']['text'])
 
         if hasattr(node, 'tagged_text') and 'tagged_text' in change['node']:
@@ -397,6 +436,8 @@ class RegulationTree(object):
         subpart_with_node = find_parent(self.tree, label)
 
         if destination and subpart_with_node:
+            subpart_with_node = self._writable(subpart_with_node)
+            destination = self._writable(destination)
             node = find(subpart_with_node, label)
             other_children = [c for c in subpart_with_node.children
                               if c.label_id() != label]
@@ -16,9 +16,45 @@ from regparser.tree.xml_parser.xml_wrapper import XMLWrapper
 import settings
 
 
+class _Metadata(object):
+    """The elements which encode a notice's metadata, collected in a single
+    walk of the XML. Values derived from them are computed once, on first
+    use"""
+    def __init__(self, xml):
+        self.elements = {'DATES': [], 'PRTPAGE': [], 'CFR': []}
+        for element in xml.iter(*self.elements):
+            self.elements[element.tag].append(element)
+        self._values = {}
+
+    def value(self, name, compute):
+        if name not in self._values:
+            self._values[name] = compute()
+        return self._values[name]
+
+
 class NoticeXML(XMLWrapper):
     """Wrapper around a notice XML which provides quick access to the XML's
-    encoded data fields"""
+    encoded data fields. These are read from a cached _Metadata record; the
+    setters below (and preprocess) invalidate it, but any other modification
+    of self.xml should be followed by a call to `invalidate`"""
+    _metadata = None
+
+    def invalidate(self):
+        self._metadata = None
+
+    def _meta(self, name, compute):
+        """Look up or compute one of the metadata values. `compute` is
+        passed the elements, grouped by tag"""
+        if self._metadata is None:
+            self._metadata = _Metadata(self.xml)
+        return self._metadata.value(
+            name, lambda: compute(self._metadata.elements))
+
+    def preprocess(self):
+        super(NoticeXML, self).preprocess()
+        self.invalidate()
+        return self
+
     def delays(self):
         """Pull out FRDelays found in the DATES tag"""
         dates_str = "".join(p.text for p in self.xpath(
@@ -38,6 +74,7 @@ class NoticeXML(XMLWrapper):
         if isinstance(value, date):
             value = value.isoformat()
         dates_tag.attrib["eregs-{}-date".format(date_type)] = value
+        self.invalidate()
 
     def derive_effective_date(self):
         """Attempt to parse effective date from DATES tags. Raises exception
@@ -54,9 +91,11 @@ class NoticeXML(XMLWrapper):
     def _get_date_attr(self, date_type):
         """Pulls out the date set in `set_date_attr`, as a datetime.date. If
         not present, returns None"""
-        value = self.xpath(".//DATES")[0].get('eregs-{}-date'.format(
-            date_type))
-        return datetime.strptime(value, "%Y-%m-%d").date()
+        def compute(elements):
+            value = elements['DATES'][0].get('eregs-{}-date'.format(
+                date_type))
+            return datetime.strptime(value, "%Y-%m-%d").date()
+        return self._meta(date_type, compute)
 
     # --- Setters/Getters for specific fields. ---
     # We encode relevant information within the XML, but wish to provide easy
@@ -80,20 +119,24 @@ class NoticeXML(XMLWrapper):
 
     @property
     def fr_volume(self):
-        return int(self.xpath(".//PRTPAGE")[0].attrib['eregs-fr-volume'])
+        return self._meta('fr_volume', lambda elements: int(
+            elements['PRTPAGE'][0].attrib['eregs-fr-volume']))
 
     @fr_volume.setter
     def fr_volume(self, value):
         for prtpage in self.xpath(".//PRTPAGE"):
             prtpage.attrib['eregs-fr-volume'] = str(value)
+        self.invalidate()
 
     @property
     def start_page(self):
-        return int(self.xpath(".//PRTPAGE")[0].attrib["P"]) - 1
+        return self._meta('start_page', lambda elements: int(
+            elements['PRTPAGE'][0].attrib["P"]) - 1)
 
     @property
     def end_page(self):
-        return int(self.xpath(".//PRTPAGE")[-1].attrib["P"])
+        return self._meta('end_page', lambda elements: int(
+            elements['PRTPAGE'][-1].attrib["P"]))
 
     @property
     def version_id(self):
@@ -103,15 +146,21 @@ class NoticeXML(XMLWrapper):
     def version_id(self, value):
         self.xml.attrib['eregs-version-id'] = str(value)
 
+    def _parsed_cfrs(self):
+        return self._meta('parsed_cfrs', lambda elements: [
+            notice_cfr_p.parseString(cfr_elm.text)
+            for cfr_elm in elements['CFR']])
+
     @property
     def cfr_parts(self):
-        return [int(p) for p in fetch_cfr_parts(self.xml)]
+        parts = set(part for parsed in self._parsed_cfrs()
+                    for part in parsed.cfr_parts)
+        return [int(p) for p in sorted(parts)]
 
     @property
     def cfr_titles(self):
-        return list(sorted(set(
-            int(notice_cfr_p.parseString(cfr_elm.text).cfr_title)
-            for cfr_elm in self.xpath('//CFR'))))
+        return list(sorted(set(int(parsed.cfr_title)
+                               for parsed in self._parsed_cfrs())))
 
 
 def fetch_cfr_parts(notice_xml):
@@ -1,6 +1,23 @@
-from constraint import Problem
+from collections import defaultdict
+import heapq
+from itertools import groupby
+import logging
+import string
+import time
 
-from regparser.tree.depth import markers, rules
+from regparser.tree.depth import heuristics, markers, memo, rules
+import settings
+
+
+# Depth in the tree, with an arbitrary limit
+MAX_DEPTH = 10
+
+# Limit on the partial assignments greedy_depths will try before giving up
+# on finding valid depths
+GREEDY_MAX_STEPS = 100000
+
+# Previously derived depths; see memo.py
+cache = memo.DepthCache(path=settings.DEPTH_CACHE_DIR)
 
 
 class ParAssignment(object):
@@ -43,6 +60,32 @@ class Solution(object):
         print self.pretty_str()
 
 
+class BudgetExceeded(Exception):
+    pass
+
+
+class Budget(object):
+    """Limits the time spent and the number of solutions found when deriving
+    depths. A budget can be shared between calls (e.g. with debug_idx) so
+    that all of the work for a section counts against it"""
+    def __init__(self, seconds=None, solutions=None):
+        self.seconds = seconds
+        self.solutions = solutions
+        self.start = time.time()
+
+    def elapsed(self):
+        return time.time() - self.start
+
+    def check(self, found=0):
+        """Raise BudgetExceeded if we've run out of time or found more than
+        the allowed number of solutions"""
+        if self.seconds is not None and self.elapsed() > self.seconds:
+            raise BudgetExceeded("Exceeded {} seconds".format(self.seconds))
+        if self.solutions is not None and found > self.solutions:
+            raise BudgetExceeded("Found more than {} solutions".format(
+                self.solutions))
+
+
 def _compress_markerless(marker_list):
     """Remove repeated MARKERLESS markers. This will speed up depth
     computations as these paragraphs are redundant for its purposes"""
@@ -61,98 +104,359 @@ def _compress_markerless(marker_list):
 def _decompress_markerless(assignment, marker_list):
     """Now that we have a specific solution, add back in the compressed
     MARKERLESS markers."""
-    result = {}
+    result = []
     saw_markerless = False
-    a_idx = -1      # idx in the assignment dict
-    for m_idx, marker in enumerate(marker_list):
+    a_idx = -1      # idx in the assignment list
+    for marker in marker_list:
         if marker != markers.MARKERLESS:
             saw_markerless = False
             a_idx += 1
         elif not saw_markerless:
             saw_markerless = True
             a_idx += 1
-        result['type{}'.format(m_idx)] = assignment['type{}'.format(a_idx)]
-        result['idx{}'.format(m_idx)] = assignment['idx{}'.format(a_idx)]
-        result['depth{}'.format(m_idx)] = assignment['depth{}'.format(a_idx)]
+        result.append(ParAssignment(*assignment[a_idx]))
     return result
 
 
-def derive_depths(original_markers, additional_constraints=[]):
-    """Use constraint programming to derive the paragraph depths associated
-    with a list of paragraph markers. Additional constraints (e.g. expected
-    marker types, etc.) can also be added. Such constraints are functions of
-    two parameters, the constraint function (problem.addConstraint) and a
-    list of all variables"""
+_FIELDS = ('type', 'idx', 'depth')
+
+
+def _parse_variable(variable):
+    """Variables are named by their field and position, e.g. "depth12".
+    Returns the position and the index of the field within an assignment"""
+    field = variable.rstrip(string.digits)
+    return int(variable[len(field):]), _FIELDS.index(field)
+
+
+class _Constraints(object):
+    """Collects additional constraints (as would be registered with
+    python-constraint's Problem.addConstraint), indexing them by the last
+    marker position they refer to, so they can be checked as soon as that
+    marker is assigned"""
+    def __init__(self, additional_constraints, all_vars):
+        self.by_position = defaultdict(list)
+        for constraint in additional_constraints:
+            constraint(self.add, all_vars)
+
+    def add(self, fn, variables):
+        variables = [_parse_variable(var) for var in variables]
+        position = max(position for position, _ in variables)
+        self.by_position[position].append((fn, variables))
+
+    def check(self, assignment):
+        """Check the constraints which end with the last marker of this
+        (partial) list of (type, idx, depth) triples"""
+        return all(fn(*[assignment[position][field]
+                        for position, field in variables])
+                   for fn, variables in self.by_position[len(assignment) - 1])
+
+
+def _candidates(marker):
+    """All (type, idx) pairs for this marker"""
+    return [(typ, idx) for typ in markers.types if marker in typ
+            for idx in range(len(typ)) if typ[idx] == marker]
+
+
+def _valid_prefix(assignment, flat):
+    """Check the constraints which involve the most recently assigned
+    marker. `flat` is the assignment as a flat list of type, idx, depth"""
+    position = len(assignment) - 1
+    typ, idx, depth = assignment[-1]
+    if position == 0:
+        if depth != 0:      # Always start at depth 0
+            return False
+    else:
+        if not rules.depth_check(*(assignment[-2] + assignment[-1])):
+            return False
+        if position > 1:
+            triple = assignment[-3] + assignment[-2] + assignment[-1]
+            if not (rules.markerless_sandwich(*triple)
+                    and rules.star_sandwich(*triple)):
+                return False
+        if not rules.sequence(typ, idx, depth, *flat[:-3]):
+            return False
+    # These look at the whole assignment, but a violation in a prefix can't
+    # be fixed by later markers, so we prune as early as possible
+    return (rules.same_parent_same_type(*flat)
+            and rules.stars_occupy_space(*flat))
+
+
+def _extensions(candidates, assignment):
+    """Possible (type, idx, depth) triples for the next marker. A marker is
+    at most one level deeper than its predecessor. When heuristics tie, the
+    earlier solution wins, so the order matters: as python-constraint did
+    when trying values, we try later marker types (e.g. roman before lower)
+    and deeper assignments first. python-constraint also reordered the
+    variables, so the order of solutions may still differ from its"""
+    depth_limit = assignment[-1][2] + 2 if assignment else 1
+    depths = list(reversed(range(min(depth_limit, MAX_DEPTH))))
+    for typ, idx in reversed(candidates[len(assignment)]):
+        for depth in depths:
+            yield (typ, idx, depth)
+
+
+def _solve(marker_list, constraints, budget=None):
+    """Depth-first search over the marker sequence, assigning each marker a
+    type, index, and depth from left to right. Constraints are checked as
+    soon as all of their variables are assigned, so dead ends are abandoned
+    without enumerating their suffixes. Yields lists of (type, idx, depth)"""
+    candidates = [_candidates(marker) for marker in marker_list]
+    assignment, flat = [], []
+
+    def search():
+        if len(assignment) == len(marker_list):
+            yield list(assignment)
+            return
+        if budget:
+            budget.check()
+        for triple in _extensions(candidates, assignment):
+            assignment.append(triple)
+            flat.extend(triple)
+            if _valid_prefix(assignment, flat) and constraints.check(
+                    assignment):
+                for solution in search():
+                    yield solution
+            assignment.pop()
+            del flat[-3:]
+
+    return search()
+
+
+def _index_constraints(marker_list, additional_constraints):
+    """Shared by the search strategies"""
+    all_vars = []
+    for idx in range(len(marker_list)):
+        all_vars.extend(["type{}".format(idx), "idx{}".format(idx),
+                         "depth{}".format(idx)])
+    return _Constraints(additional_constraints, all_vars)
+
+
+def derive_depths(original_markers, additional_constraints=[],
+                  budget=None):
+    """Derive the paragraph depths associated with a list of paragraph
+    markers via a constraint-satisfaction search. Additional constraints
+    (e.g. expected marker types, etc.) can also be added. Such constraints
+    are functions of two parameters, a function to register constraints
+    (with the same signature as python-constraint's Problem.addConstraint)
+    and a list of all variables. Results are cached. If a Budget is
+    provided, BudgetExceeded may be raised"""
     if not original_markers:
         return []
-    problem = Problem()
     marker_list = _compress_markerless(original_markers)
+    key = memo.cache_key(marker_list, additional_constraints)
+    assignments = cache.get(key) if key else None
+    if assignments is None:
+        constraints = _index_constraints(marker_list, additional_constraints)
+        assignments = []
+        for assignment in _solve(marker_list, constraints, budget):
+            assignments.append(assignment)
+            if budget:
+                budget.check(len(assignments))
+        if key:
+            assignments = cache.set(key, assignments)
+    return [Solution(_decompress_markerless(assignment, original_markers))
+            for assignment in assignments]
 
-    # Depth in the tree, with an arbitrary limit of 10
-    problem.addVariables(["depth" + str(i) for i in range(len(marker_list))],
-                         range(10))
 
-    # Always start at depth 0
-    problem.addConstraint(rules.must_be(0), ("depth0",))
+def _partial_scorer(original_markers, marker_list, weighted_heuristics):
+    """Returns a function which scores a partial assignment (of compressed
+    markers) using the heuristics which have partial penalties"""
+    penalties = [(heuristics.PARTIAL_PENALTIES[heuristic], weight)
+                 for heuristic, weight in weighted_heuristics
+                 if heuristic in heuristics.PARTIAL_PENALTIES]
+    # Each compressed MARKERLESS stands in for this many paragraphs
+    multiplicity = [len(list(group)) for _, group in groupby(
+        original_markers,
+        lambda m: m if m == markers.MARKERLESS else object())]
 
-    all_vars = []
-    for idx, marker in enumerate(marker_list):
-        type_var = "type{}".format(idx)
-        depth_var = "depth{}".format(idx)
-        # Index within the marker list. Though this variable is redundant, it
-        # makes the code easier to understand and doesn't have a significant
-        # performance penalty
-        idx_var = "idx{}".format(idx)
-
-        typ_opts = [t for t in markers.types if marker in t]
-        idx_opts = [i for t in typ_opts for i in range(len(t))
-                    if t[i] == marker]
-        problem.addVariable(type_var, typ_opts)
-        problem.addVariable(idx_var, idx_opts)
-
-        problem.addConstraint(rules.type_match(marker), [type_var, idx_var])
-        all_vars.extend([type_var, idx_var, depth_var])
-
-        if idx > 0:
-            pairs = all_vars[3*(idx-1):]
-            problem.addConstraint(rules.depth_check, pairs)
-
-        if idx > 1:
-            pairs = all_vars[3*(idx-2):]
-            problem.addConstraint(rules.markerless_sandwich, pairs)
-            problem.addConstraint(rules.star_sandwich, pairs)
-
-    # separate loop so that the simpler checks run first
-    for idx in range(1, len(marker_list)):
-        # start with the current idx
-        params = all_vars[3*idx:3*(idx+1)]
-        # then add on all previous
-        params += all_vars[:3*idx]
-        problem.addConstraint(rules.sequence, params)
-
-    # @todo: There's probably efficiency gains to making these rules over
-    # prefixes (see above) rather than over the whole collection at once
-    problem.addConstraint(rules.same_parent_same_type, all_vars)
-    problem.addConstraint(rules.stars_occupy_space, all_vars)
-
-    for constraint in additional_constraints:
-        constraint(problem.addConstraint, all_vars)
-
-    solutions = []
-    for assignment in problem.getSolutionIter():
-        assignment = _decompress_markerless(assignment, original_markers)
-        solutions.append(Solution(assignment))
-    return solutions
-
-
-def debug_idx(markers, constraints=[]):
+    def score(assignment):
+        decompressed = [triple for triple, count
+                        in zip(assignment, multiplicity)
+                        for _ in range(count)]
+        progress = heuristics.Progress(
+            decompressed, len(marker_list) - len(assignment),
+            len(original_markers))
+        weight = 1.0
+        for penalty, penalty_weight in penalties:
+            weight *= 1 - penalty_weight * penalty(progress)
+        return weight
+    return score
+
+
+class SearchResult(object):
+    """Outcome of a best-first search. `solutions` are the top solutions,
+    best first; `explored` holds every complete solution which was scored
+    along the way (in the order found) and `expanded` counts the partial
+    assignments which were extended. Both are meant for diagnosis"""
+    def __init__(self, solutions, explored, expanded):
+        self.solutions = solutions
+        self.explored = explored
+        self.expanded = expanded
+
+
+def derive_best_depths(original_markers, additional_constraints=[],
+                       weighted_heuristics=[], k=1, budget=None):
+    """Like derive_depths, but rather than enumerating every solution and
+    scoring them afterwards, search best-first. Heuristics are (function,
+    weight) pairs. Those with a partial penalty (see
+    heuristics.PARTIAL_PENALTIES) score each partial assignment; as
+    penalties only grow when an assignment is extended, the score is an
+    upper bound for all of its solutions. The remaining heuristics compare
+    solutions with each other, so they are applied afterwards, to the
+    solutions which could still be among the top k. If a Budget is provided,
+    BudgetExceeded may be raised.
+
+    As those heuristics (i.e. prefer_shallow_depths) score each solution
+    relative to the others they're given, and we only give them the
+    finalists rather than every solution, the ranking can differ from
+    scoring every solution from derive_depths. For example, with
+    ParagraphProcessor's heuristics, MARKERLESS, i, 1, MARKERLESS, STARS, A,
+    a is assigned depths 0, 1, 2, 3, 2, 3, 4 here rather than 0, 1, 2, 3,
+    3, 4, 5"""
+    if not original_markers:
+        return SearchResult([], [], 0)
+    marker_list = _compress_markerless(original_markers)
+    constraints = _index_constraints(marker_list, additional_constraints)
+
+    score = _partial_scorer(original_markers, marker_list,
+                            weighted_heuristics)
+    slack = 1.0
+    for heuristic, weight in weighted_heuristics:
+        if heuristic not in heuristics.PARTIAL_PENALTIES:
+            # can dock the final weight by at most this much
+            slack *= 1 - weight
+    candidates = [_candidates(marker) for marker in marker_list]
+
+    # Ties are broken by the path of choices made, i.e. depth-first order
+    queue = [(-1.0, (), (), None)]
+    finalists, finalist_weights, explored, expanded = [], [], [], 0
+    while queue:
+        neg_weight, path, assignment, solution = heapq.heappop(queue)
+        if (len(finalists) >= k
+                and -neg_weight < finalist_weights[k - 1] * slack):
+            break   # nothing left can beat the top k
+        if solution:
+            finalists.append(solution)
+            finalist_weights.append(-neg_weight)
+            continue
+        if budget:
+            budget.check(len(explored))
+        expanded += 1
+        assignment = list(assignment)
+        flat = [field for triple in assignment for field in triple]
+        for choice, triple in enumerate(_extensions(candidates, assignment)):
+            assignment.append(triple)
+            flat.extend(triple)
+            if _valid_prefix(assignment, flat) and constraints.check(
+                    assignment):
+                weight, solution = score(assignment), None
+                if len(assignment) == len(marker_list):
+                    solution = Solution(_decompress_markerless(
+                        assignment, original_markers))
+                    explored.append(solution)
+                heapq.heappush(queue, (-weight, path + (choice,),
+                                       tuple(assignment), solution))
+            assignment.pop()
+            del flat[-3:]
+
+    if not finalists:
+        return SearchResult([], explored, expanded)
+    for heuristic, weight in weighted_heuristics:
+        finalists = heuristic(finalists, weight)
+    finalists = sorted(finalists, key=lambda s: s.weight, reverse=True)
+    return SearchResult(finalists[:k], explored, expanded)
+
+
+def greedy_depths(original_markers, additional_constraints=[],
+                  weighted_heuristics=[], max_steps=GREEDY_MAX_STEPS):
+    """A fallback for when a full search is too expensive: assign each
+    marker in turn, trying the valid assignments which score best with the
+    heuristics' partial penalties first and backtracking when stuck. The
+    first complete assignment is returned, so it follows the rules, though
+    it may not be the best. Only as a last resort (if there is no valid
+    assignment, or none is found within max_steps), log an error and
+    place each stuck marker at the same depth as its predecessor"""
+    marker_list = _compress_markerless(original_markers)
+    constraints = _index_constraints(marker_list, additional_constraints)
+    score = _partial_scorer(original_markers, marker_list,
+                            weighted_heuristics)
+    candidates = [_candidates(marker) for marker in marker_list]
+    assignment, flat = [], []
+
+    def ranked_extensions():
+        """Valid (type, idx, depth) triples for the next marker, best
+        first"""
+        scored = []
+        for triple in _extensions(candidates, assignment):
+            assignment.append(triple)
+            flat.extend(triple)
+            if _valid_prefix(assignment, flat) and constraints.check(
+                    assignment):
+                scored.append((score(assignment), triple))
+            assignment.pop()
+            del flat[-3:]
+        scored.sort(key=lambda pair: pair[0], reverse=True)
+        return [triple for _, triple in scored]
+
+    alternatives = []   # untried triples for each assigned position
+    for _ in range(max_steps):
+        if len(assignment) == len(marker_list):
+            return Solution(_decompress_markerless(assignment,
+                                                   original_markers))
+        if len(alternatives) == len(assignment):
+            alternatives.append(ranked_extensions())
+        if alternatives[-1]:
+            triple = alternatives[-1].pop(0)
+            assignment.append(triple)
+            flat.extend(triple)
+        elif assignment:    # dead end; backtrack
+            alternatives.pop()
+            assignment.pop()
+            del flat[-3:]
+        else:
+            break           # no valid assignment at all
+
+    logging.error("Could not find valid paragraph depths greedily; some "
+                  "will break the rules. Markers: %s", original_markers)
+    return _forced_depths(original_markers, marker_list, constraints, score)
+
+
+def _forced_depths(original_markers, marker_list, constraints, score):
+    """Assign each marker in turn, without backtracking, picking the valid
+    assignment which scores best. If no assignment is valid, the marker is
+    placed at the same depth as its predecessor, so this always returns a
+    Solution, though it may break the rules"""
+    candidates = [_candidates(marker) for marker in marker_list]
+    assignment, flat = [], []
+    for position, marker in enumerate(marker_list):
+        best, best_weight = None, -1
+        for triple in _extensions(candidates, assignment):
+            assignment.append(triple)
+            flat.extend(triple)
+            if _valid_prefix(assignment, flat) and constraints.check(
+                    assignment):
+                weight = score(assignment)
+                if weight > best_weight:
+                    best, best_weight = triple, weight
+            assignment.pop()
+            del flat[-3:]
+        if best is None:
+            typ, idx = (candidates[position] or [(markers.markerless, 0)])[0]
+            best = (typ, idx, assignment[-1][2] if assignment else 0)
+        assignment.append(best)
+        flat.extend(best)
+    return Solution(_decompress_markerless(assignment, original_markers))
+
+
+def debug_idx(markers, constraints=[], budget=None):
     """Binary search through the markers to find the point at which
     derive_depths no longer works"""
     working, not_working = -1, len(markers)
 
     while working != not_working - 1:
         midpoint = (working + not_working) / 2
-        solutions = derive_depths(markers[:midpoint + 1], constraints)
+        solutions = derive_depths(markers[:midpoint + 1], constraints,
+                                  budget)
         if solutions:
             working = midpoint
         else:
@@ -1,7 +1,7 @@
 """Set of heuristics for trimming down the set of solutions. Each heuristic
 works by penalizing a solution; it's then up to the caller to grab the
 solution with the least penalties."""
-from collections import defaultdict
+from collections import defaultdict, namedtuple
 from itertools import takewhile
 
 
@@ -54,3 +54,48 @@ def prefer_shallow_depths(solutions, weight=0.1):
         return result
     else:
         return solutions
+
+
+# A partial assignment during best-first search. `assignment` is a list of
+# (type, idx, depth) triples for the paragraphs assigned so far, `remaining`
+# the number of (compressed) markers yet to be assigned and `length` the
+# total number of paragraphs
+Progress = namedtuple('Progress', ['assignment', 'remaining', 'length'])
+
+
+def diff_types_diff_levels_penalty(progress):
+    """Lower bound for prefer_diff_types_diff_levels. Each new paragraph
+    adds at most one (depth, type) pair and can't reduce the number of
+    extra types per depth"""
+    pairs = set((depth, typ) for typ, _, depth in progress.assignment)
+    if not pairs:
+        return 0.0
+    depths = set(depth for depth, _ in pairs)
+    return float(len(pairs) - len(depths)) / (len(pairs) + progress.remaining)
+
+
+def multiple_children_penalty(progress):
+    """Lower bound for prefer_multiple_children. Only paragraphs which have
+    been followed by a paragraph at the same or a shallower depth have a
+    known number of children"""
+    flags = 0
+    stack = []  # [depth, number of children] of paragraphs still open
+    for _, _, depth in progress.assignment:
+        while stack and stack[-1][0] >= depth:
+            flags += stack.pop()[1] == 1
+        if stack and stack[-1][0] == depth - 1:
+            stack[-1][1] += 1
+        stack.append([depth, 0])
+    if not progress.remaining:
+        flags += sum(1 for _, children in stack if children == 1)
+    return float(flags) / progress.length
+
+
+# Maps heuristics to their partial penalties, used by
+# derive.derive_best_depths. Heuristics which aren't present here (e.g.
+# prefer_shallow_depths, which compares solutions) can still be used there,
+# but only once the search has finished
+PARTIAL_PENALTIES = {
+    prefer_diff_types_diff_levels: diff_types_diff_levels_penalty,
+    prefer_multiple_children: multiple_children_penalty,
+}
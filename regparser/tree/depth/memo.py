@@ -0,0 +1,137 @@
+"""The same marker sequences (e.g. a, 1, 2, b, c) appear in many sections,
+notices, and annual editions. Rather than re-solving them, derive_depths
+consults a cache of its previous results, keyed by the (compressed) marker
+sequence and the additional constraints. Recently used results are held in
+memory; results can also be persisted to a directory, to be shared between
+runs."""
+from collections import OrderedDict
+import cPickle
+import hashlib
+import json
+import logging
+import os
+import sys
+import tempfile
+
+from regparser.tree.depth import markers
+
+
+# Bump when the rules (or the order of solutions) change, so that persisted
+# results are ignored
+VERSION = 2
+
+
+def constraint_key(constraint):
+    """Constraints are functions, so we identify them either by an explicit
+    `cache_key` attribute (see rules.depth_type_order) or, for module-level
+    functions, by their name. Returns None if the constraint can't be
+    identified"""
+    key = getattr(constraint, 'cache_key', None)
+    if key is None:
+        module = sys.modules.get(getattr(constraint, '__module__', None))
+        name = getattr(constraint, '__name__', None)
+        if name and getattr(module, name, None) is constraint:
+            key = '{}.{}'.format(constraint.__module__, name)
+    return key
+
+
+def cache_key(marker_list, constraints):
+    """A digest of the markers and constraints, or None if any constraint
+    can't be identified"""
+    constraint_keys = [constraint_key(c) for c in constraints]
+    if None in constraint_keys:
+        return None
+    serialized = json.dumps([VERSION, marker_list, constraint_keys])
+    return hashlib.sha256(serialized).hexdigest()
+
+
+def _encode(assignments):
+    """Marker types are stored by their position in markers.types"""
+    return [[(markers.types.index(typ), idx, depth)
+             for typ, idx, depth in assignment]
+            for assignment in assignments]
+
+
+def _decode(encoded):
+    return tuple(tuple((markers.types[typ], idx, depth)
+                       for typ, idx, depth in assignment)
+                 for assignment in encoded)
+
+
+class DepthCache(object):
+    """An LRU of derive_depths' results (lists of (type, idx, depth)
+    assignments), optionally backed by a directory"""
+    def __init__(self, max_size=4096, path=None):
+        self.max_size = max_size
+        self.path = path
+        self._entries = OrderedDict()
+        self.hits, self.misses = 0, 0
+
+    def _filename(self, key):
+        return os.path.join(self.path, key[:2], key)
+
+    def _read(self, key):
+        """Read from disk, if we've a path and the file is present. Returns
+        None otherwise"""
+        if not self.path or not os.path.exists(self._filename(key)):
+            return None
+        try:
+            with open(self._filename(key), 'rb') as f:
+                return _decode(cPickle.load(f))
+        except (cPickle.UnpicklingError, EOFError, IndexError,
+                ValueError, TypeError):
+            logging.warning("Ignoring corrupt depth cache entry: %s", key)
+
+    def _write(self, key, assignments):
+        """Write via a temporary file so that concurrent readers never see
+        a partial entry"""
+        dirname = os.path.dirname(self._filename(key))
+        if not os.path.exists(dirname):
+            try:
+                os.makedirs(dirname)
+            except OSError:     # created concurrently
+                pass
+        handle, tmp_name = tempfile.mkstemp(dir=dirname)
+        with os.fdopen(handle, 'wb') as f:
+            cPickle.dump(_encode(assignments), f, cPickle.HIGHEST_PROTOCOL)
+        os.rename(tmp_name, self._filename(key))
+
+    def get(self, key):
+        """Returns None on a miss"""
+        if key in self._entries:
+            assignments = self._entries.pop(key)
+        else:
+            assignments = self._read(key)
+        if assignments is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._remember(key, assignments)
+        return assignments
+
+    def set(self, key, assignments):
+        assignments = tuple(tuple(assignment) for assignment in assignments)
+        self._remember(key, assignments)
+        if self.path:
+            self._write(key, assignments)
+        return assignments
+
+    def _remember(self, key, assignments):
+        self._entries.pop(key, None)
+        self._entries[key] = assignments
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Clears the in-memory entries and resets the counters"""
+        self._entries.clear()
+        self.hits, self.misses = 0, 0
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return float(self.hits) / lookups if lookups else 0.0
+
+    def log_stats(self, logger=logging):
+        logger.info("Depth cache: %d hits, %d misses (%.1f%% hit rate)",
+                    self.hits, self.misses, 100 * self.hit_rate)
@@ -1,5 +1,7 @@
 """Namespace for constraints on paragraph depth discovery"""
 
+import hashlib
+
 from regparser.tree.depth import markers
 
 
@@ -189,6 +191,9 @@ def depth_type_order(order):
                                          or t in order[d])),
                       ('type' + str(i), 'depth' + str(i)))
 
+    # Identifies the constraint when caching results; see memo.py
+    inner.cache_key = 'depth_type_order:' + hashlib.sha256(
+        repr(order)).hexdigest()
     return inner
 
 
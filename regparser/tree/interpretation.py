@@ -3,8 +3,7 @@ import logging
 
 from regparser import utils
 from regparser.citations import internal_citations, Label
-from regparser.grammar import unified
-import regparser.grammar.interpretation_headers as grammar
+from regparser.grammar import compiled
 from regparser.tree.paragraph import ParagraphParser
 from regparser.tree.struct import Node, treeify
 
@@ -33,7 +32,8 @@ def build(text, part):
 def segment_by_header(text, part):
     """Return a list of headers (section, appendices, paragraphs) and their
     offsets."""
-    starts = [start for _, start, _ in grammar.parser.scanString(text)]
+    starts = [start for _, start, _
+              in compiled.interpretation_headers.scanString(text)]
     starts = starts + [len(text)]
 
     offset_pairs = []
@@ -80,7 +80,7 @@ def text_to_labels(text, initial_label, warn=True, force_start=False):
 
     #   Under certain situations, we need to infer from context
     initial_pars = list(match for match, start, _
-                        in unified.any_depth_p.scanString(text)
+                        in compiled.any_depth_p.scanString(text)
                         if start == 0)
 
     if citations:
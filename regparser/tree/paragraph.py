@@ -1,9 +1,10 @@
+from bisect import bisect_right
+from collections import defaultdict
 import itertools
 import re
 import string
 
 from regparser.tree import struct
-from regparser.search import segments
 from regparser.utils import roman_nums
 
 p_levels = [
@@ -28,6 +29,54 @@ def p_level_of(marker):
     return potential_levels
 
 
+class _Markers(object):
+    """Positions of all paragraph markers within a text, found with a
+    single scan. Offsets are absolute, so that subsections of the text can
+    be searched without slicing it. We assume that p_regex matches at most
+    its own length and that, at any position, at most one marker matches,
+    as is the case for our (literal) markers"""
+    def __init__(self, parser, text, exclude):
+        self.parser = parser
+        self.text = text
+        self._starts, self._matches = defaultdict(list), defaultdict(list)
+        for match in parser.markers_regex().finditer(text):
+            marker = match.group('marker')
+            self._starts[marker].append(match.start('match'))
+            self._matches[marker].append(match.span('match'))
+
+        exclude = sorted(exclude)
+        self._exclude_starts = [e_start for e_start, _ in exclude]
+        #   Furthest exclusion end amongst those starting at or before each
+        self._exclude_ends = []
+        for _, e_end in exclude:
+            self._exclude_ends.append(max(self._exclude_ends[-1:] + [e_end]))
+
+    def excluded(self, start, end):
+        """Does this span overlap (or touch) any of the excluded spans?"""
+        idx = bisect_right(self._exclude_starts, end)
+        return idx > 0 and self._exclude_ends[idx - 1] >= start
+
+    def within(self, marker, start, end):
+        """(start, end) pairs of the marker's matches, as if we'd searched
+        text[start:end], shifted back into absolute offsets. Excluded
+        matches are skipped"""
+        found = []
+        #   Lookbehinds can't see past the start of a sliced text, so the
+        #   first position is checked in isolation
+        first = self.parser.regex_for(marker).match(self.text[start:min(
+            end, start + len(self.parser.p_regex % marker))])
+        if first:
+            found.append((start, start + first.end()))
+        starts, matches = self._starts[marker], self._matches[marker]
+        idx = bisect_right(starts, start)
+        while idx < len(starts) and starts[idx] < end:
+            m_start, m_end = matches[idx]
+            if m_end <= end and (not found or m_start >= found[0][1]):
+                found.append((m_start, m_end))
+            idx += 1
+        return [span for span in found if not self.excluded(*span)]
+
+
 class ParagraphParser():
 
     def __init__(self, p_regex, node_type):
@@ -38,6 +87,24 @@ class ParagraphParser():
         a new label."""
         self.p_regex = p_regex
         self.node_type = node_type
+        self._regexes = {}
+        self._markers_regex = None
+
+    def regex_for(self, marker):
+        if marker not in self._regexes:
+            self._regexes[marker] = re.compile(self.p_regex % marker)
+        return self._regexes[marker]
+
+    def markers_regex(self):
+        """Matches (via lookahead, so they may overlap) p_regex for any of
+        the markers, naming the marker and the full match"""
+        if self._markers_regex is None:
+            markers = sorted(set(itertools.chain(*p_levels)),
+                             key=lambda marker: (-len(marker), marker))
+            self._markers_regex = re.compile(
+                '(?=(?P<match>' + self.p_regex % (
+                    '(?P<marker>' + '|'.join(markers) + ')') + '))')
+        return self._markers_regex
 
     def matching_subparagraph_ids(self, p_level, paragraph):
         """Return a list of matches if this paragraph id matches one of the
@@ -49,93 +116,108 @@ class ParagraphParser():
                     matches.append((depth, sub_id))
         return matches
 
-    def best_start(self, text, p_level, paragraph, starts, exclude=[]):
-        """Given a list of potential paragraph starts, pick the best based
-        on knowledge of subparagraph structure. Do this by checking if the
-        id following the subparagraph (e.g. ii) is between the first match
-        and the second. If so, skip it, as that implies the first match was
-        a subparagraph."""
+    # Each of the following searches text[start:end] of the markers' text,
+    # returning absolute offsets
+
+    def _best_start(self, markers, p_level, paragraph, starts, start, end):
         subparagraph_hazards = self.matching_subparagraph_ids(
             p_level, paragraph)
-        starts = starts + [(len(text), len(text))]
+        starts = starts + [(end, end)]
         for i in range(1, len(starts)):
             _, prev_end = starts[i-1]
             next_start, _ = starts[i]
-            s_text = text[prev_end:next_start]
-            s_exclude = [
-                (e_start + prev_end, e_end + prev_end)
-                for e_start, e_end in exclude]
             is_subparagraph = False
             for hazard_level, hazard_idx in subparagraph_hazards:
-                if self.find_paragraph_start_match(
-                        s_text, hazard_level, hazard_idx + 1, s_exclude):
+                if self._find_start(markers, hazard_level, hazard_idx + 1,
+                                    prev_end, next_start):
                     is_subparagraph = True
             if not is_subparagraph:
                 return starts[i-1]
 
-    def find_paragraph_start_match(self, text, p_level, paragraph, exclude=[]):
-        """Find the positions for the start and end of the requested label.
-        p_Level is one of 0,1,2,3; paragraph is the index within that label.
-        Return None if not present. Does not return results in the exclude
-        list (a list of start/stop indices). """
+    def _find_start(self, markers, p_level, paragraph, start, end):
         if len(p_levels) <= p_level or len(p_levels[p_level]) <= paragraph:
             return None
-        match_starts = [(m.start(), m.end()) for m in re.finditer(
-            self.p_regex % p_levels[p_level][paragraph], text)]
-        match_starts = [
-            (start, end) for start, end in match_starts
-            if all([end < es or start > ee for es, ee in exclude])]
+        match_starts = markers.within(
+            p_levels[p_level][paragraph], start, end)
 
         if len(match_starts) == 0:
             return None
         elif len(match_starts) == 1:
             return match_starts[0]
         else:
-            return self.best_start(
-                text, p_level, paragraph, match_starts, exclude)
+            return self._best_start(
+                markers, p_level, paragraph, match_starts, start, end)
+
+    def _paragraph_offsets(self, markers, p_level, paragraph, start, end):
+        id_match = self._find_start(markers, p_level, paragraph, start, end)
+        if id_match is None:
+            return None
+        id_start, id_end = id_match
+        next_match = self._find_start(markers, p_level, paragraph + 1,
+                                      id_end, end)
+        if next_match is None:
+            return (id_start, end)
+        else:
+            return (id_start, next_match[0])
+
+    def _paragraphs(self, markers, p_level, start, end):
+        segs = []
+        offsets = self._paragraph_offsets(markers, p_level, 0, start, end)
+        while offsets:
+            segs.append(offsets)
+            offsets = self._paragraph_offsets(
+                markers, p_level, len(segs), offsets[1], end)
+        return segs
+
+    def _build_tree(self, markers, p_level, start, end, label, title=''):
+        subparagraphs = self._paragraphs(markers, p_level, start, end)
+        if subparagraphs:
+            body_text = markers.text[start:subparagraphs[0][0]]
+        else:
+            body_text = markers.text[start:end]
+
+        children = []
+        for paragraph, (p_start, p_end) in enumerate(subparagraphs):
+            new_label = label + [p_levels[p_level][paragraph]]
+            children.append(self._build_tree(
+                markers, p_level + 1, p_start, p_end, new_label))
+        return struct.Node(body_text, children, label, title, self.node_type)
+
+    def best_start(self, text, p_level, paragraph, starts, exclude=[]):
+        """Given a list of potential paragraph starts, pick the best based
+        on knowledge of subparagraph structure. Do this by checking if the
+        id following the subparagraph (e.g. ii) is between the first match
+        and the second. If so, skip it, as that implies the first match was
+        a subparagraph."""
+        return self._best_start(_Markers(self, text, exclude), p_level,
+                                paragraph, starts, 0, len(text))
+
+    def find_paragraph_start_match(self, text, p_level, paragraph, exclude=[]):
+        """Find the positions for the start and end of the requested label.
+        p_Level is one of 0,1,2,3; paragraph is the index within that label.
+        Return None if not present. Does not return results in the exclude
+        list (a list of start/stop indices). """
+        return self._find_start(_Markers(self, text, exclude), p_level,
+                                paragraph, 0, len(text))
 
     def paragraph_offsets(self, text, p_level, paragraph, exclude=[]):
         """Find the start/end of the requested paragraph. Assumes the text
         does not just up a p_level -- see build_paragraph_tree below."""
-        start = self.find_paragraph_start_match(
-            text, p_level, paragraph, exclude)
-        if start is None:
-            return None
-        id_start, id_end = start
-        end = self.find_paragraph_start_match(
-            text[id_end:], p_level, paragraph + 1,
-            [(e_start - id_end, e_end - id_end)
-                for e_start, e_end in exclude])
-        if end is None:
-            end = len(text)
-        else:
-            end = end[0] + id_end
-        return (id_start, end)
+        return self._paragraph_offsets(_Markers(self, text, exclude),
+                                       p_level, paragraph, 0, len(text))
 
     def paragraphs(self, text, p_level, exclude=[]):
         """Return a list of paragraph offsets defined by the level param."""
-        def offsets_fn(remaining_text, p_idx, exclude):
-            return self.paragraph_offsets(
-                remaining_text, p_level, p_idx, exclude)
-        return segments(text, offsets_fn, exclude)
+        return self._paragraphs(_Markers(self, text, exclude), p_level, 0,
+                                len(text))
 
     def build_tree(self, text, p_level=0, exclude=[], label=[],
                    title=''):
         """
-        Build a dict to represent the text hierarchy.
+        Build a dict to represent the text hierarchy. Rather than slicing
+        the text for each paragraph (and each search within it), we work
+        with offsets into the original text, so long texts (e.g. Supplement
+        I) are processed in linear time.
         """
-        subparagraphs = self.paragraphs(text, p_level, exclude)
-        if subparagraphs:
-            body_text = text[0:subparagraphs[0][0]]
-        else:
-            body_text = text
-
-        children = []
-        for paragraph, (start, end) in enumerate(subparagraphs):
-            new_text = text[start:end]
-            new_excludes = [(e[0] - start, e[1] - start) for e in exclude]
-            new_label = label + [p_levels[p_level][paragraph]]
-            children.append(
-                self.build_tree(
-                    new_text, p_level + 1, new_excludes, new_label))
-        return struct.Node(body_text, children, label, title, self.node_type)
+        return self._build_tree(_Markers(self, text, exclude), p_level, 0,
+                                len(text), label, title)
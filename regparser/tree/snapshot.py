@@ -0,0 +1,264 @@
+"""Read-only, columnar snapshots of a regulation tree. Rather than decoding
+a full JSON tree into Nodes, consumers which only read a tree can open a
+snapshot (via mmap) and walk lightweight views of its nodes. Fields are
+only decoded when accessed.
+
+Layout (all integers are little-endian, unsigned 32 bits unless noted):
+    header:         MAGIC, node count
+    parents:        one (signed) int per node; -1 for the root
+    child ranges:   start and end index of each node's children. Nodes are
+                    stored breadth-first, so children are contiguous
+    field offsets:  len(FIELDS) offsets per node (plus a final one) into the
+                    blob. Each field ends where the next begins
+    digests:        32-byte digest per node; see FrozenNode.hash
+    blob:           all string fields, UTF-8 encoded
+"""
+from __future__ import absolute_import
+
+from binascii import hexlify
+from collections import deque
+import hashlib
+import mmap
+import struct as binary
+
+from lxml import etree
+
+from regparser.tree.struct import Node
+
+
+MAGIC = 'EREGSNP1'
+FIELDS = ('label_id', 'text', 'title', 'tagged_text', 'node_type',
+          'source_xml')
+_HEADER = binary.Struct('<8sI')
+_INT = binary.Struct('<i')
+_UINT = binary.Struct('<I')
+_RANGE = binary.Struct('<II')
+_DIGEST_SIZE = hashlib.sha256().digest_size
+
+
+def _fields_of(node):
+    source_xml = node.source_xml
+    if source_xml is not None:
+        source_xml = etree.tostring(source_xml)
+    return (node.label_id(), node.text, node.title or '',
+            getattr(node, 'tagged_text', '') or '', node.node_type,
+            source_xml or '')
+
+
+def _digest(fields, child_digests):
+    """Matches the digest used by FrozenNode"""
+    label_id, text, title, tagged_text, node_type, _ = fields
+    hasher = hashlib.sha256()
+    hasher.update(text.encode('utf-8'))
+    hasher.update(tagged_text.encode('utf-8'))
+    hasher.update(title.encode('utf-8'))
+    hasher.update(label_id.encode('utf-8'))
+    hasher.update(node_type)
+    for child_digest in child_digests:
+        hasher.update(hexlify(child_digest))
+    return hasher.digest()
+
+
+def serialize(root):
+    """Convert a tree of struct.Nodes into the snapshot format"""
+    nodes, parents = [root], [-1]
+    child_ranges = []
+    queue = deque([0])
+    while queue:
+        idx = queue.popleft()
+        start = len(nodes)
+        for child in nodes[idx].children:
+            queue.append(len(nodes))
+            nodes.append(child)
+            parents.append(idx)
+        child_ranges.append((start, len(nodes)))
+
+    fields = [_fields_of(node) for node in nodes]
+    digests = [None] * len(nodes)
+    for idx in reversed(range(len(nodes))):
+        start, end = child_ranges[idx]
+        digests[idx] = _digest(fields[idx], digests[start:end])
+
+    blob, offsets, offset = [], [], 0
+    for node_fields in fields:
+        for value in node_fields:
+            encoded = value.encode('utf-8')
+            offsets.append(offset)
+            blob.append(encoded)
+            offset += len(encoded)
+    offsets.append(offset)
+
+    content = [_HEADER.pack(MAGIC, len(nodes))]
+    content.extend(_INT.pack(parent) for parent in parents)
+    content.extend(_RANGE.pack(*child_range) for child_range in child_ranges)
+    content.extend(_UINT.pack(offset) for offset in offsets)
+    content.extend(digests)
+    content.extend(blob)
+    return ''.join(content)
+
+
+class Snapshot(object):
+    """A memory-mapped snapshot file. Only the header is read when
+    opening; everything else is decoded on demand"""
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.size = _HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a tree snapshot: {}".format(path))
+        self._parents_at = _HEADER.size
+        self._ranges_at = self._parents_at + _INT.size * self.size
+        self._offsets_at = self._ranges_at + _RANGE.size * self.size
+        self._digests_at = (self._offsets_at
+                            + _UINT.size * (len(FIELDS) * self.size + 1))
+        self._blob_at = self._digests_at + _DIGEST_SIZE * self.size
+        self._xml_cache = {}
+
+    def close(self):
+        self._buffer.close()
+
+    def parent(self, idx):
+        """Index of the parent node (or None, for the root)"""
+        parent = _INT.unpack_from(self._buffer,
+                                  self._parents_at + _INT.size * idx)[0]
+        if parent >= 0:
+            return parent
+
+    def child_range(self, idx):
+        return _RANGE.unpack_from(self._buffer,
+                                  self._ranges_at + _RANGE.size * idx)
+
+    def field(self, idx, field_name):
+        """Decode a single string field of a single node"""
+        position = (self._offsets_at
+                    + _UINT.size * (len(FIELDS) * idx
+                                    + FIELDS.index(field_name)))
+        start = _UINT.unpack_from(self._buffer, position)[0]
+        end = _UINT.unpack_from(self._buffer, position + _UINT.size)[0]
+        return self._buffer[self._blob_at + start:
+                            self._blob_at + end].decode('utf-8')
+
+    def digest(self, idx):
+        position = self._digests_at + _DIGEST_SIZE * idx
+        return self._buffer[position:position + _DIGEST_SIZE]
+
+    def source_xml(self, idx):
+        """Parsed XML is cached, as it's expensive to re-create"""
+        if idx not in self._xml_cache:
+            xml_str = self.field(idx, 'source_xml')
+            if xml_str:
+                self._xml_cache[idx] = etree.fromstring(xml_str)
+            else:
+                self._xml_cache[idx] = None
+        return self._xml_cache[idx]
+
+    def tree(self):
+        """Root of the tree, as a struct.Node-like view"""
+        return NodeView(self, 0)
+
+    def frozen_tree(self):
+        """Root of the tree, as a struct.FrozenNode-like view"""
+        return FrozenNodeView(self, 0)
+
+
+class _View(object):
+    """Shared logic for views of a single node within a snapshot"""
+    __slots__ = ('_snapshot', '_idx')
+
+    def __init__(self, snapshot, idx):
+        self._snapshot = snapshot
+        self._idx = idx
+
+    @property
+    def text(self):
+        return self._snapshot.field(self._idx, 'text')
+
+    @property
+    def node_type(self):
+        return self._snapshot.field(self._idx, 'node_type')
+
+    @property
+    def source_xml(self):
+        return self._snapshot.source_xml(self._idx)
+
+    @property
+    def children(self):
+        start, end = self._snapshot.child_range(self._idx)
+        return [self.__class__(self._snapshot, idx)
+                for idx in range(start, end)]
+
+    @property
+    def hash(self):
+        return hexlify(self._snapshot.digest(self._idx))
+
+    def _label_id(self):
+        return self._snapshot.field(self._idx, 'label_id')
+
+    def _label(self):
+        label_id = self._label_id()
+        return label_id.split('-') if label_id else []
+
+
+class NodeView(_View):
+    """Read-only stand-in for struct.Node"""
+    __slots__ = ()
+    depth = Node.__dict__['depth']
+
+    @property
+    def label(self):
+        return [str(l) for l in self._label()]
+
+    def label_id(self):
+        return str(self._label_id())
+
+    @property
+    def title(self):
+        return self._snapshot.field(self._idx, 'title') or None
+
+    @property
+    def tagged_text(self):
+        """Mirrors struct.Node, where this attribute is only present if
+        there is tagged text"""
+        tagged_text = self._snapshot.field(self._idx, 'tagged_text')
+        if not tagged_text:
+            raise AttributeError('tagged_text')
+        return tagged_text
+
+    def __repr__(self):
+        return 'NodeView({}, {})'.format(self._idx, self.label_id())
+
+
+class FrozenNodeView(_View):
+    """Read-only stand-in for struct.FrozenNode. Comparisons use the stored
+    digests, so unchanged subtrees are never inspected"""
+    __slots__ = ()
+
+    @property
+    def label(self):
+        return tuple(self._label())
+
+    @property
+    def label_id(self):
+        return self._label_id()
+
+    @property
+    def title(self):
+        return self._snapshot.field(self._idx, 'title')
+
+    @property
+    def tagged_text(self):
+        return self._snapshot.field(self._idx, 'tagged_text')
+
+    def __hash__(self):
+        return hash(self._snapshot.digest(self._idx))
+
+    def __eq__(self, other):
+        return (isinstance(other, FrozenNodeView)
+                and self._snapshot.digest(self._idx) ==
+                other._snapshot.digest(other._idx))
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'FrozenNodeView({}, {})'.format(self._idx, self.label_id)
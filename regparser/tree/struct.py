@@ -1,5 +1,4 @@
 import re
-from collections import defaultdict
 from json import JSONEncoder
 import hashlib
 
@@ -32,6 +31,18 @@ class Node(object):
         self.node_type = node_type
         self.source_xml = source_xml
 
+    @property
+    def source_xml(self):
+        """The XML this node was parsed from. Nodes decoded from JSON hold a
+        serialized version, which is only parsed when first requested"""
+        if isinstance(self._source_xml, basestring):
+            self._source_xml = etree.fromstring(self._source_xml)
+        return self._source_xml
+
+    @source_xml.setter
+    def source_xml(self, value):
+        self._source_xml = value
+
     def __repr__(self):
         return (("Node( text = %s, children = %s, label = %s, title = %s, "
                 + "node_type = %s)") % (repr(self.text), repr(self.children),
@@ -45,11 +56,11 @@ class Node(object):
 
     def depth(self):
         """Inspect the label and type to determine the node's depth"""
-        if len(self.label) > 1 and self.node_type in (self.REGTEXT,
-                                                      self.EXTRACT):
+        if len(self.label) > 1 and self.node_type in (Node.REGTEXT,
+                                                      Node.EXTRACT):
             #   Add one for the subpart level
             return len(self.label) + 1
-        elif self.node_type in (self.SUBPART, self.EMPTYPART):
+        elif self.node_type in (Node.SUBPART, Node.EMPTYPART):
             #   Subparts all on the same level
             return 2
         else:
@@ -69,7 +80,7 @@ class NodeEncoder(JSONEncoder):
             fields = dict(obj.__dict__)
             if obj.title is None:
                 del fields['title']
-            for field in ('tagged_text', 'source_xml', 'child_labels'):
+            for field in ('tagged_text', '_source_xml', 'child_labels'):
                 if field in fields:
                     del fields[field]
             return fields
@@ -84,9 +95,13 @@ class FullNodeEncoder(JSONEncoder):
     def default(self, obj):
         if isinstance(obj, Node):
             result = {field: getattr(obj, field, None)
-                      for field in self.FIELDS}
-            if obj.source_xml is not None:
-                result['source_xml'] = etree.tostring(obj.source_xml)
+                      for field in self.FIELDS if field != 'source_xml'}
+            # Avoid parsing XML which was never accessed
+            source_xml = obj._source_xml
+            if source_xml is not None and not isinstance(source_xml,
+                                                         basestring):
+                source_xml = etree.tostring(source_xml)
+            result['source_xml'] = source_xml
             return result
         return super(FullNodeEncoder, self).default(obj)
 
@@ -112,8 +127,9 @@ def full_node_decode_hook(d):
         node = Node(**params)
         if d['tagged_text']:
             node.tagged_text = d['tagged_text']
-        if node.source_xml:
-            node.source_xml = etree.fromstring(node.source_xml)
+        if not d['source_xml']:
+            node.source_xml = None
+        # otherwise, source_xml will be parsed lazily
         return node
     return d
 
@@ -123,10 +139,7 @@ def frozen_node_decode_hook(d):
     if set(d.keys()) == FullNodeEncoder.FIELDS:
         params = dict(d)
         del(params['source_xml'])
-        fresh = FrozenNode(**params)
-        for el in FrozenNode._pool[fresh.hash]:
-            if el == fresh:
-                return el   # note we are _not_ returning fresh
+        return FrozenNode.interned(**params)
     return d
 
 
@@ -229,7 +242,7 @@ def treeify(nodes):
 
 class FrozenNode(object):
     """Immutable interface for nodes. No guarantees about internal state."""
-    _pool = defaultdict(set)    # collection of all FrozenNodes, keyed by hash
+    _pool = {}  # canonical FrozenNodes, keyed by their field/children key
 
     def __init__(self, text='', children=(), label=(), title='',
                  node_type=Node.REGTEXT, tagged_text=''):
@@ -239,8 +252,11 @@ class FrozenNode(object):
         self._title = title or ''
         self._node_type = node_type
         self._tagged_text = tagged_text or ''
-        self._hash = self._generate_hash()
-        FrozenNode._pool[self.hash].add(self)
+        self._hash = None
+        self._key = FrozenNode._generate_key(
+            self._text, self._children, self._label, self._title,
+            self._node_type, self._tagged_text)
+        FrozenNode._pool.setdefault(self._key, self)
 
     @property
     def text(self):
@@ -268,10 +284,24 @@ class FrozenNode(object):
 
     @property
     def hash(self):
+        """Digest of all fields, including the children's digests. This is
+        only computed when first requested"""
+        if self._hash is None:
+            self._hash = self._generate_hash()
         return self._hash
 
+    @staticmethod
+    def _generate_key(text, children, label, title, node_type, tagged_text):
+        """Fields which uniquely identify a node. Children are represented by
+        the identity of their canonical (pooled) instance, so two keys are
+        equal exactly when their subtrees are equal, without needing to
+        digest or inspect those subtrees"""
+        child_ids = tuple(id(FrozenNode._pool[child._key])
+                          for child in children)
+        return (text, tagged_text, title, label, node_type, child_ids)
+
     def _generate_hash(self):
-        """Called during instantiation. Digests all fields"""
+        """Digests all fields"""
         hasher = hashlib.sha256()
         hasher.update(self.text.encode('utf-8'))
         hasher.update(self.tagged_text.encode('utf-8'))
@@ -283,23 +313,34 @@ class FrozenNode(object):
         return hasher.hexdigest()
 
     def __hash__(self):
-        """As the hash property is already distinctive, re-use it"""
-        return hash(self.hash)
+        """The key is already distinctive and much cheaper than the digest"""
+        return hash(self._key)
 
     def __eq__(self, other):
         """We define equality as having the same fields except for children.
-        Instead of recursively inspecting them, we compare only their hash
-        (this is a Merkle tree)"""
-        return (other.__class__ == self.__class__
-                and self.hash == other.hash
-                # Compare the fields to limit the effect of hash collisions
-                and self.text == other.text
-                and self.title == other.title
-                and self.node_type == other.node_type
-                and self.tagged_text == other.tagged_text
-                and self.label_id == other.label_id
-                and [c.hash for c in self.children] ==
-                    [c.hash for c in other.children])
+        Instead of recursively inspecting them, we compare only their
+        canonical instances (akin to a Merkle tree)"""
+        return (self is other
+                or (other.__class__ == self.__class__
+                    and self._key == other._key))
+
+    def __ne__(self, other):
+        return not self == other
+
+    @staticmethod
+    def interned(text='', children=(), label=(), title='',
+                 node_type=Node.REGTEXT, tagged_text=''):
+        """Return the pooled FrozenNode with these fields, only creating a new
+        instance if no equivalent node has been seen"""
+        text, title, tagged_text = text or '', title or '', tagged_text or ''
+        children, label = tuple(children), tuple(label)
+        key = FrozenNode._generate_key(text, children, label, title,
+                                       node_type, tagged_text)
+        existing = FrozenNode._pool.get(key)
+        if existing is None:
+            existing = FrozenNode(text, children, label, title, node_type,
+                                  tagged_text)
+        return existing
 
     @staticmethod
     def from_node(node):
@@ -307,13 +348,11 @@ class FrozenNode(object):
         also checks if this node has already been instantiated. If so, it
         returns the instantiated version (i.e. only one of each identical node
         exists in memory)"""
-        children = map(FrozenNode.from_node, node.children)
-        fresh = FrozenNode(text=node.text, children=children, label=node.label,
-                           title=node.title or '', node_type=node.node_type,
-                           tagged_text=getattr(node, 'tagged_text', '') or '')
-        for el in FrozenNode._pool[fresh.hash]:
-            if el == fresh:
-                return el   # note we are _not_ returning fresh
+        children = [FrozenNode.from_node(child) for child in node.children]
+        return FrozenNode.interned(
+            text=node.text, children=children, label=node.label,
+            title=node.title, node_type=node.node_type,
+            tagged_text=getattr(node, 'tagged_text', ''))
 
     @property
     def label_id(self):
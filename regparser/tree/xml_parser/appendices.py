@@ -264,8 +264,7 @@ class AppendixProcessor(object):
         self.set_letter(appendix)
         remove_toc(appendix, self.appendix_letter)
 
-        def is_subhead(tag, text):
-            initial = initial_marker(text)
+        def is_subhead(tag, text, initial):
             return ((tag == 'HD' and (not initial or '.' in initial[1]))
                     or (tag in ('P', 'FP')
                         and title_label_pair(text, self.appendix_letter,
@@ -273,14 +272,16 @@ class AppendixProcessor(object):
 
         for child in appendix.getchildren():
             text = tree_utils.get_node_text(child, add_spaces=True).strip()
+            initial = tree_utils.memoize_for_node(
+                child, 'appendix_marker', lambda: initial_marker(text))
             if ((child.tag == 'HD' and child.attrib['SOURCE'] == 'HED')
                     or child.tag == 'RESERVED'):
                 self.end_group()
                 self.hed(part, text)
-            elif is_subhead(child.tag, text):
+            elif is_subhead(child.tag, text, initial):
                 self.end_group()
                 self.subheader(child, text)
-            elif initial_marker(text) and child.tag in ('P', 'FP', 'HD'):
+            elif initial and child.tag in ('P', 'FP', 'HD'):
                 text = self.insert_dashes(child, text)
                 self.paragraph_with_marker(
                     text,
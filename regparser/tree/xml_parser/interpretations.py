@@ -99,11 +99,18 @@ def is_title(xml_node):
                                force_start=True)))
 
 
+def _is_title(xml_node):
+    """is_title is checked for each node by parse_from_xml and then for its
+    siblings by process_inner_children; only parse the text once"""
+    return tree_utils.memoize_for_node(xml_node, 'interp_title',
+                                       lambda: is_title(xml_node))
+
+
 def process_inner_children(inner_stack, xml_node):
     """Process the following nodes as children of this interpretation. This
     is very similar to reg_text.py:build_from_section()"""
     children = itertools.takewhile(
-        lambda x: not is_title(x), xml_node.itersiblings())
+        lambda x: not _is_title(x), xml_node.itersiblings())
     nodes = []
     for xml_node in filter(lambda c: c.tag in ('P', 'STARS'), children):
         node_text = tree_utils.get_node_text(xml_node, add_spaces=True)
@@ -207,7 +214,7 @@ def parse_from_xml(root, xml_nodes):
         #   Explicitly ignore "subpart" headers, as they are inconsistent
         #   and they will be reconstructed as subterps client-side
         text = tree_utils.get_node_text(ch, add_spaces=True)
-        if is_title(ch) and 'subpart' not in text.lower():
+        if _is_title(ch) and 'subpart' not in text.lower():
             labels = text_to_labels(text, label_obj)
             if labels:
                 label = merge_labels(labels)
@@ -3,9 +3,12 @@ import logging
 
 from regparser.layer.formatting import table_xml_to_plaintext
 from regparser.tree.depth import heuristics, markers as mtypes
-from regparser.tree.depth.derive import debug_idx, derive_depths
+from regparser.tree.depth.derive import (
+    Budget, BudgetExceeded, debug_idx, derive_best_depths, derive_depths,
+    greedy_depths)
 from regparser.tree.struct import Node
 from regparser.tree.xml_parser import tree_utils
+import settings
 
 
 class ParagraphProcessor(object):
@@ -17,6 +20,11 @@ class ParagraphProcessor(object):
 
     # Subclasses should override the following interface
     MATCHERS = []
+    # (heuristic, weight) pairs used to select between depth solutions
+    DEPTH_HEURISTICS = [
+        (heuristics.prefer_diff_types_diff_levels, 0.8),
+        (heuristics.prefer_multiple_children, 0.4),
+        (heuristics.prefer_shallow_depths, 0.2)]
 
     def parse_nodes(self, xml):
         """Derive a flat list of nodes from this xml chunk. This does nothing
@@ -39,9 +47,8 @@ class ParagraphProcessor(object):
     def select_depth(self, depths):
         """There might be multiple solutions to our depth processing problem.
         Use heuristics to select one."""
-        depths = heuristics.prefer_diff_types_diff_levels(depths, 0.8)
-        depths = heuristics.prefer_multiple_children(depths, 0.4)
-        depths = heuristics.prefer_shallow_depths(depths, 0.2)
+        for heuristic, weight in self.DEPTH_HEURISTICS:
+            depths = heuristic(depths, weight)
         depths = sorted(depths, key=lambda d: d.weight, reverse=True)
         return depths[0]
 
@@ -120,23 +127,53 @@ class ParagraphProcessor(object):
         if nodes:
             markers = [node.label[0] for node in nodes]
             constraints = self.additional_constraints()
-            depths = derive_depths(markers, constraints)
-            if not depths:
-                fails_at = debug_idx(markers, constraints)
-                logging.error(
-                    "Could not determine paragraph depths (<%s /> %s):\n"
-                    "%s\n"
-                    "?? %s\n"
-                    "Remaining markers: %s",
-                    xml.tag, root.label_id(),
-                    derive_depths(markers[:fails_at],
-                                  constraints)[0].pretty_str(),
-                    markers[fails_at], markers[fails_at + 1:])
-            depths = self.select_depth(depths)
+            budget = Budget(settings.DEPTH_BUDGET_SECONDS,
+                            settings.DEPTH_BUDGET_SOLUTIONS)
+            try:
+                depths = self.select_depth(self.find_depths(
+                    xml, root, markers, constraints, budget))
+            except BudgetExceeded:
+                logging.warning(
+                    "Gave up deriving paragraph depths (<%s /> %s) after "
+                    "%.1f seconds; falling back to a greedy assignment.\n"
+                    "Markers: %s",
+                    xml.tag, root.label_id(), budget.elapsed(), markers)
+                depths = greedy_depths(markers, constraints,
+                                       self.DEPTH_HEURISTICS)
             return self.build_hierarchy(root, nodes, depths)
         else:
             return root
 
+    def find_depths(self, xml, root, markers, constraints, budget):
+        """All solutions (or only the best, if so configured) for these
+        markers. Logs an error if there are none"""
+        if settings.BEST_FIRST_DEPTHS:
+            depths = self.best_depths(markers, constraints, root, budget)
+        else:
+            depths = derive_depths(markers, constraints, budget)
+        if not depths:
+            fails_at = debug_idx(markers, constraints, budget)
+            logging.error(
+                "Could not determine paragraph depths (<%s /> %s):\n"
+                "%s\n"
+                "?? %s\n"
+                "Remaining markers: %s",
+                xml.tag, root.label_id(),
+                derive_depths(markers[:fails_at],
+                              constraints)[0].pretty_str(),
+                markers[fails_at], markers[fails_at + 1:])
+        return depths
+
+    def best_depths(self, markers, constraints, root, budget=None):
+        """Rather than computing every solution, search for the best one
+        directly. Returns a list with (at most) one solution"""
+        result = derive_best_depths(markers, constraints,
+                                    self.DEPTH_HEURISTICS, budget=budget)
+        logging.debug("Depths of %s: expanded %d partial solutions, scored "
+                      "%d complete solutions", root.label_id(),
+                      result.expanded, len(result.explored))
+        return result.solutions
+
     def additional_constraints(self):
         """Hook for subtypes to add additional constraints"""
         return []
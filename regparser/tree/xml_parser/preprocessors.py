@@ -1,36 +1,104 @@
 # vim: set encoding=utf-8
 """Set of transforms we run on notice XML to account for common inaccuracies
-in the XML"""
+in the XML. Rather than each transform searching the whole document, they
+declare the tags they are interested in; `preprocess` collects all of those
+elements in a single walk and shares them between the transforms"""
 import abc
+from bisect import bisect_right
+from collections import defaultdict
 from copy import deepcopy
 import logging
 import re
+import time
 
 from lxml import etree
 
 from regparser.tree.xml_parser.tree_utils import get_node_text
 
 
+class ElementIndex(object):
+    """Elements with the requested tags (within `xml`, including `xml`
+    itself), grouped by tag in document order. The document is walked once;
+    transforms which add elements must either `replace` them here or
+    `invalidate` the index (causing another walk). Elements may have been
+    re-tagged or removed from the document since they were indexed, so
+    callers should check"""
+    def __init__(self, xml, tags):
+        self.xml = xml
+        self.tags = tuple(set(tags))
+        self._walk()
+
+    def _walk(self):
+        self._by_tag, self._positions = defaultdict(list), {}
+        for position, element in enumerate(self.xml.iter(*self.tags)):
+            self._by_tag[element.tag].append(element)
+            self._positions[element] = position
+
+    def invalidate(self):
+        self._by_tag, self._positions = None, None
+
+    def find(self, *tags):
+        if self._by_tag is None:
+            self._walk()
+        if len(tags) == 1:
+            return list(self._by_tag[tags[0]])
+        found = [el for tag in tags for el in self._by_tag[tag]]
+        return sorted(found, key=self._positions.get)
+
+    def position(self, element):
+        """Order within the document, as of the walk"""
+        if self._positions is None:
+            self._walk()
+        return self._positions[element]
+
+    def replace(self, tag, replacements):
+        """`replacements` maps elements (with this tag) to the list of
+        elements now in their place"""
+        if self._by_tag is None or not replacements:
+            return
+        elements = []
+        for element in self._by_tag[tag]:
+            for new_el in replacements.get(element, [element]):
+                self._positions[new_el] = self._positions[element]
+                elements.append(new_el)
+        self._by_tag[tag] = elements
+
+    def in_document(self, element):
+        """Is this element still within the indexed part of the document?"""
+        return element is self.xml or self.xml in element.iterancestors()
+
+
 class PreProcessorBase(object):
     """Base class for all the preprocessors. Defines the interface they must
     implement"""
     __metaclass__ = abc.ABCMeta
+    # Tags of the elements this preprocessor inspects; see ElementIndex
+    TAGS = ()
 
     @abc.abstractmethod
-    def transform(self, xml):
+    def transform(self, xml, index=None):
         """Transform the input xml. Mutates that xml, so be sure to make a
-        copy if needed"""
+        copy if needed. `index` is shared between preprocessors; if absent,
+        one is created"""
         raise NotImplementedError()
 
+    def index_for(self, xml, index):
+        if index is None:
+            index = ElementIndex(xml, self.TAGS)
+        return index
+
 
 class MoveLastAMDPar(PreProcessorBase):
     """If the last element in a section is an AMDPAR, odds are the authors
     intended it to be associated with the following section"""
-    AMDPAR_WITHOUT_FOLLOWING = "//AMDPAR[not(following-sibling::*)]"
+    TAGS = ('AMDPAR',)
 
-    def transform(self, xml):
+    def transform(self, xml, index=None):
         # AMDPAR with no following node
-        for amdpar in xml.xpath(self.AMDPAR_WITHOUT_FOLLOWING):
+        amdpars = [amdpar for amdpar
+                   in self.index_for(xml, index).find('AMDPAR')
+                   if next(amdpar.itersiblings(etree.Element), None) is None]
+        for amdpar in amdpars:
             parent = amdpar.getparent()
             aunt = parent.getnext()
             if aunt is not None and parent.get('PART') == aunt.get('PART'):
@@ -40,14 +108,20 @@ class MoveLastAMDPar(PreProcessorBase):
 
 class SupplementAMDPar(PreProcessorBase):
     """Supplement I AMDPARs are often incorrect (labelled as Ps)"""
+    TAGS = ('HD',)
     CONTAINS_SUPPLEMENT = "contains(., 'Supplement I')"
-    SUPPLEMENT_HD = "//REGTEXT//HD[@SOURCE='HD1' and {}]".format(
-        CONTAINS_SUPPLEMENT)
     SUPPLEMENT_AMD_OR_P = "./AMDPAR[{0}]|./P[{0}]".format(
         CONTAINS_SUPPLEMENT)
 
-    def transform(self, xml):
-        for supp_header in xml.xpath(self.SUPPLEMENT_HD):
+    def is_supplement_hd(self, hd):
+        return (hd.get('SOURCE') == 'HD1'
+                and next(hd.iterancestors('REGTEXT'), None) is not None
+                and hd.xpath(self.CONTAINS_SUPPLEMENT))
+
+    def transform(self, xml, index=None):
+        headers = [hd for hd in self.index_for(xml, index).find('HD')
+                   if self.is_supplement_hd(hd)]
+        for supp_header in headers:
             parent = supp_header.getparent()
             if parent.xpath(self.SUPPLEMENT_AMD_OR_P):
                 self.set_prev_to_amdpar(supp_header.getprevious())
@@ -65,11 +139,16 @@ class SupplementAMDPar(PreProcessorBase):
 
 class ParenthesesCleanup(PreProcessorBase):
     """Clean up where parentheses exist between paragraph an emphasis tags"""
-    def transform(self, xml):
+    TAGS = ('P',)
+
+    def transform(self, xml, index=None):
         # We want to treat None's as blank strings
         _str = lambda x: x or ""
-        for par in xml.xpath("//P/*[position()=1 and name()='E']/.."):
-            em = par.getchildren()[0]   # must be an E due to the xpath
+        for par in self.index_for(xml, index).find('P'):
+            first_child = next(par.iterchildren(etree.Element), None)
+            if par.tag != 'P' or getattr(first_child, 'tag', None) != 'E':
+                continue
+            em = par.getchildren()[0]   # must be an E due to the check
 
             outside_open = _str(par.text).endswith("(")
             inside_open = _str(em.text).startswith("(")
@@ -90,12 +169,15 @@ class ParenthesesCleanup(PreProcessorBase):
 
 
 class MoveAdjoiningChars(PreProcessorBase):
+    TAGS = ('P',)
     ORPHAN_REGEX = re.compile(ur"(\.|—)")
 
-    def transform(self, xml):
+    def transform(self, xml, index=None):
         # if an e tag has an emdash or period after it, put the
         # char inside the e tag
-        for e in xml.xpath("//P/E"):
+        pars = self.index_for(xml, index).find('P')
+        for e in (e for par in pars if par.tag == 'P'
+                  for e in par.iterchildren('E')):
             orphan = self.ORPHAN_REGEX.match(e.tail or '')
 
             if orphan:
@@ -107,19 +189,24 @@ class ApprovalsFP(PreProcessorBase):
     """We expect certain text to an APPRO tag, but it is often mistakenly
     found inside FP tags. We use REGEX to determine which nodes need to be
     fixed."""
+    TAGS = ('FP', 'APPRO')
     REGEX = re.compile(
         r"\(.*approved by the office of management and budget under control "
         r"number .*\)", re.IGNORECASE)
 
-    def transform(self, xml):
-        for fp in xml.xpath(".//FP"):
-            if self.REGEX.match(fp.text or ""):
+    def transform(self, xml, index=None):
+        index = self.index_for(xml, index)
+        for fp in index.find('FP'):
+            if fp is not xml and self.REGEX.match(fp.text or ""):
                 fp.tag = 'APPRO'
-        self.strip_extracts(xml)
+        self.strip_extracts(xml, index)
 
-    def strip_extracts(self, xml):
+    def strip_extracts(self, xml, index=None):
         """APPROs should not be alone in an EXTRACT"""
-        for appro in xml.xpath(".//APPRO"):
+        index = self.index_for(xml, index)
+        appros = [appro for appro in index.find('FP', 'APPRO')
+                  if appro.tag == 'APPRO' and appro is not xml]
+        for appro in appros:
             parent = appro.getparent()
             inside_extract = parent.tag == 'EXTRACT'
             no_prev = appro.getprevious() is None
@@ -134,6 +221,7 @@ class ApprovalsFP(PreProcessorBase):
 class ExtractTags(PreProcessorBase):
     """Often, what should be a single EXTRACT tag is broken up by incorrectly
     positioned subtags. Try to find any such EXTRACT sandwiches and merge."""
+    TAGS = ('EXTRACT',)
     FILLING = ('FTNT', 'GPOTABLE')  # tags which shouldn't be between EXTRACTs
 
     def extract_pair(self, extract):
@@ -183,14 +271,20 @@ class ExtractTags(PreProcessorBase):
             parent.replace(extract, new_el)
             parent.remove(next_el)
 
-    def transform(self, xml):
+    def transform(self, xml, index=None):
         # we're going to be mutating the tree while searching it, so we'll
         # reset after every find
+        index = self.index_for(xml, index)
         should_continue = True
         while should_continue:
             should_continue = False
-            for extract in xml.xpath(".//EXTRACT"):
+            for extract in index.find('EXTRACT'):
+                if (extract is xml or extract.tag != 'EXTRACT'
+                        or not index.in_document(extract)):
+                    continue
                 if self.extract_pair(extract) or self.sandwich(extract):
+                    # merging re-parses the EXTRACTs' contents
+                    index.invalidate()
                     should_continue = True
                     break
 
@@ -200,22 +294,29 @@ class Footnotes(PreProcessorBase):
     referenced. To make it more semantic (and easier to process), we find the
     relevant footnote and attach its text to the references. We also need to
     split references apart if multiple footnotes apply to the same <SU>"""
-    # SU indicates both the reference and the content of the footnote;
-    # distinguish by looking at ancestors
-    IS_REF_PREDICATE = 'not(ancestor::TNOTE) and not(ancestor::FTNT)'
-    XPATH_IS_REF = './/SU[{}]'.format(IS_REF_PREDICATE)
-    # Find the content of a footnote to associate with a reference
-    XPATH_FIND_NOTE_TPL = \
-        "./following::SU[(ancestor::TNOTE or ancestor::FTNT) and text()='{}']"
-
-    def transform(self, xml):
-        self.split_comma_footnotes(xml)
-        self.add_ref_attributes(xml)
-
-    def split_comma_footnotes(self, xml):
+    TAGS = ('SU',)
+
+    @staticmethod
+    def is_note(su):
+        """SU indicates both the reference and the content of the footnote;
+        distinguish by looking at ancestors"""
+        return next(su.iterancestors('TNOTE', 'FTNT'), None) is not None
+
+    def references(self, xml, index):
+        return [su for su in index.find('SU')
+                if su is not xml and su.tag == 'SU' and not self.is_note(su)]
+
+    def transform(self, xml, index=None):
+        index = self.index_for(xml, index)
+        self.split_comma_footnotes(xml, index)
+        self.add_ref_attributes(xml, index)
+
+    def split_comma_footnotes(self, xml, index=None):
         """Convert XML such as <SU>1, 2, 3</SU> into distinct SU elements:
         <SU>1</SU> <SU>2</SU> <SU>3</SU> for easier reference"""
-        for ref_xml in xml.xpath(self.XPATH_IS_REF):
+        index = self.index_for(xml, index)
+        replacements = {}
+        for ref_xml in self.references(xml, index):
             parent = ref_xml.getparent()
             idx_in_parent = parent.index(ref_xml)
             parent.remove(ref_xml)  # we will be replacing this shortly
@@ -229,11 +330,14 @@ class Footnotes(PreProcessorBase):
 
             tail_texts = [strip_comma(tail) for tail in tail_texts]
 
+            replacements[ref_xml] = []
             for idx, (ref, tail) in enumerate(zip(refs, tail_texts)):
                 node = etree.Element("SU")
                 node.text = ref
                 node.tail = tail
                 parent.insert(idx_in_parent + idx, node)
+                replacements[ref_xml].append(node)
+        index.replace('SU', replacements)
 
     def _tails_corresponding_to(self, su, refs):
         """Given an <SU> element and a list of texts it should be broken into,
@@ -251,18 +355,38 @@ class Footnotes(PreProcessorBase):
 
         return list(reversed(tail_texts))
 
-    def add_ref_attributes(self, xml):
+    def find_note(self, ref, notes, index):
+        """The first footnote content following this reference. `notes` maps
+        text to the (position, SU) pairs containing it"""
+        candidates = notes.get(ref.text, [])
+        idx = bisect_right(candidates, (index.position(ref), None))
+        ancestors = set(ref.iterancestors())
+        for _, note in candidates[idx:]:
+            # i.e. the XPath "following" axis
+            if note not in ancestors and ref not in note.iterancestors():
+                return note
+
+    def add_ref_attributes(self, xml, index=None):
         """Modify each footnote reference so that it has an attribute
         containing its footnote content"""
-        for ref in xml.xpath(self.XPATH_IS_REF):
-            sus = ref.xpath(self.XPATH_FIND_NOTE_TPL.format(ref.text))
-            if not sus:
+        index = self.index_for(xml, index)
+        notes = defaultdict(list)
+        for su in index.find('SU'):
+            if (su.tag == 'SU' and self.is_note(su)
+                    and index.in_document(su)):
+                texts = [su.text] + [child.tail for child in su]
+                for text in set(t for t in texts if t is not None):
+                    notes[text].append((index.position(su), su))
+
+        for ref in self.references(xml, index):
+            note_su = self.find_note(ref, notes, index)
+            if note_su is None:
                 logging.warning(
                     "Could not find corresponding footnote ({}): {}".format(
                         ref.text, etree.tostring(ref.getparent())))
             else:
                 # copy as we need to modify
-                note = deepcopy(sus[0].getparent())
+                note = deepcopy(note_su.getparent())
                 # Modify note to remove the reference text; it's superfluous
                 for su in note.xpath('./SU'):
                     su.text = ''
@@ -271,3 +395,29 @@ class Footnotes(PreProcessorBase):
 
 # Surface all of the PreProcessorBase classes
 ALL = PreProcessorBase.__subclasses__()
+
+# Seconds spent in each preprocessor (and walking the document) across calls
+# to `preprocess`
+timings = defaultdict(float)
+
+
+def preprocess(xml, preprocessors=None):
+    """Run the preprocessors (by default, ALL) in order, sharing a single
+    walk of the document"""
+    preprocessors = ALL if preprocessors is None else preprocessors
+    start = time.time()
+    index = ElementIndex(xml, [tag for preprocessor in preprocessors
+                               for tag in preprocessor.TAGS])
+    timings['walk'] += time.time() - start
+    for preprocessor in preprocessors:
+        start = time.time()
+        preprocessor().transform(xml, index)
+        timings[preprocessor.__name__] += time.time() - start
+    return xml
+
+
+def log_timings(logger=logging):
+    if timings:
+        logger.info("Preprocessing: %s", ", ".join(
+            "{} {:.2f}s".format(name, seconds)
+            for name, seconds in sorted(timings.items())))
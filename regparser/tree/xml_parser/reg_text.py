@@ -1,4 +1,5 @@
 # vim: set encoding=utf-8
+import multiprocessing
 import re
 
 from lxml import etree
@@ -64,9 +65,17 @@ def preprocess_xml(xml):
                 idx += 1
 
 
-def build_tree(reg_xml):
+def build_tree(reg_xml, workers=1):
+    """Build the regulation's tree. If workers > 1, sections are parsed in
+    parallel by that many processes"""
     preprocess_xml(reg_xml)
+    # The XML is not modified while building, so text need only be
+    # extracted from each element once
+    with tree_utils.cached_text():
+        return _build_tree(reg_xml, workers)
 
+
+def _build_tree(reg_xml, workers):
     reg_part = get_reg_part(reg_xml)
     title = get_title(reg_xml)
 
@@ -82,14 +91,25 @@ def build_tree(reg_xml):
         for subjgrp in subpart.xpath('./SUBJGRP'):
             subpart_and_subjgrp_xmls.append(subjgrp)
 
+    build_section = build_from_section
+    if workers > 1:
+        containers = subpart_and_subjgrp_xmls or [part]
+        section_xmls = [c for container in containers
+                        for c in container.getchildren()
+                        if c.tag == 'SECTION']
+        build_section = parallel_section_builder(reg_part, section_xmls,
+                                                 workers)
+
     if len(subpart_and_subjgrp_xmls) > 0:
         subthings = []
         letter_list = []
         for subthing in subpart_and_subjgrp_xmls:
             if subthing.tag == "SUBPART":
-                subthings.append(build_subpart(reg_part, subthing))
+                subthings.append(build_subpart(reg_part, subthing,
+                                               build_section))
             elif subthing.tag == "SUBJGRP":
-                built_subjgrp = build_subjgrp(reg_part, subthing, letter_list)
+                built_subjgrp = build_subjgrp(reg_part, subthing, letter_list,
+                                              build_section)
                 letter_list.append(built_subjgrp.label[-1])
                 subthings.append(built_subjgrp)
 
@@ -98,7 +118,7 @@ def build_tree(reg_xml):
         section_xmls = [c for c in part.getchildren() if c.tag == 'SECTION']
         sections = []
         for section_xml in section_xmls:
-            sections.extend(build_from_section(reg_part, section_xml))
+            sections.extend(build_section(reg_part, section_xml))
         empty_part = reg_text.build_empty_part(reg_part)
         empty_part.children = sections
         tree.children = [empty_part]
@@ -109,6 +129,61 @@ def build_tree(reg_xml):
     return tree
 
 
+def _build_from_section_str(args):
+    """Worker for parallel_section_builder. The section arrives serialized;
+    as XML elements can't be pickled, each node's source_xml is replaced by
+    its path relative to the section (listed in pre-order)"""
+    reg_part, section_str = args
+    section_xml = etree.fromstring(section_str)
+    # Serialization doesn't distinguish empty from missing text
+    section_xml.text = section_xml.text or ''
+    section_tree = section_xml.getroottree()
+    with tree_utils.cached_text():
+        nodes = build_from_section(reg_part, section_xml)
+
+    paths = []
+    to_visit = list(reversed(nodes))
+    while to_visit:
+        node = to_visit.pop()
+        if node.source_xml is None:
+            paths.append(None)
+        else:
+            # e.g. /SECTION/P[3] -> ./P[3]
+            path = section_tree.getpath(node.source_xml)
+            paths.append('.' + path[len('/' + section_xml.tag):])
+            node.source_xml = None
+        to_visit.extend(reversed(node.children))
+    return nodes, paths
+
+
+def parallel_section_builder(reg_part, section_xmls, workers):
+    """Parse all of these sections with a pool of processes. Returns a
+    function with the same signature as build_from_section which looks up
+    the results"""
+    args = [(reg_part, etree.tostring(section_xml, with_tail=False))
+            for section_xml in section_xmls]
+    pool = multiprocessing.Pool(workers)
+    try:
+        results = pool.map(_build_from_section_str, args)
+    finally:
+        pool.close()
+        pool.join()
+
+    built = {}
+    for section_xml, (nodes, paths) in zip(section_xmls, results):
+        to_visit = list(reversed(nodes))
+        for path in paths:
+            node = to_visit.pop()
+            if path is not None:
+                node.source_xml = section_xml.xpath(path)[0]
+            to_visit.extend(reversed(node.children))
+        built[section_xml] = nodes
+
+    def build_section(reg_part, section_xml):
+        return built[section_xml]
+    return build_section
+
+
 def get_subpart_title(subpart_xml):
     hds = subpart_xml.xpath('./RESERVED|./HD')
     if hds:
@@ -121,22 +196,24 @@ def get_subjgrp_title(subjgrp_xml):
         return [hd.text for hd in hds][0]
 
 
-def build_subpart(reg_part, subpart_xml):
+def build_subpart(reg_part, subpart_xml, build_section=None):
+    build_section = build_section or build_from_section
     subpart_title = get_subpart_title(subpart_xml)
     subpart = reg_text.build_subpart(subpart_title, reg_part)
 
     sections = []
     for ch in subpart_xml.getchildren():
         if ch.tag == 'SECTION':
-            sections.extend(build_from_section(reg_part, ch))
+            sections.extend(build_section(reg_part, ch))
 
     subpart.children = sections
     return subpart
 
 
-def build_subjgrp(reg_part, subjgrp_xml, letter_list):
+def build_subjgrp(reg_part, subjgrp_xml, letter_list, build_section=None):
     # This handles subjgrps that have been pulled out and injected into the
     # same level as subparts.
+    build_section = build_section or build_from_section
     subjgrp_title = get_subjgrp_title(subjgrp_xml)
     letter_list, subjgrp = reg_text.build_subjgrp(subjgrp_title, reg_part,
                                                   letter_list)
@@ -144,7 +221,7 @@ def build_subjgrp(reg_part, subjgrp_xml, letter_list):
     sections = []
     for ch in subjgrp_xml.getchildren():
         if ch.tag == 'SECTION':
-            sections.extend(build_from_section(reg_part, ch))
+            sections.extend(build_section(reg_part, ch))
 
     subjgrp.children = sections
     return subjgrp
@@ -183,10 +260,31 @@ def get_markers(text, next_marker=None):
         collapsed = []
     else:
         collapsed = tree_utils.get_collapsed_markers(text)
+    return _check_collapsed(initial, collapsed, next_marker)
+
+
+def get_node_markers(xml, next_marker=None):
+    """Like get_markers, but for an XML element. The grammar scans are
+    memoized per element, as they're needed both for the element and when
+    processing the element which precedes it"""
+    def tagged_text():
+        return tree_utils.get_node_text_tags_preserved(xml).strip()
+    initial = tree_utils.memoize_for_node(
+        xml, 'paragraph_markers',
+        lambda: tree_utils.get_paragraph_markers(tagged_text()))
+    if next_marker is None:
+        collapsed = []
+    else:
+        collapsed = tree_utils.memoize_for_node(
+            xml, 'collapsed_markers',
+            lambda: tree_utils.get_collapsed_markers(tagged_text()))
+    return _check_collapsed(initial, collapsed, next_marker)
+
 
-    #   Check that the collapsed markers make sense:
-    #   * at least one level below the initial marker
-    #   * followed by a marker in sequence
+def _check_collapsed(initial, collapsed, next_marker):
+    """Check that the collapsed markers make sense:
+    * at least one level below the initial marker
+    * followed by a marker in sequence"""
     if initial and collapsed:
         collapsed = [c for c in collapsed if _deeper_level(initial[-1], c)]
         for marker in reversed(collapsed):
@@ -263,8 +361,7 @@ class ParagraphMatcher(paragraph_processor.BaseMatcher):
 
     def derive_nodes(self, xml, processor=None):
         text = ''
-        tagged_text = tree_utils.get_node_text_tags_preserved(xml).strip()
-        markers_list = get_markers(tagged_text, self.next_marker(xml))
+        markers_list = get_node_markers(xml, self.next_marker(xml))
         nodes = []
         for m, node_text in get_markers_and_text(xml, markers_list):
             text, tagged_text = node_text
@@ -287,8 +384,7 @@ class ParagraphMatcher(paragraph_processor.BaseMatcher):
         if getattr(node, 'tag', None) == mtypes.STARS_TAG:
             return mtypes.STARS_TAG
         elif node is not None:
-            tagged_text = tree_utils.get_node_text_tags_preserved(node)
-            markers = get_markers(tagged_text.strip())
+            markers = get_node_markers(node)
             if markers:
                 return markers[0]
 
@@ -1,12 +1,13 @@
 # vim: set encoding=utf-8
-from copy import deepcopy
+from contextlib import contextmanager
 import HTMLParser
-from itertools import chain
 
 from pyparsing import Literal, Optional, Regex, Suppress
 
 from regparser.citations import remove_citation_overlaps
-from regparser.grammar.unified import any_depth_p
+from regparser.grammar import compiled
+from regparser.grammar.utils import regex_literal, RegexGrammar
+from regparser.grammar.utils import REGEX_WS as WS
 from regparser.tree.paragraph import p_levels
 from regparser.tree.priority_stack import PriorityStack
 
@@ -57,18 +58,26 @@ def split_text(text, tokens):
     return texts
 
 
+# We scan with the equivalent _compiled_first_markers; these pyparsing
+# grammars are the reference for them
 _first_markers = []
+_compiled_first_markers = []
 for idx, level in enumerate(p_levels):
     marker = (Suppress(Regex(u',|\.|-|—|>'))
               + Suppress('(')
               + Literal(level[0])
               + Suppress(')'))
+    pattern = (u'(?:,|\.|-|—|>)' + WS + r'\(' + WS + regex_literal(level[0])
+               + WS + r'\)')
     for inner_idx in range(idx + 1, len(p_levels)):
         inner_level = p_levels[inner_idx]
         marker += Optional(Suppress('(')
                            + Literal(inner_level[0])
                            + Suppress(')'))
+        pattern += (WS + r'(?:\(' + WS + regex_literal(inner_level[0]) + WS
+                    + r'\))?')
     _first_markers.append(marker)
+    _compiled_first_markers.append(RegexGrammar(pattern))
 
 
 def get_collapsed_markers(text):
@@ -77,7 +86,7 @@ def get_collapsed_markers(text):
     (c) cContent —(1) 1Content (i) iContent"""
 
     matches = []
-    for parser in _first_markers:
+    for parser in _compiled_first_markers:
         matches.extend(parser.scanString(text))
 
     #   remove matches at the beginning
@@ -95,7 +104,7 @@ def get_paragraph_markers(text):
     """ From a body of text that contains paragraph markers, extract the
     initial markers. """
 
-    for citation, start, end in any_depth_p.scanString(text):
+    for citation, start, end in compiled.any_depth_p.scanString(text):
         if start == 0:
             markers = [citation.p1, citation.p2, citation.p3, citation.p4,
                        citation.p5, citation.p6]
@@ -123,61 +132,137 @@ def _combine_with_space(prev_text, next_text, add_space_if_needed):
         return prev_text + next_text
 
 
-def _replace_xml_node_with_text(node, text):
-    """There are some complications w/ lxml when determining where to add the
-    replacement text. Account for all of that here."""
-    parent, prev = node.getparent(), node.getprevious()
-    if prev is not None:
-        prev.tail = (prev.tail or '') + text
-    else:
-        parent.text = (parent.text or '') + text
-    parent.remove(node)
+def _subscript(child, add_spaces):
+    if child.tag == 'E' and child.get('T') == '52':
+        return "_{" + child.text + "}"
 
 
-def get_node_text(node, add_spaces=False):
-    """ Extract all the text from an XML node (including the text of it's
-    children). """
-    node = deepcopy(node)
-    # subscripts
-    for e in node.xpath(".//E[@T='52']"):
-        text = _combine_with_space("_{" + e.text + "}", e.tail, add_spaces)
-        _replace_xml_node_with_text(e, text)
-    # footnotes
-    for su in node.xpath(".//SU[@footnote]"):
-        footnote = su.attrib['footnote']
+def _footnote(child, add_spaces):
+    if child.tag == 'SU' and 'footnote' in child.attrib:
+        footnote = child.attrib['footnote']
         footnote = footnote.replace('(', r'\(').replace(')', r'\)')
-        text = u"[^{}]({})".format(su.text, footnote)
-        text = _combine_with_space(text, su.tail, add_spaces)
-        _replace_xml_node_with_text(su, text)
+        text = _fold(child.text, _children(child), _subscript, add_spaces)[0]
+        return u"[^{}]({})".format(text, footnote)
+
+
+def _children(node):
+    return [(child, child.tail) for child in node]
+
+
+def _fold(text, children, replacement_fn, add_spaces):
+    """Subscripts and footnotes are replaced with text, which is appended to
+    the text of the element's parent (if it's the first child) or the tail
+    of its previous sibling. Rather than modifying the XML, compute the
+    resulting parent text and (child, tail) pairs of the remaining
+    children"""
+    kept = []
+    for child, tail in children:
+        replacement = replacement_fn(child, add_spaces)
+        if replacement is None:
+            kept.append((child, tail))
+            continue
+        replacement = _combine_with_space(replacement, tail, add_spaces)
+        if kept:
+            prev, prev_tail = kept[-1]
+            kept[-1] = (prev, (prev_tail or '') + replacement)
+        else:
+            text = (text or '') + replacement
+    return text, kept
+
+
+def _replaced(node, add_spaces):
+    """Text and (child, tail) pairs of a node once subscripts, then
+    footnotes have been replaced"""
+    text, children = _fold(node.text, _children(node), _subscript,
+                           add_spaces)
+    return _fold(text, children, _footnote, add_spaces)
+
+
+_html_parser = HTMLParser.HTMLParser()
+
+
+class _NodeText(object):
+    """Text extracted from a single XML element, in the forms we use. The
+    element is never modified"""
+    def __init__(self, node):
+        self.node = node
+        self._plain = {}
+        self.memo = {}
+
+    @property
+    def tagged(self):
+        if not hasattr(self, '_tagged'):
+            parts = [self.node.text or '']
+            for child in self.node:
+                if child.tag == 'E':
+                    # xlmns non-sense makes me do this.
+                    parts.append('<E T="03">%s</E>' % child.text)
+                if child.tail is not None:
+                    parts.append(child.tail)
+            self._tagged = _html_parser.unescape(''.join(parts))
+        return self._tagged
+
+    def plain(self, add_spaces):
+        if add_spaces not in self._plain:
+            text, children = _replaced(self.node, add_spaces)
+            parts = [text]
+            for child, tail in children:
+                parts.extend([_replaced(child, add_spaces)[0], tail])
+            parts.append(self.node.tail)
+
+            final_text = ''
+            for part in filter(bool, parts):
+                final_text = _combine_with_space(final_text, part,
+                                                 add_spaces)
+            self._plain[add_spaces] = final_text.strip()
+        return self._plain[add_spaces]
+
+
+# When active (see `cached_text`), maps XML elements to their _NodeText
+_text_cache = None
+
+
+@contextmanager
+def cached_text():
+    """Within this context, the text of each XML element is only extracted
+    once (as are results memoized via `memoize_for_node`). The XML must not
+    be modified in the meantime"""
+    global _text_cache
+    if _text_cache is not None:     # already caching
+        yield
+        return
+    _text_cache = {}
+    try:
+        yield
+    finally:
+        _text_cache = None
+
+
+def _node_text(node):
+    if _text_cache is None:
+        return _NodeText(node)
+    if node not in _text_cache:
+        _text_cache[node] = _NodeText(node)
+    return _text_cache[node]
 
-    parts = [node.text] +\
-        list(chain(*([c.text, c.tail] for c in node.getchildren()))) +\
-        [node.tail]
 
-    final_text = ''
-    for part in filter(bool, parts):
-        final_text = _combine_with_space(final_text, part, add_spaces)
-    return final_text.strip()
+def get_node_text(node, add_spaces=False):
+    """ Extract all the text from an XML node (including the text of it's
+    children). Subscripts and footnotes are converted to text. """
+    return _node_text(node).plain(add_spaces)
 
 
 def get_node_text_tags_preserved(node):
     """ Given an XML node, generate text from the node, skipping the PRTPAGE
     tag. """
+    return _node_text(node).tagged
 
-    html_parser = HTMLParser.HTMLParser()
 
-    if node.text:
-        node_text = node.text
-    else:
-        node_text = ''
-
-    for c in node:
-        if c.tag == 'E':
-            # xlmns non-sense makes me do this.
-            e_tag = '<E T="03">%s</E>' % c.text
-            node_text += e_tag
-        if c.tail is not None:
-            node_text += c.tail
-
-    node_text = html_parser.unescape(node_text)
-    return node_text
+def memoize_for_node(node, key, compute):
+    """Markers and similar are derived from an element's text several times
+    per parse. Within a `cached_text` context, compute() is only called once
+    per element and key"""
+    memo = _node_text(node).memo
+    if key not in memo:
+        memo[key] = compute()
+    return memo[key]
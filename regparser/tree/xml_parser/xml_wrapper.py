@@ -29,9 +29,7 @@ class XMLWrapper(object):
         attempts to fix some of those (general) flaws. For specific issues, we
         tend to instead use the files in settings.LOCAL_XML_PATHS"""
 
-        for preprocessor in preprocessors.ALL:
-            preprocessor().transform(self.xml)
-
+        preprocessors.preprocess(self.xml)
         return self
 
     def xpath(self, *args, **kwargs):
@@ -99,6 +99,27 @@ APPENDIX_IGNORE_SUBHEADER_LABEL = {}
 
 XML_REPO = 'https://github.com/18F/fr-notices.git'
 
+# Rather than finding every possible set of paragraph depths and then
+# selecting between them, search for the most likely set directly. This is
+# faster for long sections, but can pick a different set:
+# regparser.tree.depth.heuristics.prefer_shallow_depths compares each set
+# with only the most likely candidates rather than with every possible set.
+# See regparser.tree.depth.derive.derive_best_depths
+BEST_FIRST_DEPTHS = False
+
+# Paragraph depths derived for each sequence of markers are cached in
+# memory. Set this to a directory path to also persist them between runs
+DEPTH_CACHE_DIR = None
+
+# Optional limits on the time spent and the number of solutions found when
+# deriving a section's paragraph depths. Past either, we log the section and
+# fall back to a quick, greedy assignment, which follows the rules but may not
+# be the most likely. None (the default) disables a limit. Note that a time
+# limit makes the results depend on how busy the machine is
+DEPTH_BUDGET_SECONDS = None
+DEPTH_BUDGET_SOLUTIONS = None
+
+
 try:
     from local_settings import *
 except ImportError:
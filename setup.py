@@ -16,7 +16,6 @@ setup(
         "json-delta",
         "lxml",
         "pyparsing",
-        "python-constraint",
         "requests",
         "requests-cache"
     ],
@@ -178,21 +178,20 @@ class CheckpointerTests(TestCase):
         is occurring outside of local memory by comparing to the original."""
         to_store = {"some": "value", 123: 456}
         cp = Checkpointer(tempfile.mkdtemp())
-        cp.counter = 1
-        cp._serialize("a-tag", to_store)
+        filename = cp._filename("a-tag", "key1")
+        cp._serialize(filename, to_store)
         to_store["some"] = "other"
-        result = cp._deserialize("a-tag")
+        result, _ = cp._deserialize(filename)
         self.assertEqual(result, {"some": "value", 123: 456})
         self.assertEqual(to_store, {"some": "other", 123: 456})
 
-        cp.counter = 2
-        cp._serialize("a-tag", to_store)
+        filename = cp._filename("a-tag", "key2")
+        cp._serialize(filename, to_store)
         to_store["some"] = "more"
-        result = cp._deserialize("a-tag")
+        result, _ = cp._deserialize(filename)
         self.assertEqual(result, {"some": "other", 123: 456})
         self.assertEqual(to_store, {"some": "more", 123: 456})
-        cp.counter = 1
-        result = cp._deserialize("a-tag")
+        result, _ = cp._deserialize(cp._filename("a-tag", "key1"))
         self.assertEqual(result, {"some": "value", 123: 456})
 
     def test_tree_serialization(self):
@@ -212,11 +211,13 @@ class CheckpointerTests(TestCase):
         self.assertEqual(
             etree.tostring(tree.children[0].source_xml),
             etree.tostring(loaded.children[0].source_xml))
+        # The original tree is not modified
+        self.assertEqual(tree.children[0].source_xml.tag, 'tag')
 
     def test_dont_load_later_elements(self):
-        """If a checkpoint is executed, we should not load any later
-        checkpoints. This allows a user to delete, say step 5, and effectively
-        rebuild from that checkpoint."""
+        """If a checkpoint's result changes, we should not load any later
+        checkpoints which (implicitly) depend on it. This allows a user to
+        delete, say step 5, and effectively rebuild from that checkpoint."""
         cp = Checkpointer(tempfile.mkdtemp())
         self.assertEqual(cp.checkpoint("1", lambda: 1), 1)
         self.assertEqual(cp.checkpoint("2", lambda: 2), 2)
@@ -227,14 +228,51 @@ class CheckpointerTests(TestCase):
         self.assertEqual(cp.checkpoint("2", lambda: -2, force=True), -2)
         self.assertEqual(cp.checkpoint("3", lambda: -3), -3)
 
+    def test_reuse_if_result_unchanged(self):
+        """If a checkpoint is recomputed but its result does not change,
+        later checkpoints can still be used"""
+        cp = Checkpointer(tempfile.mkdtemp())
+        self.assertEqual(cp.checkpoint("1", lambda: 1), 1)
+        self.assertEqual(cp.checkpoint("2", lambda: 2), 2)
+        self.assertEqual(cp.checkpoint("3", lambda: 3), 3)
+        self.assertEqual((cp.hits, cp.misses), (0, 3))
+
+        cp._reset()
+        self.assertEqual(cp.checkpoint("1", lambda: -1), 1)
+        self.assertEqual(cp.checkpoint("2", lambda: 2, force=True), 2)
+        self.assertEqual(cp.checkpoint("3", lambda: -3), 3)
+        self.assertEqual((cp.hits, cp.misses), (2, 1))
+
+    def test_explicit_inputs(self):
+        """Checkpoints with explicit inputs only depend on those inputs, not
+        on the order or results of other checkpoints"""
+        cp = Checkpointer(tempfile.mkdtemp())
+        tree = cp.checkpoint("tree", lambda: Node("text"), inputs=[])
+        self.assertEqual(
+            cp.checkpoint("layer", lambda: 1, inputs=[tree, "a"]), 1)
+        self.assertEqual(
+            cp.checkpoint("layer", lambda: 2, inputs=[tree, "b"]), 2)
+
+        cp._reset()
+        cp.checkpoint("other", lambda: 3, force=True)
+        tree = cp.checkpoint("tree", None, inputs=[])
+        self.assertEqual(
+            cp.checkpoint("layer", lambda: -2, inputs=[tree, "b"]), 2)
+        self.assertEqual(
+            cp.checkpoint("layer", lambda: -1, inputs=[Node("text"), "a"]),
+            1)
+        self.assertEqual(
+            cp.checkpoint("layer", lambda: 3, inputs=[Node("new"), "a"]), 3)
+        self.assertEqual((cp.hits, cp.misses), (3, 2))
+
     def test_exception_reading(self):
         """If a file exists but is not the correct format, we expect
         deserialization to gracefully fail (rather than exploding)"""
         cp = Checkpointer(tempfile.mkdtemp())
         self.assertEqual(1, cp.checkpoint("1", lambda: 1))
-        with open(cp._filename("1"), "w") as written_file:
-            written_file.write("")
         cp._reset()
+        with open(cp._filename("1", cp._key("1", None)), "w") as written:
+            written.write("")
         # pickle will raise an exception, so we will recompute
         self.assertEqual(-1, cp.checkpoint("1", lambda: -1))
 
@@ -243,10 +281,9 @@ class CheckpointerTests(TestCase):
         folder"""
         file_path = tempfile.mkdtemp() + os.path.join('some', 'depth', 'here')
         cp = Checkpointer(file_path)
-        cp.counter = 25
-        filename = cp._filename('A WeIrD TaG')
+        filename = cp._filename('A WeIrD TaG', 'abcdef')
         self.assertTrue(os.path.join('some', 'depth', 'here') in filename)
-        self.assertTrue('25' in filename)
+        self.assertTrue('abcdef' in filename)
         self.assertTrue('aweirdtag' in filename)
 
     def test_dirs_created(self):
@@ -1,7 +1,14 @@
 # vim: set encoding=utf-8
+import pickle
 from unittest import TestCase
 
-from regparser.citations import internal_citations, Label
+from mock import patch
+
+from regparser import citations
+from regparser.citations import (
+    CitationScanner, CitationSpans, internal_citations, Label,
+    ParagraphCitation, remove_citation_overlaps, remove_contained)
+from regparser.grammar import unified as grammar
 from regparser.tree.struct import Node
 
 
@@ -310,6 +317,65 @@ class CitationsTest(TestCase):
         citations = internal_citations(text, Label(part='100', section='4'))
         self.assertEqual(0, len(citations))
 
+    def test_scanner_matches_scan_string(self):
+        """Attempting grammars only at anchors should find the same matches
+        as pyparsing's scanString"""
+        text = (u"See §§ 1005.2 and 1005.3, 12 CFR 1005.4(a),\tparagraphs "
+                u"(b)(1) and (c) of this section, comment 22(a)-1.i, "
+                u"appendix Q-3(b), and 2(c) or 6.7")
+        scanner = CitationScanner(text)
+        for name in ('mps_paragraph', 'internal_cfr_p',
+                     'multiple_non_comments', 'marker_comment',
+                     'appendix_with_section', 'section_paragraph',
+                     'part_section_paragraph'):
+            expected = [(start, end) for _, start, end
+                        in getattr(grammar, name).scanString(text)]
+            self.assertEqual(
+                expected,
+                [(start, end) for _, start, end in scanner.scan(name)])
+            self.assertTrue(expected)
+
+    def test_remove_contained(self):
+        cits = [ParagraphCitation(0, 10, None),
+                ParagraphCitation(2, 5, None),     # contained
+                ParagraphCitation(0, 10, None),    # duplicate span; kept
+                ParagraphCitation(8, 12, None),    # overlaps
+                ParagraphCitation(0, 4, None),     # contained; same start
+                ParagraphCitation(4, 6, None, full_start=3, full_end=11)]
+        self.assertEqual(remove_contained(cits),
+                         [cits[0], cits[2], cits[3], cits[5]])
+
+    def test_citation_spans(self):
+        spans = CitationSpans([ParagraphCitation(10, 20, None),
+                               ParagraphCitation(2, 4, None),
+                               ParagraphCitation(3, 6, None)])
+        self.assertTrue(spans.overlaps(0, 2))
+        self.assertTrue(spans.overlaps(5, 5))
+        self.assertFalse(spans.overlaps(7, 9))
+        self.assertTrue(spans.overlaps(7, 10))
+        self.assertTrue(spans.overlaps(12, 14))
+        self.assertTrue(spans.overlaps(0, 30))
+        self.assertFalse(spans.overlaps(21, 30))
+        self.assertFalse(CitationSpans([]).overlaps(0, 30))
+
+    def test_remove_citation_overlaps(self):
+        """Citations should be found once per text, regardless of the
+        number of markers"""
+        text = u'(a) See paragraph (b)(1) and 22(c). (2) Then (3)'
+        markers = [('a', 0, 3), ('b', 18, 21), ('1', 21, 24),
+                   ('c', 31, 34), ('2', 36, 39), ('3', 45, 48)]
+        with patch('regparser.citations.internal_citations',
+                   wraps=citations.internal_citations) as internal:
+            citations._spans_memo.clear()
+            self.assertEqual(remove_citation_overlaps(text, markers),
+                             [markers[0], markers[4], markers[5]])
+            self.assertEqual(
+                remove_citation_overlaps(text, iter(markers[4:])),
+                markers[4:])
+            self.assertEqual(1, internal.call_count)
+            self.assertEqual([], remove_citation_overlaps('other', []))
+            self.assertEqual(1, internal.call_count)
+
 
 class CitationsLabelTest(TestCase):
     def test_using_default_schema(self):
@@ -385,3 +451,40 @@ class CitationsLabelTest(TestCase):
     def test_label_representation(self):
         l = Label(part='105', section='3')
         self.assertEqual(repr(l), "['105', '3']")
+
+    def test_hashable(self):
+        """Equal labels hash equally, whether or not they're interned"""
+        label = Label(part='105', section='3', p1='a')
+        same = Label(part='105', section='3', p1='a')
+        self.assertEqual(label, same)
+        self.assertFalse(label != same)
+        self.assertEqual(1, len({label, same}))
+        self.assertNotEqual(label, Label(part='105', section='3'))
+
+    def test_interned(self):
+        """Copies and labels from nodes are shared"""
+        label = Label(part='105', section='3')
+        self.assertIs(label.copy(p1='a'), label.copy(p1='a'))
+        self.assertIs(label.copy(p1='a'),
+                      Label(part='105', section='1').copy(section='3',
+                                                          p1='a'))
+        self.assertIs(Label.from_node(Node(label=['105', '3', 'a'])),
+                      Label.from_node(Node(label=['105', '3', 'a'])))
+        node = Node(label=['105', '3', 'Interp', '1'], node_type=Node.INTERP)
+        self.assertIs(Label.from_node(node), Label.from_node(node))
+
+    def test_immutable(self):
+        """Modifying the results of a label doesn't modify the label"""
+        label = Label(part='105', section='3')
+        label.to_list().append('a')
+        label.settings['p1'] = 'a'
+        self.assertEqual(['105', '3'], label.to_list())
+        self.assertEqual({'part': '105', 'section': '3'}, label.settings)
+
+    def test_pickle(self):
+        label = Label(part='105', section='3')
+        label.copy(p1='a')
+        unpickled = pickle.loads(pickle.dumps(label, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual(label, unpickled)
+        self.assertEqual({}, unpickled._copies)
+        self.assertEqual(['105', '3', 'b'], unpickled.copy(p1='b').to_list())
@@ -0,0 +1,29 @@
+from unittest import TestCase
+
+from click.testing import CliRunner
+from pyparsing import ParserElement
+
+from regparser.commands.benchmark_grammars import benchmark_grammars
+
+
+class CommandsBenchmarkGrammarsTests(TestCase):
+    def test_benchmark_grammars(self):
+        """Each grammar with samples is reported, as is each optimized grammar,
+        and the packrat setting is restored"""
+        cli = CliRunner()
+        with cli.isolated_filesystem():
+            with open('rule.xml', 'w') as f:
+                f.write('<ROOT><HD>Section 1005.2</HD><P>(a) See 12 CFR 1005.'
+                        '3(b)(2) and <E T="03">Term</E> means</P></ROOT>')
+            result = cli.invoke(benchmark_grammars,
+                                ['rule.xml', '--repeat', '1'])
+        self.assertEqual(0, result.exit_code)
+        packrat, compiled = result.output.split('\n\n')
+        packrat, compiled = packrat.splitlines(), compiled.splitlines()
+        self.assertEqual(6, len(packrat))
+        self.assertTrue(packrat[1].startswith('citations.internal_citations'))
+        self.assertEqual(4, len(compiled))
+        self.assertTrue(compiled[1].startswith('unified.any_depth_p'))
+        self.assertTrue(all(line.endswith('same')
+                            for line in packrat[1:] + compiled[1:]))
+        self.assertFalse(ParserElement._packratEnabled)
@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+import time
+from unittest import TestCase
+
+from click.testing import CliRunner
+
+import eregs
+
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+
+class EregsTests(TestCase):
+    def test_help(self):
+        """Commands are listed with their short help, without importing
+        them"""
+        result = CliRunner().invoke(eregs.cli, ['--help'])
+        self.assertIn('clear                 Delete intermediate data.',
+                      result.output)
+        self.assertIn('layers', result.output)
+        self.assertNotIn('dependency_resolver', result.output)
+
+    def test_get_command(self):
+        self.assertEqual('clear', eregs.cli.get_command(None, 'clear').name)
+        self.assertIsNone(eregs.cli.get_command(None, 'dependency_resolver'))
+        self.assertIsNone(eregs.cli.get_command(None, 'not_a_command'))
+
+    def run_eregs(self, *args):
+        """Time to run eregs with these arguments, and the modules which
+        were imported"""
+        script = ('import sys, eregs\n'
+                  'try:\n'
+                  '    eregs.cli()\n'
+                  'finally:\n'
+                  '    sys.stderr.write(" ".join(sys.modules))')
+        start = time.time()
+        process = subprocess.Popen(
+            [sys.executable, '-c', script] + list(args), cwd=ROOT,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        _, modules = process.communicate()
+        return time.time() - start, modules.split()
+
+    def test_startup(self):
+        """Trivial commands start quickly, as they don't import the rest of
+        the parser"""
+        elapsed, modules = self.run_eregs('clear', '--help')
+        self.assertIn('regparser.commands.clear', modules)
+        for module in ('regparser.commands.layers', 'regparser.notice.diff',
+                       'regparser.grammar.amdpar', 'git'):
+            self.assertNotIn(module, modules)
+
+        elapsed = min(elapsed, self.run_eregs('--help')[0])
+        self.assertTrue(elapsed < 1, elapsed)
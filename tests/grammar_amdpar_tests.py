@@ -5,7 +5,11 @@ from regparser.grammar import amdpar, tokens
 
 
 def parse_text(text):
-    return [m[0] for m, _, _ in amdpar.token_patterns.scanString(text)]
+    result = [m[0] for m, _, _ in amdpar.token_patterns.scanString(text)]
+    # Skipping alternatives by their triggers shouldn't change the results
+    assert result == [
+        m[0] for m, _, _ in amdpar.triggered_token_patterns.scanString(text)]
+    return result
 
 
 class GrammarAmdParTests(TestCase):
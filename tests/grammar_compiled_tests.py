@@ -0,0 +1,100 @@
+# vim: set encoding=utf-8
+import random
+from unittest import TestCase
+
+from pyparsing import ParseResults
+
+from regparser.grammar import atomic, compiled, external_citations, unified
+from regparser.grammar import interpretation_headers
+from regparser.tree.xml_parser import tree_utils
+
+
+def _comparable(value):
+    """Parse results, including named results, in a comparable form"""
+    if isinstance(value, ParseResults):
+        return ([_comparable(v) for v in value],
+                sorted((k, _comparable(v)) for k, v in value.items()))
+    return repr(value)
+
+
+# Fragments from which we build texts; many are (parts of) matches
+_fragments = [
+    u'(', u')', u' ', u'  ', u'\n', u'\t', u'\r', u',', u'.', u'-', u'—',
+    u'>', u'_', u'é', u'a', u'i', u'ii', u'x', u'B', u'1', u'12', u'3a',
+    u'foo', u'<E T="03">', u'</E>', u'(a)', u'( b )', u'(ii)', u'(iv)',
+    u'(v)', u'(x)', u'(aa)', u'(j)', u'(B)', u'( C)', u'(1)', u'(12 )',
+    u'(<E T="03">1</E>)', u'(<E T="03">ii</E>)', u'(<E>3</E>)', u'Section',
+    u'§', u'Section 1005.2', u'§ 12.3a', u'2(a)', u'Paragraph 3(b)',
+    u'paragraph', u'Appendix A', u'APPENDIX', u'Appendix B1', u'Z9',
+    u'\n2(a)(1)', u'\nSection 3.4', u'\nAppendix C ', u'\n\t(a)',
+    u'\nParagraph 4(c)(2)(ii)(A)', u'CFR', u'part', u'U.S.C.', u'the Act',
+    u'12 CFR part 5', u'12 CFR 1005.2', u'5 U.S.C. 552', u'124 Stat. 1376',
+    u'Public Law 111-203', u'Law', u'Stat.']
+
+
+class CompiledGrammarTests(TestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        self.texts = [
+            u'(a)(B) ', u'(ii)(A)(<E T="03">1</E>)(<E T="03">ii</E>) x',
+            u'(B)(1)\n', u'( a )  (1)  x', u'Section 1005.2\n',
+            u'2(a)\nSection 3.4 foo\n', u'  Section 1.2 x',
+            u'Paragraph 2(a)\n', u'Appendix A Foo\n', u'APPENDIX B_1 Foo',
+            u'(a) <E T="03">Transfer </E>—(1) <E T="03">Notice.</E> follow',
+            u'12 U.S.C. 5 and 12 CFR part 4 and 12 CFR 1005.2, the Act',
+            'Public Law 111-203 and 124 Stat. 1376']
+        for _ in range(200):
+            fragments = [rng.choice(_fragments)
+                         for _ in range(rng.randint(1, 20))]
+            text = u''.join(fragments)
+            if rng.random() < 0.2:  # also scan byte strings
+                text = text.encode('ascii', 'ignore')
+            self.texts.append(text)
+
+    def assert_conforms(self, grammar, compiled_grammar):
+        for text in self.texts:
+            self.assertEqual(
+                [(_comparable(match), start, end)
+                 for match, start, end in grammar.scanString(text)],
+                [(_comparable(match), start, end)
+                 for match, start, end in compiled_grammar.scanString(text)],
+                repr(text))
+
+    def test_atomic(self):
+        self.assert_conforms(atomic.lower_p, compiled.lower_p)
+        self.assert_conforms(atomic.digit_p, compiled.digit_p)
+        self.assert_conforms(atomic.roman_p, compiled.roman_p)
+        self.assert_conforms(atomic.upper_p, compiled.upper_p)
+
+    def test_any_depth_p(self):
+        self.assert_conforms(unified.any_depth_p, compiled.any_depth_p)
+
+    def test_interpretation_headers(self):
+        self.assert_conforms(interpretation_headers.parser,
+                             compiled.interpretation_headers)
+
+    def test_external_citations(self):
+        self.assert_conforms(external_citations.regtext_external_citation,
+                             compiled.regtext_external_citation)
+
+    def test_first_markers(self):
+        for grammar, compiled_grammar in zip(
+                tree_utils._first_markers,
+                tree_utils._compiled_first_markers):
+            self.assert_conforms(grammar, compiled_grammar)
+
+    def test_named_results(self):
+        """Named results are accessible as attributes, as with pyparsing"""
+        match, start, end = next(compiled.any_depth_p.scanString(
+            u'See (A)(<E T="03">1</E>)(<E T="03">iv</E>) here'))
+        self.assertEqual((4, 42), (start, end))
+        self.assertEqual(['A', '1', 'iv'], list(match))
+        # As with pyparsing, the last p5 wins
+        self.assertEqual(('', 'A', 'iv', ''),
+                         (match.p1, match.p4, match.p5, match.p6))
+
+        match = next(compiled.regtext_external_citation.scanString(
+            u'12 CFR 1005.2'))[0]
+        self.assertEqual(['12', 'CFR', '1005', '.', '2'], match.asList())
+        self.assertEqual(['12', 'CFR', '1005', '.', '2'], match.V2.asList())
+        self.assertEqual(str, type(match[1]))
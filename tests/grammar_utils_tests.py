@@ -0,0 +1,88 @@
+from unittest import TestCase
+
+from mock import Mock
+from pyparsing import Literal, ParserElement, Word
+
+from regparser.grammar import utils
+
+
+class PrefilterTests(TestCase):
+    def setUp(self):
+        self.prefilter = utils.Prefilter('digits', r'[0-9]')
+        self.grammar = Word('0123456789')
+
+    def tearDown(self):
+        utils.prefilters.remove(self.prefilter)
+
+    def test_scan(self):
+        """Texts without the trigger are skipped; others are scanned as
+        usual"""
+        self.assertEqual([], list(self.prefilter.scan(self.grammar, 'abc')))
+        self.assertEqual(
+            [(['12'], 1, 3), (['4'], 5, 6)],
+            [(tokens.asList(), start, end) for tokens, start, end
+             in self.prefilter.scan(self.grammar, 'a12b 4')])
+        self.assertEqual(1, self.prefilter.skipped)
+        self.assertEqual(1, self.prefilter.scanned)
+
+    def test_log_prefilter_stats(self):
+        self.prefilter.matches('abc')
+        logger = Mock()
+        utils.log_prefilter_stats(logger)
+        self.assertIn((('%s: skipped %d of %d texts', 'digits', 1, 1), {}),
+                      logger.info.call_args_list)
+
+
+class TriggeredMatchFirstTests(TestCase):
+    def setUp(self):
+        self.grammar = utils.TriggeredMatchFirst([
+            (Literal('ab'), 'AB'), (Word('0123456789'), '[0-9]'),
+            (Literal('a'), 'A')])
+
+    def scan(self, text):
+        return [(tokens.asList(), start, end)
+                for tokens, start, end in self.grammar.scanString(text)]
+
+    def test_scan(self):
+        """Alternatives are attempted in order, skipping those without their
+        trigger"""
+        self.assertEqual([(['a'], 0, 1), (['12'], 1, 3), (['ab'], 4, 6)],
+                         self.scan('a12 ab'))
+        self.assertEqual([(['a'], 0, 1)], self.scan('a b A'))
+        self.assertEqual([], self.scan('xyz'))
+
+    def test_grammar_for(self):
+        """Reduced grammars are shared between texts with the same
+        triggers"""
+        grammar = self.grammar.grammar_for('1 a')
+        self.assertEqual(2, len(grammar.exprs))
+        self.assertIs(grammar, self.grammar.grammar_for('A 2'))
+        self.assertIsNot(grammar, self.grammar.grammar_for('ab 2'))
+        self.assertIsNone(self.grammar.grammar_for('xyz'))
+
+
+class PackratTests(TestCase):
+    def tearDown(self):
+        utils.disable_packrat()
+
+    def test_enable_disable(self):
+        grammar = Word('abc') + Word('0123456789')
+        results = [tokens.asList() for tokens, _, _
+                   in grammar.scanString('ab12 c3 d4')]
+        utils.enable_packrat(5)
+        self.assertTrue(ParserElement._packratEnabled)
+        self.assertEqual(results, [tokens.asList() for tokens, _, _
+                                   in grammar.scanString('ab12 c3 d4')])
+        self.assertTrue(0 < len(ParserElement._exprArgCache) <= 5)
+
+        utils.disable_packrat()
+        self.assertFalse(ParserElement._packratEnabled)
+        self.assertEqual(ParserElement._parseNoCache, ParserElement._parse)
+        self.assertEqual(results, [tokens.asList() for tokens, _, _
+                                   in grammar.scanString('ab12 c3 d4')])
+
+    def test_bounded_cache(self):
+        cache = utils._BoundedCache(2)
+        cache[1], cache[2] = 'a', 'b'
+        cache[3] = 'c'
+        self.assertEqual({3: 'c'}, cache)
@@ -1,5 +1,6 @@
 import os
 import re
+from StringIO import StringIO
 from unittest import TestCase
 
 from click.testing import CliRunner
@@ -104,6 +105,54 @@ class HistoryAnnualVolumeTests(HttpMixin, TestCase):
             self.assertEqual(xml.xpath('./CHILD')[0].text,
                              'content')
 
+    def test_part_xmls(self):
+        """All parts within a bulk volume should be streamed"""
+        self.expect_xml_http("""
+        <CFRDOC>
+            <PARTS>Part 111 to 222</PARTS>
+            <CHAPTER>
+                <PART><EAR>Pt. 111</EAR><FIELD>111 Content</FIELD></PART>
+                <SUBCHAP>
+                    <PART><EAR>Pt. 112</EAR><FIELD>112 Content</FIELD></PART>
+                    <PART><FIELD>No label</FIELD></PART>
+                    <PART><EAR>Pt. 113</EAR><FIELD>113 Content</FIELD></PART>
+                </SUBCHAP>
+            </CHAPTER>
+        </CFRDOC>""", uri=re.compile(r".*bulkdata.*"))
+        volume = annual.Volume(2001, 12, 2)
+
+        results = [(part, xml.xpath('./FIELD')[0].text)
+                   for part, xml in volume.part_xmls()]
+        self.assertEqual(results, [(111, '111 Content'), (112, '112 Content'),
+                                   (113, '113 Content')])
+
+        results = [part for part, _ in volume.part_xmls(parts=[113])]
+        self.assertEqual(results, [113])
+
+    def test_part_xmls_local(self):
+        """A local copy of the bulk volume should be used, if present"""
+        with CliRunner().isolated_filesystem():
+            path = os.path.join(xml_sync.GIT_DIR, 'annual')
+            os.makedirs(path)
+            path = os.path.join(path, 'CFR-2020-title11-vol12.xml')
+            with open(path, 'w') as f:
+                f.write('<CFRDOC><PART><EAR>Pt. 13</EAR></PART></CFRDOC>')
+
+            results = list(annual.Volume(2020, 11, 12).part_xmls())
+            self.assertEqual(len(results), 1)
+            self.assertEqual(results[0][0], 13)
+            self.assertEqual(results[0][1].source, path)
+
+    def test_iter_part_xmls_copies(self):
+        """The source PARTs are cleared as we go; the yielded XML should be
+        unaffected"""
+        xml_file = StringIO('<CFRDOC><PART><EAR>Pt. 1</EAR></PART>'
+                            '<PART><EAR>Pt. 2</EAR></PART></CFRDOC>')
+        results = list(annual.iter_part_xmls(xml_file))
+        self.assertEqual([(part, xml.xpath('./EAR')[0].text)
+                          for part, xml in results],
+                         [(1, 'Pt. 1'), (2, 'Pt. 2')])
+
 
 class HistoryAnnualTests(TestCase):
     def test_annual_edition_for(self):
@@ -1,10 +1,13 @@
 from datetime import date
+from time import time
 from unittest import TestCase
+import os
 
 from click.testing import CliRunner
 
 from regparser.history.versions import Version
 from regparser.index import entry
+from regparser.tree.struct import Node
 
 
 class VersionEntryTests(TestCase):
@@ -23,3 +26,20 @@ class VersionEntryTests(TestCase):
             (path / '3333').write(v3)
 
             self.assertEqual(['2222', '3333', '1111'], list(path))
+
+
+class TreeSnapshotEntryTests(TestCase):
+    def test_read(self):
+        """Snapshots are generated from trees when missing or stale"""
+        with CliRunner().isolated_filesystem():
+            tree_entry = entry.Tree('12', '1000', 'v1')
+            snapshot_entry = entry.TreeSnapshot('12', '1000', 'v1')
+            tree_entry.write(Node('Original', label=['1000']))
+            self.assertFalse(os.path.exists(str(snapshot_entry)))
+
+            self.assertEqual(snapshot_entry.read().tree().text, 'Original')
+            self.assertTrue(os.path.exists(str(snapshot_entry)))
+
+            tree_entry.write(Node('Modified', label=['1000']))
+            os.utime(str(tree_entry), (time() + 1000, time() + 1000))
+            self.assertEqual(snapshot_entry.read().tree().text, 'Modified')
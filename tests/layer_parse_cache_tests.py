@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from mock import patch
+
+from regparser.citations import Label
+from regparser.layer import internal_citations, parse_cache
+
+
+class ParseCacheTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'sub', 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def compute(self):
+        self.calls.append(1)
+        return len(self.calls)
+
+    def fetch(self, text, context=None):
+        return parse_cache.fetch_or_compute('grammar', context, text,
+                                            self.compute)
+
+    def test_inactive(self):
+        """Outside of a cached_parses context, nothing is cached"""
+        self.assertEqual(1, self.fetch('text'))
+        self.assertEqual(2, self.fetch('text'))
+
+    def test_cached(self):
+        with parse_cache.cached_parses():
+            self.assertEqual(1, self.fetch('text'))
+            self.assertEqual(1, self.fetch(u'text'))
+            self.assertEqual(2, self.fetch('text', ('part', '1')))
+            self.assertEqual(3, self.fetch('other'))
+            with parse_cache.cached_parses():
+                self.assertEqual(3, self.fetch('other'))
+        self.assertEqual(4, self.fetch('text'))
+
+    def test_persisted(self):
+        """Results are shared via the path. Only the results used are kept"""
+        with parse_cache.cached_parses(self.path):
+            self.fetch('text1')
+            self.fetch('text2')
+        with parse_cache.cached_parses(self.path):
+            self.assertEqual(1, self.fetch('text1'))
+            self.assertEqual(3, self.fetch('text3'))
+        with parse_cache.cached_parses(self.path):
+            self.assertEqual(1, self.fetch('text1'))
+            self.assertEqual(3, self.fetch('text3'))
+            self.assertEqual(4, self.fetch('text2'))
+
+    def test_not_written_without_misses(self):
+        with parse_cache.cached_parses(self.path):
+            pass
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_corrupt(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'w') as f:
+            f.write('not a pickle')
+        with parse_cache.cached_parses(self.path):
+            self.assertEqual(1, self.fetch('text'))
+
+    def test_internal_citations_layer(self):
+        """The layer should only parse a given text once per label"""
+        parser = internal_citations.InternalCitationParser(None)
+        parser.verify_citations = False
+        text = 'See paragraph (b) and section 4(c)'
+        with patch('regparser.layer.internal_citations.internal_citations',
+                   wraps=internal_citations.internal_citations) as parse:
+            with parse_cache.cached_parses():
+                first = parser.parse(text, Label(part='1', section='2'))
+                second = parser.parse(text, Label(part='1', section='2'))
+                parser.parse(text, Label(part='1', section='3'))
+        self.assertEqual(first, second)
+        self.assertEqual(2, parse.call_count)
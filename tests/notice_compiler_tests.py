@@ -545,6 +545,27 @@ class CompilerTests(TestCase):
         changed_node = find(reg, '205-2-a')
         self.assertEqual(changed_node.text, 'new text')
 
+    def test_compile_reg_shares_unchanged(self):
+        """Compiling should not modify the previous tree. Nodes which were not
+        changed should be shared between versions"""
+        root = self.tree_with_paragraphs()
+        change2a = {
+            'action': 'PUT',
+            'field': '[text]',
+            'node': {
+                'text': 'new text',
+                'label': ['205', '2', 'a'],
+                'node_type': 'regtext'}}
+
+        reg = compiler.compile_regulation(root, {'205-2-a': [change2a]})
+
+        self.assertEqual(find(root, '205-2-a').text, 'n2a')
+        self.assertEqual(find(reg, '205-2-a').text, 'new text')
+        for label in ('205', '205-2', '205-2-a'):
+            self.assertNotEqual(id(find(root, label)), id(find(reg, label)))
+        for label in ('205-1', '205-2-b', '205-4'):
+            self.assertEqual(id(find(root, label)), id(find(reg, label)))
+
     def test_compile_reg_keep_root(self):
         root = self.tree_with_paragraphs()
         change2 = {'action': 'KEEP',
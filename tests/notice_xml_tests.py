@@ -4,6 +4,8 @@ import shutil
 import tempfile
 from unittest import TestCase
 
+from mock import patch
+
 from regparser.history.delays import FRDelay
 from regparser.notice import xml as notice_xml
 import settings
@@ -122,6 +124,32 @@ class NoticeXMLTests(XMLBuilderMixin, TestCase):
             [FRDelay(11, 100, date(2010, 4, 1)),
              FRDelay(11, 200, date(2010, 10, 10))])
 
+    def test_metadata_cached(self):
+        """Metadata is read from the XML once, until a setter modifies it"""
+        with self.tree.builder("ROOT") as root:
+            root.CFR("12 CFR Parts 1002 and 1005")
+            root.PRTPAGE(P="455")
+            root.PRTPAGE(P="456")
+        xml = notice_xml.NoticeXML(self.tree.render_xml())
+        xml.fr_volume = 22
+        parse_string = 'regparser.notice.xml.notice_cfr_p.parseString'
+        with patch(parse_string, wraps=notice_xml.notice_cfr_p.parseString
+                   ) as parse_string:
+            self.assertEqual(xml.cfr_parts, [1002, 1005])
+            self.assertEqual(xml.cfr_titles, [12])
+            self.assertEqual(parse_string.call_count, 1)
+
+        self.assertEqual((xml.fr_volume, xml.start_page, xml.end_page),
+                         (22, 454, 456))
+        # Modifications outside of the setters aren't noticed...
+        xml.xpath('//PRTPAGE')[1].attrib['P'] = '460'
+        self.assertEqual(xml.end_page, 456)
+        # ... until the metadata is invalidated
+        xml.invalidate()
+        self.assertEqual(xml.end_page, 460)
+        xml.fr_volume = 23
+        self.assertEqual(xml.fr_volume, 23)
+
     def test_source_is_local(self):
         for url in ('https://example.com', 'http://example.com'):
             self.assertFalse(
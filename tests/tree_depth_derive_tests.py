@@ -1,8 +1,13 @@
 from unittest import TestCase
 
-from regparser.tree.depth import markers, rules
-from regparser.tree.depth.derive import debug_idx, derive_depths
+from mock import patch
+
+from regparser.tree.depth import heuristics, markers, rules
+from regparser.tree.depth.derive import (
+    Budget, BudgetExceeded, debug_idx, derive_best_depths, derive_depths,
+    greedy_depths)
 from regparser.tree.depth.markers import INLINE_STARS, MARKERLESS, STARS_TAG
+from regparser.tree.depth.memo import DepthCache
 
 
 class DeriveTests(TestCase):
@@ -179,3 +184,178 @@ class DeriveTests(TestCase):
         self.assertEqual(debug_idx(['1', '2', '4']), 2)
         self.assertEqual(
             debug_idx(['1', 'a', '2', 'A'], [rules.depth_type_inverses]), 3)
+
+    def test_long_stars(self):
+        """Long sequences of STARS and MARKERLESS paragraphs should still be
+        solved"""
+        self.assert_depth_match_extra(
+            ['a', STARS_TAG, 'c', '1', STARS_TAG, '5', MARKERLESS, STARS_TAG,
+             'd', '1', 'i', STARS_TAG, 'iv', STARS_TAG, 'f', STARS_TAG, 'h',
+             '1', STARS_TAG, '3'],
+            [rules.depth_type_inverses],
+            [0, 0, 0, 1, 1, 1, 2, 2, 0, 1, 2, 2, 2, 0, 0, 0, 0, 1, 1, 1])
+
+    def test_tie_break(self):
+        """When heuristics tie, callers keep the first solution. Ambiguous
+        markers should be tried as the later type first, e.g. roman before
+        lower case"""
+        solutions = derive_depths(['i', '1'])
+        self.assertEqual([(s.assignment[0].typ, s.assignment[0].depth)
+                          for s in solutions],
+                         [(markers.roman, 0), (markers.lower, 0)])
+        for heuristic, weight in [
+                (heuristics.prefer_diff_types_diff_levels, 0.8),
+                (heuristics.prefer_multiple_children, 0.4),
+                (heuristics.prefer_shallow_depths, 0.2)]:
+            solutions = heuristic(solutions, weight)
+        self.assertEqual(solutions[0].weight, solutions[1].weight)
+        best = sorted(solutions, key=lambda s: s.weight, reverse=True)[0]
+        self.assertEqual(best.assignment[0].typ, markers.roman)
+
+    def test_budget_solutions(self):
+        """We should stop searching once we've found too many solutions"""
+        marker_list = ['a', '1', STARS_TAG, 'i']   # four solutions
+        with patch('regparser.tree.depth.derive.cache', DepthCache(0)):
+            self.assertRaises(BudgetExceeded, derive_depths, marker_list,
+                              [], Budget(solutions=3))
+            self.assertEqual(
+                len(derive_depths(marker_list, [], Budget(solutions=4))), 4)
+
+    def test_budget_seconds(self):
+        marker_list = ['a', '1', 'i', 'A', '2', 'b']
+        budget = Budget(seconds=10)
+        with patch('regparser.tree.depth.derive.cache', DepthCache(0)):
+            self.assertTrue(derive_depths(marker_list, [], budget))
+            budget.start -= 11
+            self.assertRaises(BudgetExceeded, derive_depths, marker_list,
+                              [], budget)
+            self.assertRaises(BudgetExceeded, debug_idx, marker_list + ['q'],
+                              [], budget)
+
+    def test_greedy_depths(self):
+        """The greedy assignment should follow the rules where it can"""
+        solution = greedy_depths(
+            ['a', '1', 'i', 'ii', '2', MARKERLESS, MARKERLESS, 'b'],
+            [rules.depth_type_inverses],
+            [(heuristics.prefer_diff_types_diff_levels, 0.8),
+             (heuristics.prefer_multiple_children, 0.4)])
+        self.assertEqual([a.depth for a in solution],
+                         [0, 1, 2, 2, 1, 2, 2, 0])
+
+    def test_greedy_depths_backtracks(self):
+        """When the greedy choice leads to a dead end, we should backtrack
+        rather than break the rules"""
+        romans = ['i', 'ii', 'iii', 'iv', 'v', 'vi', 'vii', 'viii', 'ix', 'x']
+        with_stars = ['a', STARS_TAG]
+        for roman in romans + ['b']:
+            with_stars.extend([roman, STARS_TAG])
+        examples = [
+            with_stars,
+            ['a', '1', STARS_TAG, 'i', STARS_TAG, 'A', STARS_TAG, '2',
+             STARS_TAG, 'b']]
+        for marker_list in examples:
+            with patch('regparser.tree.depth.derive.logging') as logging:
+                solution = greedy_depths(
+                    marker_list, [],
+                    [(heuristics.prefer_diff_types_diff_levels, 0.8),
+                     (heuristics.prefer_multiple_children, 0.4)])
+            self.assertFalse(logging.error.called)
+            self.assertIn([(a.typ, a.idx, a.depth) for a in solution],
+                          [[(a.typ, a.idx, a.depth) for a in valid]
+                           for valid in derive_depths(marker_list)])
+
+    def test_greedy_depths_stuck(self):
+        """If no depth is valid, the greedy assignment should still return a
+        depth for each marker, logging an error"""
+        with patch('regparser.tree.depth.derive.logging') as logging:
+            solution = greedy_depths(['a', 'q', '1'])
+        self.assertTrue(logging.error.called)
+        self.assertEqual([a.depth for a in solution], [0, 0, 1])
+
+    def test_greedy_depths_max_steps(self):
+        """If backtracking takes too long, we should also give up"""
+        marker_list = ['a', STARS_TAG, 'i', STARS_TAG, 'ii', STARS_TAG, 'b']
+        with patch('regparser.tree.depth.derive.logging') as logging:
+            greedy_depths(marker_list)
+            self.assertFalse(logging.error.called)
+            solution = greedy_depths(marker_list, max_steps=3)
+            self.assertTrue(logging.error.called)
+        self.assertEqual(len(solution.assignment), len(marker_list))
+
+
+class DeriveBestDepthsTests(TestCase):
+    def setUp(self):
+        self.heuristics = [
+            (heuristics.prefer_diff_types_diff_levels, 0.8),
+            (heuristics.prefer_multiple_children, 0.4),
+            (heuristics.prefer_shallow_depths, 0.2)]
+
+    def exhaustive(self, marker_list):
+        """Rank every solution, as ParagraphProcessor.select_depth would"""
+        solutions = derive_depths(marker_list)
+        for heuristic, weight in self.heuristics:
+            solutions = heuristic(solutions, weight)
+        return sorted(solutions, key=lambda s: s.weight, reverse=True)
+
+    def test_matches_exhaustive(self):
+        """The best-first search should select the same solution as scoring
+        every solution"""
+        examples = [
+            ['a', '1', 'i', STARS_TAG, 'ii', STARS_TAG, 'b', STARS_TAG, 'h',
+             'i', STARS_TAG, 'v', STARS_TAG, 'x'],
+            ['a', MARKERLESS, MARKERLESS, 'b', '1', '2', 'i', 'ii',
+             MARKERLESS, 'c', 'd', 'e', 'f', 'g', 'h', 'i']]
+        for marker_list in examples:
+            expected = self.exhaustive(marker_list)[0]
+            result = derive_best_depths(marker_list, [], self.heuristics)
+            self.assertEqual(len(result.solutions), 1)
+            self.assertEqual(
+                [(a.typ, a.idx, a.depth) for a in result.solutions[0]],
+                [(a.typ, a.idx, a.depth) for a in expected])
+            self.assertEqual(result.solutions[0].weight, expected.weight)
+
+    def test_shallow_depths_divergence(self):
+        """prefer_shallow_depths only sees the finalists, so the best-first
+        search can rank solutions differently than scoring every solution"""
+        marker_list = [MARKERLESS, 'i', '1', MARKERLESS, STARS_TAG, 'A', 'a']
+        self.assertEqual([a.depth for a in self.exhaustive(marker_list)[0]],
+                         [0, 1, 2, 3, 3, 4, 5])
+        result = derive_best_depths(marker_list, [], self.heuristics)
+        self.assertEqual([a.depth for a in result.solutions[0]],
+                         [0, 1, 2, 3, 2, 3, 4])
+
+    def test_top_k(self):
+        """We should be able to retrieve multiple solutions, best first"""
+        marker_list = ['a', '1', 'i', STARS_TAG, 'ii', STARS_TAG, 'b',
+                       STARS_TAG, 'h', 'i']
+        expected = self.exhaustive(marker_list)[:3]
+        result = derive_best_depths(marker_list, [], self.heuristics, k=3)
+        self.assertEqual([s.weight for s in result.solutions],
+                         [s.weight for s in expected])
+
+    def test_prunes(self):
+        """Without heuristics which compare solutions, we can stop before
+        seeing every solution"""
+        marker_list = ['a', STARS_TAG, 'i', STARS_TAG, 'v', STARS_TAG, 'x',
+                       STARS_TAG, 'c', '1', STARS_TAG, '3', STARS_TAG, 'i']
+        result = derive_best_depths(
+            marker_list, [], [(heuristics.prefer_multiple_children, 0.5)])
+        self.assertTrue(result.expanded > 0)
+        self.assertTrue(result.explored)
+        self.assertTrue(
+            len(result.explored) < len(derive_depths(marker_list)))
+
+    def test_no_solutions(self):
+        result = derive_best_depths(['a', 'q'], [], self.heuristics)
+        self.assertEqual(result.solutions, [])
+        self.assertEqual(derive_best_depths([]).solutions, [])
+
+    def test_constraints(self):
+        """Additional constraints should be respected"""
+        constraints = [rules.depth_type_inverses]
+        result = derive_best_depths(['a', 'i'], constraints,
+                                    self.heuristics, k=5)
+        self.assertItemsEqual(
+            [[a.depth for a in s] for s in result.solutions],
+            [[a.depth for a in s]
+             for s in derive_depths(['a', 'i'], constraints)])
@@ -78,3 +78,40 @@ class HeuristicsTests(TestCase):
         solutions = heuristics.prefer_shallow_depths(solutions, 0.5)
         self.assertEqual(solutions[0].weight, 1.0)
         self.assertTrue(solutions[1].weight < solutions[0].weight)
+
+    def test_partial_penalties_complete(self):
+        """Once an assignment is complete, the partial penalties should
+        match their heuristics"""
+        self.addAssignment(markers.lower, 'a', 0)
+        self.addAssignment(markers.ints, '1', 1)
+        self.addAssignment(markers.roman, 'i', 2)
+        self.addAssignment(markers.ints, '2', 1)
+        self.addAssignment(markers.lower, 'b', 0)
+        self.addAssignment(markers.upper, 'A', 1)
+        self.addAssignment(markers.lower, 'c', 0)
+        solution = Solution(self.solution)
+        progress = heuristics.Progress(
+            [(a.typ, a.idx, a.depth) for a in solution], 0, 7)
+        for heuristic, penalty in heuristics.PARTIAL_PENALTIES.items():
+            weight = heuristic([solution], 1.0)[0].weight
+            self.assertAlmostEqual(1 - penalty(progress), weight)
+
+    def test_partial_penalties_bound(self):
+        """Penalties of a partial assignment can't exceed those of its
+        completion"""
+        self.addAssignment(markers.lower, 'a', 0)
+        self.addAssignment(markers.ints, '1', 1)
+        self.addAssignment(markers.lower, 'b', 0)
+        self.addAssignment(markers.ints, '1', 1)
+        self.addAssignment(markers.ints, '2', 1)
+        self.addAssignment(markers.roman, 'i', 1)
+        assignment = [(a.typ, a.idx, a.depth)
+                      for a in Solution(self.solution)]
+        for penalty in heuristics.PARTIAL_PENALTIES.values():
+            previous = 0
+            for length in range(1, len(assignment) + 1):
+                progress = heuristics.Progress(
+                    assignment[:length], len(assignment) - length,
+                    len(assignment))
+                self.assertTrue(penalty(progress) >= previous)
+                previous = penalty(progress)
@@ -0,0 +1,82 @@
+import shutil
+import tempfile
+from unittest import TestCase
+
+from mock import patch
+
+from regparser.tree.depth import markers, memo, rules
+from regparser.tree.depth.derive import derive_depths
+
+
+class MemoTests(TestCase):
+    def test_constraint_key(self):
+        """Module-level functions and those with explicit keys can be
+        identified; other functions can't"""
+        self.assertEqual(
+            memo.constraint_key(rules.depth_type_inverses),
+            'regparser.tree.depth.rules.depth_type_inverses')
+        order1 = rules.depth_type_order([markers.lower, markers.ints])
+        order2 = rules.depth_type_order([markers.lower, markers.ints])
+        order3 = rules.depth_type_order([markers.ints, markers.lower])
+        self.assertEqual(memo.constraint_key(order1),
+                         memo.constraint_key(order2))
+        self.assertNotEqual(memo.constraint_key(order1),
+                            memo.constraint_key(order3))
+        self.assertIsNone(memo.constraint_key(lambda c, v: None))
+
+    def test_cache_key(self):
+        key = memo.cache_key(['a', 'b'], [rules.depth_type_inverses])
+        self.assertEqual(
+            key, memo.cache_key([u'a', u'b'], [rules.depth_type_inverses]))
+        self.assertNotEqual(key, memo.cache_key(['a', 'b'], []))
+        self.assertNotEqual(key, memo.cache_key(['a', 'c'], []))
+        self.assertIsNone(memo.cache_key(['a'], [lambda c, v: None]))
+
+    def test_lru(self):
+        cache = memo.DepthCache(max_size=2)
+        cache.set('1', [])
+        cache.set('2', [])
+        cache.get('1')
+        cache.set('3', [])     # evicts 2
+        self.assertIsNotNone(cache.get('1'))
+        self.assertIsNone(cache.get('2'))
+        self.assertIsNotNone(cache.get('3'))
+        self.assertEqual((cache.hits, cache.misses), (3, 1))
+        self.assertEqual(cache.hit_rate, 0.75)
+
+    def test_persisted(self):
+        """Results should be shared via the directory"""
+        path = tempfile.mkdtemp()
+        try:
+            assignments = [[(markers.lower, 0, 0), (markers.ints, 0, 1)]]
+            memo.DepthCache(path=path).set('abcdef', assignments)
+
+            cache = memo.DepthCache(path=path)
+            result = cache.get('abcdef')
+            self.assertEqual(
+                result, (((markers.lower, 0, 0), (markers.ints, 0, 1)),))
+            self.assertTrue(result[0][0][0] is markers.lower)
+            self.assertEqual(cache.hits, 1)
+            self.assertIsNone(cache.get('abcdee'))
+        finally:
+            shutil.rmtree(path)
+
+    def test_derive_depths(self):
+        """derive_depths should consult the cache, regardless of how many
+        MARKERLESS paragraphs appear in a row"""
+        cache = memo.DepthCache()
+        with patch('regparser.tree.depth.derive.cache', cache):
+            first = derive_depths(['a', '1', '2', markers.MARKERLESS, 'b'])
+            second = derive_depths(['a', '1', '2', markers.MARKERLESS,
+                                    markers.MARKERLESS, 'b'])
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual([[p.depth for p in s] for s in first],
+                         [[0, 1, 1, 2, 0]])
+        self.assertEqual([[p.depth for p in s] for s in second],
+                         [[0, 1, 1, 2, 2, 0]])
+
+    def test_derive_depths_uncacheable(self):
+        cache = memo.DepthCache()
+        with patch('regparser.tree.depth.derive.cache', cache):
+            derive_depths(['a', 'b'], [lambda c, v: None])
+        self.assertEqual((cache.hits, cache.misses), (0, 0))
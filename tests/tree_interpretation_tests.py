@@ -1,4 +1,6 @@
 # vim: set encoding=utf-8
+import re
+
 from regparser.citations import Label
 from regparser.tree import interpretation
 from regparser.tree.struct import Node
@@ -41,6 +43,32 @@ class DepthInterpretationTreeTest(TestCase):
         self.assertTrue(1, len(tree.children))
         self.assertEqual(text, tree.children[0].text)
 
+    def test_interpParser_adjacent(self):
+        """Markers immediately following the previous paragraph's marker
+        are found, as though each paragraph's text were searched
+        separately"""
+        tree = interpretation.interpParser.build_tree('1.2. Two i. Sub', 1)
+        self.assertEqual(['1.', '2. Two '],
+                         [child.text for child in tree.children])
+        self.assertEqual(['2', 'i'], tree.children[1].children[0].label)
+
+    def test_interpParser_long(self):
+        """Long texts with many excluded citations are split throughout"""
+        pars = []
+        for par in range(1, 51):
+            pars.append('%d. See 12 CFR 1005.%d. ' % (par, par)
+                        + ' '.join('%s. See comment %d(a)-1. Text' % (sub, par)
+                                   for sub in ('i', 'ii', 'iii')))
+        text = '\n'.join(pars * 20)
+        exclude = [(match.start(), match.end()) for match in
+                   re.finditer(r'(12 CFR|comment) \S+', text)]
+        tree = interpretation.interpParser.build_tree(text, 1, exclude)
+        self.assertEqual(50, len(tree.children))
+        self.assertEqual(['50'], tree.children[-1].label)
+        self.assertTrue(all(len(child.children) == 3
+                            for child in tree.children[:-1]))
+        self.assertEqual('50. See 12 CFR 1005.50. ', tree.children[-1].text)
+
     def test_build_without_subs(self):
         title = "Something here"
         body = "\nAnd then more\nSome more\nAnd yet another line"
@@ -0,0 +1,99 @@
+# vim: set encoding=utf-8
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from lxml import etree
+
+from regparser.diff.tree import changes_between
+from regparser.tree import snapshot, struct
+
+
+class SnapshotTests(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def open(self, tree, name='snapshot'):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, 'wb') as f:
+            f.write(snapshot.serialize(tree))
+        return snapshot.Snapshot(path)
+
+    def example_tree(self, text=u'Some text'):
+        child_a = struct.Node(u'(a) Aaaa §', label=['111', '1', 'a'],
+                              source_xml=etree.fromstring('<P>(a)</P>'))
+        child_a.tagged_text = u'(a) <E T="03">Aaaa</E> §'
+        child_b = struct.Node(text, label=['111', '1', 'b'])
+        section = struct.Node(u'', [child_a, child_b], ['111', '1'],
+                              title=u'§ 111.1 Title')
+        interp = struct.Node(u'', [], ['111', 'Interp'],
+                             node_type=struct.Node.INTERP)
+        return struct.Node(u'', [section, interp], ['111'])
+
+    def test_open_invalid(self):
+        path = os.path.join(self.tmpdir, 'invalid')
+        with open(path, 'wb') as f:
+            f.write('Not a snapshot, though long enough')
+        self.assertRaises(ValueError, snapshot.Snapshot, path)
+
+    def test_structure(self):
+        """Parent and child indexes should reflect the original tree"""
+        snap = self.open(self.example_tree())
+        self.assertEqual(snap.size, 5)
+        self.assertEqual(snap.parent(0), None)
+        self.assertEqual(snap.child_range(0), (1, 3))
+        self.assertEqual(snap.parent(1), 0)
+        self.assertEqual(snap.parent(2), 0)
+        self.assertEqual(snap.child_range(1), (3, 5))
+        self.assertEqual(snap.child_range(2), (5, 5))
+        self.assertEqual(snap.parent(4), 1)
+
+    def test_node_view(self):
+        """NodeViews should look like the struct.Nodes they came from"""
+        root = self.open(self.example_tree()).tree()
+        self.assertEqual(root.label, ['111'])
+        self.assertEqual(root.title, None)
+        self.assertFalse(hasattr(root, 'tagged_text'))
+        section, interp = root.children
+        self.assertEqual(section.title, u'§ 111.1 Title')
+        self.assertEqual(section.depth(), 3)
+        self.assertEqual(interp.node_type, struct.Node.INTERP)
+        self.assertEqual(interp.label_id(), '111-Interp')
+
+        child_a, child_b = section.children
+        self.assertEqual(child_a.text, u'(a) Aaaa §')
+        self.assertEqual(child_a.tagged_text, u'(a) <E T="03">Aaaa</E> §')
+        self.assertEqual(child_a.label, ['111', '1', 'a'])
+        self.assertEqual(child_a.source_xml.tag, 'P')
+        self.assertEqual(child_b.source_xml, None)
+        self.assertEqual(child_b.children, [])
+
+    def test_frozen_node_view(self):
+        """FrozenNodeViews should look like FrozenNodes, including their
+        digests"""
+        tree = self.example_tree()
+        view = self.open(tree).frozen_tree()
+        frozen = struct.FrozenNode.from_node(tree)
+        self.assertEqual(view.hash, frozen.hash)
+        self.assertEqual(view.label_id, '111')
+        self.assertEqual(view.children[0].children[1].label,
+                         ('111', '1', 'b'))
+        self.assertEqual(view.children[1].tagged_text, '')
+
+    def test_changes_between(self):
+        """Diffs between views should match diffs between FrozenNodes"""
+        lhs, rhs = self.example_tree(), self.example_tree(u'Changed')
+        lhs_view = self.open(lhs, 'lhs').frozen_tree()
+        rhs_view = self.open(rhs, 'rhs').frozen_tree()
+        self.assertEqual(lhs_view, self.open(lhs, 'lhs2').frozen_tree())
+        self.assertNotEqual(lhs_view, rhs_view)
+        self.assertEqual(lhs_view.children[1], rhs_view.children[1])
+
+        self.assertEqual(
+            dict(changes_between(lhs_view, rhs_view)),
+            dict(changes_between(struct.FrozenNode.from_node(lhs),
+                                 struct.FrozenNode.from_node(rhs))))
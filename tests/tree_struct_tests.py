@@ -1,6 +1,8 @@
 import json
 from unittest import TestCase
 
+from lxml import etree
+
 from regparser.tree import struct
 
 
@@ -149,6 +151,28 @@ class DepthTreeTest(TestCase):
             struct.Node('t', [1, 2, 3], [2, 3, 4], 'Example Title', u'ttt'),
             json.loads(json.dumps(d), object_hook=struct.node_decode_hook))
 
+    def test_full_encode_decode_source_xml(self):
+        """source_xml survives a round trip, but is only parsed when
+        accessed"""
+        xml = etree.fromstring('<P>Some <E T="03">text</E></P>')
+        encoded = struct.FullNodeEncoder().encode(
+            struct.Node('text', source_xml=xml))
+        decoded = json.loads(encoded,
+                             object_hook=struct.full_node_decode_hook)
+        self.assertTrue(isinstance(decoded._source_xml, basestring))
+        # Re-encoding does not require parsing
+        self.assertEqual(encoded, struct.FullNodeEncoder().encode(decoded))
+        self.assertTrue(isinstance(decoded._source_xml, basestring))
+
+        self.assertEqual(decoded.source_xml.tag, 'P')
+        self.assertEqual(etree.tostring(decoded.source_xml),
+                         etree.tostring(xml))
+
+        encoded = struct.FullNodeEncoder().encode(struct.Node('text'))
+        decoded = json.loads(encoded,
+                             object_hook=struct.full_node_decode_hook)
+        self.assertEqual(decoded.source_xml, None)
+
     def test_treeify(self):
         n1 = struct.Node(label=['1'])
         n1b = struct.Node(label=['1', 'b'])
@@ -253,6 +277,30 @@ class FrozenNodeTests(TestCase):
         self.assertNotEqual(id(node1), id(node2))
         self.assertEqual(id(frozen1), id(frozen2))
 
+    def test_equality_distinct_children(self):
+        """Nodes are equal when their children are equal, even if the
+        children are separate instances"""
+        left = struct.FrozenNode(text='parent', children=[
+            struct.FrozenNode(text='child', label=['a'])])
+        right = struct.FrozenNode(text='parent', children=[
+            struct.FrozenNode(text='child', label=['a'])])
+        other = struct.FrozenNode(text='parent', children=[
+            struct.FrozenNode(text='other child', label=['a'])])
+        self.assertNotEqual(id(left.children[0]), id(right.children[0]))
+        self.assertEqual(left, right)
+        self.assertEqual(hash(left), hash(right))
+        self.assertNotEqual(left, other)
+
+    def test_interned(self):
+        """Interning returns a previously allocated node if one exists"""
+        args = {'text': 'text', 'children': [struct.FrozenNode(text='child')],
+                'label': ['b', 'c'], 'title': 'title'}
+        original = struct.FrozenNode.interned(**args)
+        self.assertEqual(id(original), id(struct.FrozenNode.interned(**args)))
+        args['text'] = 'new text'
+        self.assertNotEqual(id(original),
+                            id(struct.FrozenNode.interned(**args)))
+
     def test_hash(self):
         """Different fields lead to different hashes. The same fields lead to
         the same hash"""
@@ -108,6 +108,49 @@ class TreeUtilsTest(unittest.TestCase):
         self.assert_transform_equality(
             '<P>Note<SU footnote="(parens), see">note</SU> that</P>',
             r'Note[^note](\(parens\), see) that', *no_space)
+        self.assert_transform_equality(
+            '<P>See<SU footnote="f">x<E T="52">2</E></SU><E T="52">i</E></P>',
+            'See[^x_{2}](f)_{i}', *no_space)
+
+    def test_get_node_text_unmodified(self):
+        """Extracting text should not modify the XML"""
+        xml_str = ('<P>(a) <E T="03">Ab</E>c<E T="52">1</E>d'
+                   '<SU footnote="note">2</SU> e</P>')
+        xml = etree.fromstring(xml_str)
+        tree_utils.get_node_text(xml)
+        tree_utils.get_node_text(xml, add_spaces=True)
+        tree_utils.get_node_text_tags_preserved(xml)
+        self.assertEqual(xml_str, etree.tostring(xml))
+
+    def test_cached_text(self):
+        """Within a cached_text context, text is only extracted once per
+        element"""
+        xml = etree.fromstring('<P>(a) <E T="03">Ab</E>cd</P>')
+        with tree_utils.cached_text():
+            self.assertEqual('(a) Abcd', tree_utils.get_node_text(xml))
+            xml.text = '(b) '
+            with tree_utils.cached_text():
+                self.assertEqual('(a) Abcd', tree_utils.get_node_text(xml))
+            self.assertEqual('(a) Abcd', tree_utils.get_node_text(xml))
+        self.assertEqual('(b) Abcd', tree_utils.get_node_text(xml))
+
+    def test_memoize_for_node(self):
+        xml = etree.fromstring('<P>(a) Content</P>')
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return len(calls)
+
+        self.assertEqual(1, tree_utils.memoize_for_node(xml, 'k', compute))
+        self.assertEqual(2, tree_utils.memoize_for_node(xml, 'k', compute))
+        with tree_utils.cached_text():
+            self.assertEqual(
+                3, tree_utils.memoize_for_node(xml, 'k', compute))
+            self.assertEqual(
+                3, tree_utils.memoize_for_node(xml, 'k', compute))
+            self.assertEqual(
+                4, tree_utils.memoize_for_node(xml, 'other', compute))
 
     def test_unwind_stack(self):
         level_one_n = Node(label=['272'])
@@ -2,9 +2,11 @@
 from unittest import TestCase
 
 from lxml import etree
+from mock import patch
 
 from regparser.tree.depth import markers as mtypes
 from regparser.tree.depth.derive import ParAssignment
+from regparser.tree.depth.memo import DepthCache
 from regparser.tree.struct import Node
 from regparser.tree.xml_parser import paragraph_processor
 
@@ -15,6 +17,16 @@ class _ExampleProcessor(paragraph_processor.ParagraphProcessor):
                 paragraph_processor.StarsMatcher()]
 
 
+class _MarkerMatcher(paragraph_processor.SimpleTagMatcher):
+    """Treats the contents of the tag as a paragraph marker"""
+    def derive_nodes(self, xml, processor=None):
+        return [Node(label=[xml.text])]
+
+
+class _MarkerProcessor(paragraph_processor.ParagraphProcessor):
+    MATCHERS = [_MarkerMatcher('MARKER'), paragraph_processor.StarsMatcher()]
+
+
 class ParagraphProcessorTest(TestCase):
     def test_parse_nodes_matchers(self):
         """Verify that matchers are consulted per node"""
@@ -111,6 +123,55 @@ class ParagraphProcessorTest(TestCase):
         self.assertEqual(a.children[0].label, ['root', 'p1', 'a', 'p2'])
         self.assertEqual(b.label, ['root', 'p1', 'b'])
 
+    def test_process_best_first(self):
+        """Searching for the best depths directly should build the same
+        tree"""
+        xml = etree.fromstring(u"""
+            <ROOT>
+                <MARKER>a</MARKER>
+                <MARKER>1</MARKER>
+                <MARKER>i</MARKER>
+                <MARKER>ii</MARKER>
+                <MARKER>2</MARKER>
+                <STARS />
+                <MARKER>h</MARKER>
+                <MARKER>i</MARKER>
+            </ROOT>""")
+        expected = _MarkerProcessor().process(xml, Node(label=['root']))
+        path = 'regparser.tree.xml_parser.paragraph_processor.settings'
+        with patch(path) as settings:
+            settings.BEST_FIRST_DEPTHS = True
+            settings.DEPTH_BUDGET_SECONDS = None
+            settings.DEPTH_BUDGET_SOLUTIONS = None
+            result = _MarkerProcessor().process(xml, Node(label=['root']))
+        self.assertEqual(result, expected)
+        self.assertEqual([c.label_id() for c in result.children],
+                         ['root-a', 'root-h', 'root-i'])
+
+    @patch('regparser.tree.xml_parser.paragraph_processor.settings')
+    def test_process_over_budget(self, settings):
+        """If deriving depths is too expensive, we should fall back to a
+        greedy assignment"""
+        settings.BEST_FIRST_DEPTHS = False
+        settings.DEPTH_BUDGET_SECONDS = None
+        settings.DEPTH_BUDGET_SOLUTIONS = 0
+        xml = etree.fromstring(u"""
+            <ROOT>
+                <MARKER>a</MARKER>
+                <MARKER>1</MARKER>
+                <MARKER>2</MARKER>
+                <MARKER>b</MARKER>
+            </ROOT>""")
+        with patch('regparser.tree.depth.derive.cache', DepthCache(0)):
+            with patch.object(paragraph_processor, 'logging') as logging:
+                result = _MarkerProcessor().process(xml,
+                                                    Node(label=['root']))
+        self.assertTrue(logging.warning.called)
+        self.assertEqual([c.label_id() for c in result.children],
+                         ['root-a', 'root-b'])
+        self.assertEqual([c.label_id() for c in result.children[0].children],
+                         ['root-a-1', 'root-a-2'])
+
     def test_separate_intro_empty_nodes(self):
         """ Make sure separate_intro can handle an empty node list. """
         nodes = []
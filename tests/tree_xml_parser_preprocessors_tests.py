@@ -1,4 +1,5 @@
 # vim: set encoding=utf-8
+from collections import defaultdict
 from unittest import TestCase
 
 from lxml import etree
@@ -329,3 +330,55 @@ class FootnotesTests(XMLBuilderMixin, TestCase):
             with patch(logging) as logging:
                 self.fn.add_ref_attributes(original_xml)
                 self.assertTrue(logging.warning.called)
+
+
+class ElementIndexTests(TestCase):
+    def test_find(self):
+        """Elements are grouped by tag, in document order"""
+        xml = etree.fromstring(
+            '<ROOT><P>1<E>2</E></P><FP>3</FP><P>4<FP>5</FP></P></ROOT>')
+        index = preprocessors.ElementIndex(xml, ['P', 'FP', 'P'])
+        self.assertEqual([el.text for el in index.find('P')], ['1', '4'])
+        self.assertEqual([el.text for el in index.find('FP', 'P')],
+                         ['1', '3', '4', '5'])
+        self.assertEqual(index.find('E'), [])
+
+    def test_replace(self):
+        xml = etree.fromstring('<ROOT><SU>1, 2</SU><SU>3</SU></ROOT>')
+        index = preprocessors.ElementIndex(xml, ['SU'])
+        first, second = xml
+        new1, new2 = etree.Element('SU'), etree.Element('SU')
+        index.replace('SU', {first: [new1, new2]})
+        self.assertEqual(index.find('SU'), [new1, new2, second])
+        self.assertEqual(index.position(new2), index.position(first))
+
+    def test_invalidate(self):
+        xml = etree.fromstring('<ROOT><P>1</P></ROOT>')
+        index = preprocessors.ElementIndex(xml, ['P'])
+        etree.SubElement(xml, 'P').text = '2'
+        self.assertEqual(len(index.find('P')), 1)
+        index.invalidate()
+        self.assertEqual([el.text for el in index.find('P')], ['1', '2'])
+
+
+class PreprocessTests(XMLBuilderMixin, TestCase):
+    def test_preprocess(self):
+        """All of the preprocessors run, sharing a single index, and their
+        timings are recorded"""
+        with self.tree.builder("ROOT") as root:
+            root.P(_xml="Content<SU>1, 2</SU>")
+            root.FP("(Approved by the Office of Management and Budget under "
+                    "control number 1234-5678)")
+            with root.FTNT() as ftnt:
+                ftnt.P(_xml="<SU>1</SU> One")
+                ftnt.P(_xml="<SU>2</SU> Two")
+        xml = self.tree.render_xml()
+        with patch.object(preprocessors, 'timings',
+                          defaultdict(float)) as timings:
+            preprocessors.preprocess(xml)
+        self.assertEqual(set(timings), set(
+            ['walk'] + [p.__name__ for p in preprocessors.ALL]))
+        self.assertEqual(len(xml.xpath('//APPRO')), 1)
+        self.assertEqual(
+            [su.get('footnote') for su in xml.xpath('./P/SU')],
+            ['One', 'Two'])
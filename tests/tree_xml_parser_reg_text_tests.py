@@ -7,7 +7,7 @@ from mock import patch
 
 from regparser.tree.depth import markers as mtypes
 from regparser.tree.struct import Node
-from regparser.tree.xml_parser import reg_text
+from regparser.tree.xml_parser import reg_text, tree_utils
 from tests.xml_builder import XMLBuilderMixin
 from tests.node_accessor import NodeAccessorMixin
 
@@ -649,6 +649,40 @@ class RegTextTest(XMLBuilderMixin, NodeAccessorMixin, TestCase):
         self.assertEqual(subjgrp_1.label, ['123', 'Subjgrp', 'CoO'])
         self.assertEqual(subjgrp_2.label, ['123', 'Subjgrp', 'ATL'])
 
+    def test_build_tree_parallel(self):
+        """Parsing sections in parallel should give the same results, with
+        source_xml pointing into the original document"""
+        with self.tree.builder("ROOT") as root:
+            with root.PART() as part:
+                part.EAR("Pt. 123")
+                part.HD(u"PART 123—SOME STUFF", SOURCE="HED")
+                with part.SUBPART() as subpart:
+                    subpart.HD(u"Subpart A—First subpart")
+                    with subpart.SECTION() as section:
+                        section.SECTNO(u"§ 123.1")
+                        section.SUBJECT("First")
+                        section.P("(a) aaa")
+                        section.P("(1) a1")
+                        section.P("(i) a1i")
+                        section.P("(ii) a1ii")
+                        section.P("(b) bbb")
+                with part.SUBJGRP() as subjgrp:
+                    subjgrp.HD(u"Changes of Ownership")
+                    with subjgrp.SECTION() as section:
+                        section.SECTNO(u"§ 123.2")
+                        section.SUBJECT("Second")
+                        section.P("Intro")
+                        section.P("(a) aaa")
+        serial = reg_text.build_tree(self.tree.render_xml())
+        xml = self.tree.render_xml()
+        parallel = reg_text.build_tree(xml, workers=2)
+        self.assertEqual(serial, parallel)
+
+        sect1 = parallel.children[0].children[0]
+        a1ii = sect1.children[0].children[0].children[1]
+        self.assertEqual(a1ii.label, ['123', '1', 'a', '1', 'ii'])
+        self.assertTrue(a1ii.source_xml is xml.xpath('//SECTION/P')[3])
+
 
 class ParagraphMatcherTests(XMLBuilderMixin, TestCase):
     def test_next_marker_found(self):
@@ -682,6 +716,22 @@ class ParagraphMatcherTests(XMLBuilderMixin, TestCase):
         xml = self.tree.render_xml()[0]
         self.assertIsNone(reg_text.ParagraphMatcher().next_marker(xml))
 
+    @patch('regparser.tree.xml_parser.reg_text.tree_utils'
+           '.get_paragraph_markers')
+    def test_markers_memoized(self, get_paragraph_markers):
+        """Within a parse, each paragraph's markers are only scanned once,
+        even though they're also needed for the preceding paragraph"""
+        get_paragraph_markers.side_effect = lambda text: [text[1]]
+        with self.tree.builder("ROOT") as root:
+            root.P("(a) aaa")
+            root.P("(b) bbb")
+        first, second = self.tree.render_xml()
+        matcher = reg_text.ParagraphMatcher()
+        with tree_utils.cached_text():
+            matcher.derive_nodes(first)
+            matcher.derive_nodes(second)
+        self.assertEqual(get_paragraph_markers.call_count, 2)
+
 
 class RegtextParagraphProcessorTests(XMLBuilderMixin, NodeAccessorMixin,
                                      TestCase):